@@ -0,0 +1,298 @@
+"""
+    In-memory image pipeline for grid images and the other
+    artwork Steam shows for a game (portrait capsule, hero and logo).
+
+    The source image is decoded once, straight from the downloaded bytes.
+    Large JPEGs are decoded at a reduced scale (draft mode) and other big
+    images are reduced before resampling, so full resolution pixels are only
+    touched when they are needed. Blurring, darkening, drawing the title,
+    resizing and cropping all happen on that one image, and the result is
+    encoded once and written atomically.
+
+    All the variants of a game are rendered from the same decoded image,
+    largest first, every one of them downscaled from the previous one.
+
+    Example:
+        data = render_grid(source_bytes, title="Overwatch")
+        atomic_file.atomic_write("12345.png", data)
+
+        images = render_variants(source_bytes, DEFAULT_VARIANTS)
+        write_variants(grid_folder, "12345", images)
+"""
+
+import collections
+import io
+import os
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+import atomic_file
+import text_layout
+
+# Size of the horizontal grid images
+GRID_SIZE = (460, 215)
+
+# An artwork variant:
+# suffix - Appended to the app ID in the file name (<appid><suffix>.png)
+# size - Size of the image
+# fit - "cover" to fill the size and crop the rest, "contain" to fit the whole image inside the size
+# title - Whether the title is drawn on this variant
+Variant = collections.namedtuple("Variant", ["suffix", "size", "fit", "title"])
+
+GRID = Variant("", GRID_SIZE, "cover", True)
+PORTRAIT = Variant("p", (600, 900), "cover", True)
+HERO = Variant("_hero", (1920, 620), "cover", False)
+LOGO = Variant("_logo", (640, 360), "contain", False)
+
+# Every asset Steam uses for a game
+DEFAULT_VARIANTS = (GRID, PORTRAIT, HERO, LOGO)
+
+# Font used for the titles
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grid-font.ttf")
+
+# Title font size, position and blur radius, relative to a full resolution (1080p) cover.
+# Long titles are wrapped and shrunk down to TITLE_MIN_FONT_SIZE to fit.
+TITLE_FONT_SIZE = 120
+TITLE_MIN_FONT_SIZE = 40
+TITLE_Y = 100
+TITLE_SHADOW_OFFSET = 8
+BLUR_RADIUS = 5
+
+# Brightness of the background behind the title
+TITLE_BRIGHTNESS = 0.8
+
+# Space left on both sides of the title, relative to the width of the image
+TITLE_MARGIN = 0.05
+
+# Maximum number of lines of a title
+TITLE_MAX_LINES = 3
+
+def cover_size(image_size, size):
+
+    """
+        Returns the smallest size with the aspect ratio of image_size
+        that covers size in both dimensions
+    """
+
+    scale = max(size[0] / float(image_size[0]), size[1] / float(image_size[1]))
+    return (max(size[0], round(image_size[0] * scale)), max(size[1], round(image_size[1] * scale)))
+
+def contain_size(image_size, size):
+
+    """
+        Returns the largest size with the aspect ratio of image_size
+        that fits inside size
+    """
+
+    scale = min(size[0] / float(image_size[0]), size[1] / float(image_size[1]))
+    return (max(1, round(image_size[0] * scale)), max(1, round(image_size[1] * scale)))
+
+def variant_size(image_size, variant):
+
+    """
+        Returns the size an image is scaled to before it is cropped for a variant
+    """
+
+    if variant.fit == "contain":
+        return contain_size(image_size, variant.size)
+    return cover_size(image_size, variant.size)
+
+def crop_box(image_size, size, crop_type="middle"):
+
+    """
+        Returns the box to crop an image of image_size to size
+
+        Parameters:
+            crop_type - 'top', 'middle' or 'bottom': which part of the image to keep
+                        ('top' and 'bottom' mean 'left' and 'right' for wide images)
+
+        Raises:
+            ValueError - If an invalid crop_type is provided
+    """
+
+    width, height = image_size
+    extra_width = width - size[0]
+    extra_height = height - size[1]
+
+    if crop_type == 'top':
+        left, top = 0, 0
+    elif crop_type == 'middle':
+        left, top = round(extra_width / 2), round(extra_height / 2)
+    elif crop_type == 'bottom':
+        left, top = extra_width, extra_height
+    else:
+        raise ValueError('ERROR: invalid value for crop_type')
+
+    return (left, top, left + size[0], top + size[1])
+
+def _reduce(im, target):
+
+    """
+        Decodes (for JPEGs) or reduces (for other formats) an opened image
+        to the smallest scale that still covers the target size, which is
+        much cheaper than a full decode
+    """
+
+    if im.format == "JPEG":
+        im.draft("RGB", target)
+
+    factor = min(im.size[0] // target[0], im.size[1] // target[1])
+    if factor >= 2:
+        im = im.reduce(factor)
+
+    return im
+
+def open_image(data, size=None):
+
+    """
+        Decodes an image from bytes. If a size is given, the image is only
+        decoded at the scale needed to cover that size.
+
+        Returns:
+            A tuple of the image and the size of the original image
+    """
+
+    im = Image.open(io.BytesIO(data))
+    original_size = im.size
+
+    if size is not None:
+        im = _reduce(im, cover_size(original_size, size))
+
+    return im, original_size
+
+def fit_image(im, size, crop_type="middle"):
+
+    """
+        Resizes and crops an image to fill the given size exactly
+    """
+
+    if im.size != size:
+        target = cover_size(im.size, size)
+        if im.size != target:
+            im = im.resize(target, Image.LANCZOS)
+        im = im.crop(crop_box(im.size, size, crop_type))
+
+    return im
+
+def draw_title(im, title, scale):
+
+    """
+        Blurs and darkens an image and draws a title with a shadow on it
+
+        Parameters:
+            im - The image, already at its final scale
+            title - The text to draw
+            scale - Scale of the image relative to a full resolution cover,
+                    used to scale the font, blur and position
+    """
+
+    im = im.filter(ImageFilter.GaussianBlur(radius=BLUR_RADIUS * scale))
+    im = ImageEnhance.Brightness(im).enhance(TITLE_BRIGHTNESS)
+
+    # Wrap and size the title to fit between the margins and above the bottom
+    margin = round(im.size[0] * TITLE_MARGIN)
+    top = round(TITLE_Y * scale)
+    box = (max(1, im.size[0] - 2 * margin), max(1, im.size[1] - 2 * top))
+    layout = text_layout.layout_text(title, FONT_PATH, box, max(1, round(TITLE_FONT_SIZE * scale)),
+                                     max(1, round(TITLE_MIN_FONT_SIZE * scale)), TITLE_MAX_LINES)
+    font = text_layout.get_font(FONT_PATH, layout.size)
+
+    draw = ImageDraw.Draw(im)
+    shadow = round(TITLE_SHADOW_OFFSET * scale)
+    for line, x, y in layout.lines:
+        draw.text((margin + x, top + y), line, font=font, fill=(0, 0, 0, 100))
+        draw.text((margin + x, top + y + shadow), line, font=font)
+
+    return im
+
+def render_variants(data, variants=DEFAULT_VARIANTS, title=None, crop_type="middle"):
+
+    """
+        Creates several artwork variants from the bytes of one source image.
+        The source is decoded once, at the scale of the largest variant, and
+        every variant is downscaled from the previous (larger) one.
+
+        Parameters:
+            data - The encoded source image
+            variants - The Variants to create. Defaults to DEFAULT_VARIANTS.
+            title - Text to draw on the variants that have a title. Defaults to None (no text).
+            crop_type - Which part of the image to keep. Defaults to 'middle'.
+
+        Returns:
+            A dictionary of every variant's suffix and its image, encoded as PNG
+    """
+
+    im = Image.open(io.BytesIO(data))
+    original_size = im.size
+
+    # Largest variant first, so every one can be scaled down from the previous one
+    variants = sorted(variants, key=lambda variant: variant_size(original_size, variant)[0], reverse=True)
+
+    im = _reduce(im, variant_size(original_size, variants[0]))
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGB")
+
+    images = {}
+    for variant in variants:
+        target = variant_size(original_size, variant)
+        if im.size != target:
+            im = im.resize(target, Image.LANCZOS)
+
+        result = im
+        if title and variant.title:
+            result = draw_title(result, title, target[0] / float(original_size[0]))
+        if variant.fit == "cover":
+            result = fit_image(result, variant.size, crop_type)
+
+        output = io.BytesIO()
+        result.save(output, "PNG")
+        images[variant.suffix] = output.getvalue()
+
+    return images
+
+def render_variants_safe(data, variants=DEFAULT_VARIANTS, title=None, crop_type="middle"):
+
+    """
+        Same as render_variants, but returns None if the source image
+        can not be read. Suitable for running in a worker process.
+    """
+
+    try:
+        return render_variants(data, variants, title, crop_type)
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+def render_grid(data, size=GRID_SIZE, title=None, crop_type="middle"):
+
+    """
+        Creates a grid image from the bytes of a source image
+
+        Parameters:
+            data - The encoded source image
+            size - Size of the grid image. Defaults to GRID_SIZE.
+            title - Text to draw on the image. Defaults to None (no text).
+            crop_type - Which part of the image to keep. Defaults to 'middle'.
+
+        Returns:
+            The grid image, encoded as PNG
+    """
+
+    return render_variants(data, (GRID._replace(size=size),), title, crop_type)[GRID.suffix]
+
+def write_variants(folder, appid, images):
+
+    """
+        Writes the images created by render_variants to a folder,
+        named the way Steam expects them (<appid><suffix>.png)
+
+        Returns:
+            A list of the paths written
+    """
+
+    os.makedirs(folder, exist_ok=True)
+
+    paths = []
+    for suffix, data in images.items():
+        path = os.path.join(folder, "{}{}.png".format(appid, suffix))
+        atomic_file.atomic_write(path, data)
+        paths.append(path)
+
+    return paths
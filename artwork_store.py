@@ -0,0 +1,322 @@
+"""
+    Content-addressed store of downloaded artwork, shared by all the Steam users.
+
+    Every image is downloaded once, saved under the SHA-256 of its contents,
+    and placed into the grid folders of the users that need it by hardlink
+    (or by copy, where hardlinks are not possible). An index remembers which
+    URL every image came from, when it was downloaded and where it was placed,
+    so images can be refreshed and the ones nobody uses anymore removed.
+
+    Example:
+        store = ArtworkStore()
+        store.install(url, os.path.join(grid_folder, "12345.png"), client.download)
+        store.gc()
+        store.save()
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import atomic_file
+
+# Default location of the store
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".steamhelper", "artwork")
+
+# Bumped whenever the format of the index changes
+VERSION = 1
+
+# Size of the chunks read when hashing a file
+CHUNK_SIZE = 1 << 16
+
+def file_hash(path):
+
+    """
+        Returns the SHA-256 hex digest of a file's contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ArtworkStore(object):
+
+    """
+        An on-disk store of images keyed by their content hash, with an index
+        of their source URLs and placements. Safe to use from several threads.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+
+        """
+            Loads the index of the store. A missing or unreadable index
+            results in an empty store.
+
+            Parameters:
+                root - Folder of the store. Defaults to DEFAULT_ROOT.
+        """
+
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        # Where the images are downloaded before they are stored
+        self.temp_dir = os.path.join(root, "tmp")
+        self.downloaded = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._urls = {}
+        self._objects = {}
+        self._dirty = False
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if contents.get("version") == VERSION:
+            self._urls = contents.get("urls", {})
+            self._objects = contents.get("objects", {})
+
+    def object_path(self, digest):
+
+        """
+            Returns the path of a stored image
+        """
+
+        return os.path.join(self.root, "objects", digest[:2], digest + ".png")
+
+    def _url_lock(self, url):
+
+        """
+            Returns the lock held while a URL is downloaded, so the same
+            image is never downloaded by two threads at once
+        """
+
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def lookup(self, url):
+
+        """
+            Returns the hash of the image downloaded from a URL,
+            or None if it is not in the store
+        """
+
+        with self._lock:
+            digest = self._urls.get(url)
+        if digest is not None and os.path.isfile(self.object_path(digest)):
+            return digest
+        return None
+
+    def fetch(self, url, download):
+
+        """
+            Returns the hash of the image at a URL, downloading it
+            only if it is not in the store yet
+
+            Parameters:
+                url - URL of the image
+                download - Function that takes the URL and a file name
+                           and downloads the image to the file
+
+            Raises:
+                Whatever download raises, and OSError if the image could not be stored
+        """
+
+        with self._url_lock(url):
+            digest = self.lookup(url)
+            if digest is not None:
+                with self._lock:
+                    self.reused += 1
+                return digest
+
+            os.makedirs(self.temp_dir, exist_ok=True)
+            # Named after the URL, so an interrupted download can be resumed by the next run
+            temp_path = os.path.join(self.temp_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".download")
+
+            try:
+                download(url, temp_path)
+                digest = file_hash(temp_path)
+                path = self.object_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # The same image may already be stored from another URL
+                if os.path.isfile(path):
+                    os.remove(temp_path)
+                else:
+                    os.replace(temp_path, path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+
+            with self._lock:
+                self.downloaded += 1
+                self._urls[url] = digest
+                entry = self._objects.setdefault(digest, {"sources": [], "placements": []})
+                if url not in entry["sources"]:
+                    entry["sources"].append(url)
+                entry["size"] = os.path.getsize(path)
+                entry["fetched"] = time.time()
+                self._dirty = True
+
+            return digest
+
+    def place(self, digest, file_name):
+
+        """
+            Places a stored image at file_name, replacing what is there,
+            by hardlink if possible, by copy otherwise
+
+            Raises:
+                OSError - If the image could not be placed
+        """
+
+        source = self.object_path(digest)
+        directory = os.path.dirname(file_name) or "."
+        os.makedirs(directory, exist_ok=True)
+        atomic_file.atomic_link(source, file_name)
+
+        file_name = os.path.abspath(file_name)
+        with self._lock:
+            entry = self._objects.setdefault(digest, {"sources": [], "placements": []})
+            if file_name not in entry["placements"]:
+                entry["placements"].append(file_name)
+            self._dirty = True
+
+    def install(self, url, file_name, download):
+
+        """
+            Places the image at a URL at file_name, downloading it only
+            if it is not in the store yet (see fetch and place)
+
+            Returns:
+                The hash of the image
+        """
+
+        digest = self.fetch(url, download)
+        self.place(digest, file_name)
+        return digest
+
+    def provenance(self, file_name):
+
+        """
+            Returns the hash and the source URLs of the stored image
+            placed at file_name, or None if it was not placed by the store
+        """
+
+        file_name = os.path.abspath(file_name)
+        with self._lock:
+            for digest, entry in self._objects.items():
+                if file_name in entry["placements"]:
+                    return digest, list(entry["sources"])
+        return None
+
+    def refresh(self, url):
+
+        """
+            Forgets the image downloaded from a URL, so the next fetch
+            downloads it again. The image itself is removed by gc() once
+            nothing uses it.
+        """
+
+        with self._lock:
+            if self._urls.pop(url, None) is not None:
+                self._dirty = True
+
+    def _is_placed(self, digest, file_name):
+
+        """
+            Returns whether file_name still holds the stored image
+        """
+
+        try:
+            if os.path.samefile(file_name, self.object_path(digest)):
+                return True
+            return file_hash(file_name) == digest
+        except OSError:
+            return False
+
+    def expire(self, max_age):
+
+        """
+            Forgets the source URLs of the images downloaded more than
+            max_age seconds ago, so they are downloaded again next time
+        """
+
+        now = time.time()
+        with self._lock:
+            for digest, entry in self._objects.items():
+                if now - entry.get("fetched", 0) <= max_age:
+                    continue
+                for url in entry["sources"]:
+                    if self._urls.get(url) == digest:
+                        del self._urls[url]
+                        self._dirty = True
+
+    def gc(self):
+
+        """
+            Removes the images that are not placed anywhere anymore.
+            The placements that were deleted or replaced are forgotten first.
+
+            Returns:
+                The number of images removed
+        """
+
+        with self._lock:
+            placements = {digest: list(entry["placements"]) for digest, entry in self._objects.items()}
+
+        # Check the files outside the lock, hashing them can take a while
+        placements = {digest: [path for path in paths if self._is_placed(digest, path)]
+                      for digest, paths in placements.items()}
+
+        removed = []
+        with self._lock:
+            for digest, paths in placements.items():
+                entry = self._objects.get(digest)
+                if entry is None:
+                    continue
+                entry["placements"] = paths
+                if not paths:
+                    del self._objects[digest]
+                    for url in entry["sources"]:
+                        if self._urls.get(url) == digest:
+                            del self._urls[url]
+                    removed.append(digest)
+            self._dirty = True
+
+        for digest in removed:
+            try:
+                os.remove(self.object_path(digest))
+            except OSError:
+                pass
+
+        return len(removed)
+
+    def save(self):
+
+        """
+            Writes the index to disk, if anything changed since it was loaded.
+            The file is replaced atomically so a crash never leaves a partial index.
+        """
+
+        with self._lock:
+            if not self._dirty:
+                return
+            contents = json.dumps({"version": VERSION, "urls": self._urls, "objects": self._objects})
+            self._dirty = False
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            atomic_file.atomic_write(self.index_path, contents)
+        except BaseException:
+            # Keep the changes for the next save
+            with self._lock:
+                self._dirty = True
+            raise
@@ -0,0 +1,76 @@
+"""
+    Atomic file replacement. A file is written (or linked) under a temporary
+    name of its own in the same folder, then renamed over the destination,
+    so a crash never leaves a partial file and concurrent runs don't clash.
+    The files get the usual permissions of the user (0666 minus the umask).
+
+    Example:
+        atomic_write("scan_cache.json", json.dumps(entries))
+        atomic_link(os.path.join(store, "ab12....png"), os.path.join(grid_folder, "12345.png"))
+"""
+
+import os
+import shutil
+import uuid
+
+def _replace(path, create):
+
+    """
+        Creates a temporary file next to path with create(temp_path),
+        then renames it over path. The temporary file is removed if
+        anything fails.
+    """
+
+    directory = os.path.dirname(path) or "."
+    temp_path = os.path.join(directory, ".{}.{}.tmp".format(os.path.basename(path), uuid.uuid4().hex))
+    try:
+        create(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write(path, data):
+
+    """
+        Replaces a file with new contents, atomically
+
+        Parameters:
+            path - The file to write
+            data - The contents, as bytes, or as a string written as UTF-8
+
+        Raises:
+            OSError - If the file could not be written
+    """
+
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    def create(temp_path):
+        # Opened like open(path, "wb"), so the mode follows the umask
+        with open(temp_path, "xb") as f:
+            f.write(data)
+
+    _replace(path, create)
+
+def atomic_link(source, path):
+
+    """
+        Replaces a file with a hardlink to another file, or with a copy of it
+        where hardlinks are not possible (different drive, file system
+        without hardlinks), atomically
+
+        Raises:
+            OSError - If the file could not be linked or copied
+    """
+
+    def create(temp_path):
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+
+    _replace(path, create)
@@ -0,0 +1,12 @@
+"""
+    Benchmarks for the hot paths of the helpers: scanning the Steam
+    libraries and shortcuts, generating app IDs, matching names,
+    looking games up, downloading and rendering grid images.
+
+    They run against a synthetic Steam directory (see steam_tree) and a
+    local stand-in for the SteamGridDB and IGDB APIs (see mock_api), so
+    they need neither a Steam installation nor network access.
+
+    Run from the repository root:
+        python -m benchmarks --manifests 5000 --shortcuts 10000 --latency 0.02
+"""
@@ -0,0 +1,144 @@
+"""
+    Measures benchmarks: wall time, throughput, latency percentiles
+    and peak memory.
+
+    A benchmark is a function that takes a Recorder and does its work,
+    timing every operation with recorder.time() (or adding latencies
+    measured some other way with recorder.add()).
+
+    Example:
+        def bench_parse(recorder):
+            for path in paths:
+                with recorder.time():
+                    parse(path)
+
+        result = measure("parse", bench_parse)
+        print(format_results([result]))
+"""
+
+import collections
+import contextlib
+import gc
+import math
+import threading
+import time
+import tracemalloc
+
+# The result of a benchmark:
+# name - Name of the benchmark
+# items - Number of operations
+# seconds - Wall time
+# throughput - Operations per second
+# p50, p90, p99, max - Latency percentiles of the operations, in milliseconds
+# peak_memory - Peak memory allocated by Python during the benchmark, in bytes
+Result = collections.namedtuple("Result", ["name", "items", "seconds", "throughput", "p50", "p90", "p99", "max", "peak_memory"])
+
+class Recorder(object):
+
+    """
+        Collects the latencies of the operations of a benchmark.
+        Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.items = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self, items=1):
+
+        """
+            Times one operation, that handles items items
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(time.perf_counter() - start, items)
+
+    def add(self, seconds, items=1):
+
+        """
+            Adds the latency of an operation that was timed elsewhere
+        """
+
+        with self._lock:
+            self.latencies.append(seconds)
+            self.items += items
+
+    def count(self, items):
+
+        """
+            Counts items handled by operations that are not timed one by one
+        """
+
+        with self._lock:
+            self.items += items
+
+def percentile(values, fraction):
+
+    """
+        Returns a percentile of sorted values (nearest rank)
+    """
+
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(math.ceil(fraction * len(values))) - 1))
+    return values[index]
+
+def measure(name, benchmark, trace_memory=True):
+
+    """
+        Runs a benchmark and measures it
+
+        Parameters:
+            name - Name of the benchmark
+            benchmark - Function that takes a Recorder
+            trace_memory - Whether to measure the peak memory. Tracing memory
+                           slows Python code down, so the timings are lower
+                           than without it. Defaults to True.
+
+        Returns:
+            A Result
+    """
+
+    recorder = Recorder()
+    gc.collect()
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        benchmark(recorder)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    latencies = sorted(latency * 1000 for latency in recorder.latencies)
+    items = recorder.items
+    return Result(name, items, seconds, items / seconds if seconds > 0 else 0.0,
+                  percentile(latencies, 0.5), percentile(latencies, 0.9), percentile(latencies, 0.99),
+                  latencies[-1] if latencies else 0.0, peak)
+
+def format_results(results):
+
+    """
+        Returns the results as a text table
+    """
+
+    header = ("benchmark", "items", "seconds", "items/s", "p50 ms", "p90 ms", "p99 ms", "max ms", "peak MB")
+    rows = [header]
+    for r in results:
+        rows.append((r.name, str(r.items), "{:.3f}".format(r.seconds), "{:.1f}".format(r.throughput),
+                     "{:.3f}".format(r.p50), "{:.3f}".format(r.p90), "{:.3f}".format(r.p99),
+                     "{:.3f}".format(r.max), "{:.1f}".format(r.peak_memory / (1024.0 * 1024.0))))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    lines = []
+    for row in rows:
+        lines.append("  ".join(cell.ljust(widths[0]) if i == 0 else cell.rjust(widths[i]) for i, cell in enumerate(row)))
+    return "\n".join(lines)
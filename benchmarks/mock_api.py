@@ -0,0 +1,217 @@
+"""
+    A local stand-in for the SteamGridDB and IGDB endpoints used by grid.py,
+    with a configurable latency and image sizes.
+
+    SteamGridDB:
+        GET  <steamgriddb_url>/search/autocomplete/<name>
+        GET  <steamgriddb_url>/grids/game/<id>
+    IGDB:
+        POST <igdb_url>/games
+        POST <igdb_url>/covers
+        POST <igdb_url>/multiquery
+    Images (with Range support):
+        GET  /images/grid/<id>.png
+        GET  /images/t_<size>/<id>.jpg
+
+    Every name is found, except a share of them (missing_ratio) picked
+    by their hash, so the same names are missing in every run.
+
+    Example:
+        with MockAPIServer(latency=0.02) as server:
+            client = SteamGridDB("key", base_url=server.steamgriddb_url)
+"""
+
+import collections
+import http.server
+import io
+import json
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+
+from PIL import Image
+
+_SEARCH = re.compile(r'search "([^"]*)"')
+_IDS = re.compile(r"where id\s*=\s*\(?([\d,\s]+)\)?")
+_MULTIQUERY = re.compile(r'query (\w+) "([^"]*)" \{(.*?)\};', re.S)
+_RANGE = re.compile(r"bytes=(\d+)-")
+
+def _name_id(name):
+    return zlib.crc32(name.lower().encode("utf-8")) % 1000000 + 1
+
+def _encode_image(size, image_format):
+
+    """
+        Returns a gradient image of the given size, encoded
+    """
+
+    gradient = Image.linear_gradient("L")
+    channels = (gradient, gradient.transpose(Image.FLIP_TOP_BOTTOM), gradient.transpose(Image.ROTATE_90))
+    im = Image.merge("RGB", [channel.resize(size) for channel in channels])
+    output = io.BytesIO()
+    im.save(output, image_format, quality=90)
+    return output.getvalue()
+
+class MockAPIServer(object):
+
+    """
+        The mock server, running on a background thread
+    """
+
+    def __init__(self, latency=0.0, grid_size=(920, 430), cover_size=(1080, 1440), missing_ratio=0.1):
+
+        """
+            Parameters:
+                latency - Seconds every request takes
+                grid_size - Size of the grid images
+                cover_size - Size of the cover images
+                missing_ratio - Share of the names that are not found
+        """
+
+        self.latency = latency
+        self.missing_ratio = missing_ratio
+        self.grid_image = _encode_image(grid_size, "PNG")
+        self.cover_image = _encode_image(cover_size, "JPEG")
+        self.requests = collections.Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self._server.server_address[:2])
+
+    @property
+    def steamgriddb_url(self):
+        return self.url + "/sgdb/api/v2"
+
+    @property
+    def igdb_url(self):
+        return self.url + "/igdb"
+
+    @property
+    def host(self):
+        return urllib.parse.urlsplit(self.url).netloc
+
+    def start(self):
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def is_missing(self, name):
+        return _name_id(name) % 1000 < self.missing_ratio * 1000
+
+    def _count(self, route, size):
+        with self._lock:
+            self.requests[route] += 1
+            self.bytes_sent += size
+
+    def _search(self, name):
+        if self.is_missing(name):
+            return []
+        return [{"id": _name_id(name), "name": name}]
+
+    def _igdb_query(self, endpoint, query):
+
+        """
+            Answers one IGDB query
+        """
+
+        if endpoint == "games":
+            match = _SEARCH.search(query)
+            if match is None or self.is_missing(match.group(1)):
+                return []
+            game_id = _name_id(match.group(1))
+            return [{"id": game_id, "cover": game_id, "slug": match.group(1).lower().replace(" ", "-")}]
+
+        if endpoint == "covers":
+            match = _IDS.search(query)
+            ids = [int(i) for i in match.group(1).split(",") if i.strip()] if match else []
+            host = self.host
+            return [{"id": i, "url": "//{}/images/t_thumb/{}.jpg".format(host, i), "width": 1080, "height": 1440} for i in ids]
+
+        return []
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, route, status, body, content_type, headers=None):
+                server._count(route, len(body))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, route, value):
+                self._send(route, 200, json.dumps(value).encode("utf-8"), "application/json")
+
+            def _image(self, route, data, content_type):
+                match = _RANGE.match(self.headers.get("Range", ""))
+                if match is None:
+                    self._send(route, 200, data, content_type)
+                    return
+                start = int(match.group(1))
+                if start >= len(data):
+                    self._send(route, 416, b"", content_type, {"Content-Range": "bytes */{}".format(len(data))})
+                    return
+                self._send(route, 206, data[start:], content_type,
+                           {"Content-Range": "bytes {}-{}/{}".format(start, len(data) - 1, len(data))})
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+
+                if path.startswith("/sgdb/api/v2/search/autocomplete/"):
+                    data = server._search(path.rsplit("/", 1)[1])
+                    self._json("steamgriddb/search", {"success": True, "data": data})
+                elif path.startswith("/sgdb/api/v2/grids/game/"):
+                    game_id = int(path.rsplit("/", 1)[1])
+                    url = "{}/images/grid/{}.png".format(server.url, game_id)
+                    self._json("steamgriddb/grids", {"success": True, "data": [{"id": game_id * 10, "url": url}]})
+                elif path.startswith("/images/grid/"):
+                    self._image("images/grid", server.grid_image, "image/png")
+                elif path.startswith("/images/"):
+                    self._image("images/cover", server.cover_image, "image/jpeg")
+                else:
+                    self._send("not_found", 404, b"", "text/plain")
+
+            def do_POST(self):
+                time.sleep(server.latency)
+                path = urllib.parse.urlsplit(self.path).path
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+
+                if path == "/igdb/multiquery":
+                    results = [{"name": name, "result": server._igdb_query(endpoint, query)}
+                               for endpoint, name, query in _MULTIQUERY.findall(body)]
+                    self._json("igdb/multiquery", results)
+                elif path in ("/igdb/games", "/igdb/covers"):
+                    endpoint = path.rsplit("/", 1)[1]
+                    self._json("igdb/" + endpoint, server._igdb_query(endpoint, body))
+                else:
+                    self._send("not_found", 404, b"", "text/plain")
+
+        return Handler
@@ -0,0 +1,299 @@
+"""
+    Runs the benchmarks against a synthetic Steam directory and the mock APIs,
+    and prints their results (and optionally writes them as JSON).
+
+    Benchmarks:
+        scan_manifests - utils.get_installed_games over all the libraries (items: manifests)
+        scan_shortcuts - utils.get_non_steam_games over all the users (items: shortcuts)
+        appids - utils.generate_appids_for_nonsteam_games, without memo (items: app IDs)
+        matching - NameMatcher.match of misspelled names against all the names (items: names)
+        sgdb_fetch - grid_fetcher.fetch_grids: search, list and download (items: games,
+                     latencies: HTTP requests)
+        download - downloader.download of grid images to files (items: images)
+        igdb_lookup - IGDB.search_games and IGDB.covers (items: games, latencies: HTTP requests)
+        render - artwork.render_variants of a cover into every variant (items: covers)
+        custom_grids - grid_images.create_grid_images, lookups, downloads and rendering on a process
+                       pool (items: games, latencies: time until every game is done)
+        catalog - catalog.Catalog.refresh, then lookups by app ID and of the Non-Steam games
+                  without grid images (items: queries, latencies: the refresh and every query)
+        startup - python steam.py, python nonsteam.py and "import utils" in a new interpreter,
+                  against the synthetic Steam directory (items: runs)
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import artwork
+import catalog
+import downloader
+import grid_fetcher
+import grid_images
+import igdb
+import name_matcher
+import request_scheduler
+import steam_environment
+import steamgriddb
+import utils
+
+from benchmarks import harness
+from benchmarks import mock_api
+from benchmarks import steam_tree
+
+BENCHMARKS = ("scan_manifests", "scan_shortcuts", "appids", "matching", "sgdb_fetch",
+              "download", "igdb_lookup", "render", "custom_grids", "catalog", "startup")
+
+# Folder of the scripts
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Commands timed by the startup benchmark, run in REPOSITORY
+STARTUP_COMMANDS = (
+    ("import utils", ["-c", "import utils"]),
+    ("steam.py", ["steam.py"]),
+    ("nonsteam.py", ["nonsteam.py"]),
+)
+
+# Modules the listing scripts should not need to import
+HEAVY_MODULES = ("PIL", "requests", "colorama", "concurrent.futures", "igdb", "artwork", "cProfile")
+
+class TimedScheduler(request_scheduler.RequestScheduler):
+
+    """
+        A RequestScheduler that adds the latency of every request to a Recorder
+    """
+
+    def __init__(self, recorder, **kwargs):
+        request_scheduler.RequestScheduler.__init__(self, **kwargs)
+        self.recorder = recorder
+
+    def request(self, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return request_scheduler.RequestScheduler.request(self, method, url, **kwargs)
+        finally:
+            self.recorder.add(time.perf_counter() - start, 0)
+
+def misspell(name, rng):
+
+    """
+        Returns a name the way a user might have typed it
+    """
+
+    roll = rng.random()
+    if roll < 0.3:
+        return name.lower()
+    if roll < 0.5:
+        return name.replace(" 2", " II").replace(" 3", " III")
+    if roll < 0.7:
+        return name + " GOTY"
+    if roll < 0.8 and len(name) > 4:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:]
+    return name
+
+class Benchmarks(object):
+
+    """
+        The benchmarks, sharing one synthetic Steam directory and mock server
+    """
+
+    def __init__(self, args, root, server):
+        self.args = args
+        self.root = root
+        self.server = server
+        self.rng = random.Random(args.seed)
+
+        print("Creating a synthetic Steam directory in {}...".format(root))
+        self.tree = steam_tree.create_steam_tree(root, args.libraries, args.manifests, args.users,
+                                                 args.shortcuts, args.overlap, args.seed)
+        self.env = steam_environment.SteamEnvironment(steam_environment.PathResolver(self.tree.install_path))
+        self.games = utils.get_non_steam_games(env=self.env)
+
+        # The mock server is not rate limited
+        self.rate_limits = dict(request_scheduler.HOST_RATE_LIMITS)
+        self.rate_limits[server.host] = (1000000, 1000000)
+        request_scheduler.HOST_RATE_LIMITS[server.host] = self.rate_limits[server.host]
+
+    def scheduler(self, recorder):
+        return TimedScheduler(recorder, host_rate_limits=self.rate_limits, retries=0)
+
+    def network_games(self):
+        return self.games[:self.args.games]
+
+    def output_folder(self, name):
+        folder = os.path.join(self.root, "output", name)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        return folder
+
+    def scan_manifests(self, recorder):
+        for _ in range(self.args.repeat):
+            start = time.perf_counter()
+            games = utils.get_installed_games(env=self.env)
+            recorder.add(time.perf_counter() - start, len(games))
+
+    def scan_shortcuts(self, recorder):
+        for _ in range(self.args.repeat):
+            utils._appid_cache.clear()
+            start = time.perf_counter()
+            games = utils.get_non_steam_games(env=self.env)
+            recorder.add(time.perf_counter() - start, len(games))
+
+    def appids(self, recorder):
+        pairs = [(game["name"], game["exe"]) for game in self.games]
+        for _ in range(self.args.repeat):
+            utils._appid_cache.clear()
+            for i in range(0, len(pairs), 1000):
+                chunk = pairs[i:i + 1000]
+                with recorder.time(len(chunk)):
+                    utils.generate_appids_for_nonsteam_games(chunk)
+
+    def matching(self, recorder):
+        with recorder.time(0):
+            matcher = name_matcher.NameMatcher(self.tree.names)
+        names = self.rng.sample(self.tree.names, min(len(self.tree.names), self.args.matches))
+        for name in names:
+            query = misspell(name, self.rng)
+            with recorder.time():
+                matcher.match(query)
+
+    def sgdb_fetch(self, recorder):
+        client = steamgriddb.SteamGridDB("benchmark", scheduler=self.scheduler(recorder),
+                                         base_url=self.server.steamgriddb_url)
+        folder = self.output_folder("sgdb_fetch")
+        jobs = [(game, os.path.join(folder, "{}.png".format(i))) for i, game in enumerate(self.network_games())]
+        grid_fetcher.fetch_grids(client, jobs, self.args.concurrency)
+        recorder.count(len(jobs))
+
+    def download(self, recorder):
+        scheduler = self.scheduler(harness.Recorder())
+        folder = self.output_folder("download")
+        url = self.server.url + "/images/grid/{}.png"
+
+        def download(i):
+            with recorder.time():
+                downloader.download(url.format(i), os.path.join(folder, "{}.png".format(i)), scheduler)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            list(executor.map(download, range(self.args.games)))
+
+    def igdb_lookup(self, recorder):
+        client = igdb.IGDB("benchmark", scheduler=self.scheduler(recorder), base_url=self.server.igdb_url)
+        found = client.search_games([game["name"] for game in self.network_games()])
+        client.covers([game["cover"] for game in found.values() if game])
+        recorder.count(len(self.network_games()))
+
+    def render(self, recorder):
+        for _ in range(self.args.renders):
+            with recorder.time():
+                artwork.render_variants(self.server.cover_image, artwork.DEFAULT_VARIANTS, "Benchmark Title")
+
+    def custom_grids(self, recorder):
+        client = igdb.IGDB("benchmark", scheduler=self.scheduler(harness.Recorder()), base_url=self.server.igdb_url)
+        folder = self.output_folder("custom_grids")
+        games = self.network_games()[:self.args.renders]
+        jobs = [(game, os.path.join(folder, "{}.png".format(i))) for i, game in enumerate(games)]
+
+        start = time.perf_counter()
+        grid_images.create_grid_images(jobs, igdb_client=client,
+                                 on_result=lambda game, success: recorder.add(time.perf_counter() - start))
+
+    def catalog(self, recorder):
+        games = catalog.Catalog(os.path.join(self.output_folder("catalog"), "catalog.sqlite"))
+        with recorder.time(0):
+            games.refresh(env=self.env)
+
+        shortcuts = self.rng.sample(self.games, min(len(self.games), self.args.matches))
+        for game in shortcuts:
+            with recorder.time():
+                games.find_by_appid(game["appid"])
+        for user in self.tree.users:
+            with recorder.time():
+                games.shortcuts_without_grid(user)
+        games.close()
+
+    def startup(self, recorder):
+        # A home folder where ~/.steam/steam is the synthetic installation, so the
+        # scripts find it, and their scan cache doesn't touch the real one
+        home = os.path.join(self.root, "home")
+        os.makedirs(os.path.join(home, ".steam"), exist_ok=True)
+        link = os.path.join(home, ".steam", "steam")
+        if not os.path.lexists(link):
+            os.symlink(self.tree.install_path, link)
+        env = dict(os.environ, HOME=home, USERPROFILE=home)
+
+        for name, arguments in STARTUP_COMMANDS:
+            # A first run fills the scan cache
+            subprocess.run([sys.executable] + arguments, cwd=REPOSITORY, env=env, stdout=subprocess.DEVNULL, check=True)
+
+            latencies = []
+            for _ in range(self.args.repeat):
+                start = time.perf_counter()
+                subprocess.run([sys.executable] + arguments, cwd=REPOSITORY, env=env, stdout=subprocess.DEVNULL, check=True)
+                latencies.append(time.perf_counter() - start)
+                recorder.add(latencies[-1])
+
+            # The modules imported by a run with a filled cache
+            output = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=REPOSITORY, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True).stderr
+            imported = set(line.rsplit("|", 1)[-1].strip() for line in output.splitlines() if line.startswith("import time:"))
+            heavy = [module for module in HEAVY_MODULES if module in imported]
+
+            print("  {}: {:.1f} ms{}".format(name, harness.percentile(sorted(latencies), 0.5) * 1000,
+                                            ", imports " + ", ".join(heavy) if heavy else ""))
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the Steam helpers")
+    parser.add_argument("--root", help="Folder for the synthetic Steam directory. Defaults to a temporary folder.")
+    parser.add_argument("--libraries", type=int, default=4, help="Number of Steam libraries")
+    parser.add_argument("--manifests", type=int, default=5000, help="Number of app manifests")
+    parser.add_argument("--users", type=int, default=3, help="Number of Steam users")
+    parser.add_argument("--shortcuts", type=int, default=10000, help="Number of Non-Steam games of every user")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Share of the Non-Steam games the users have in common")
+    parser.add_argument("--games", type=int, default=200, help="Number of games in the network benchmarks")
+    parser.add_argument("--renders", type=int, default=20, help="Number of images rendered")
+    parser.add_argument("--matches", type=int, default=2000, help="Number of names matched")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times the scans are repeated")
+    parser.add_argument("--concurrency", type=int, default=grid_fetcher.DEFAULT_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds every mock API request takes")
+    parser.add_argument("--missing", type=float, default=0.1, help="Share of the games the mock APIs don't find")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmarks to run. Defaults to all of them.")
+    parser.add_argument("--no-memory", action="store_true", help="Don't trace the peak memory (faster, more accurate timings)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="steamhelper-bench-")
+    results = []
+    try:
+        with mock_api.MockAPIServer(latency=args.latency, missing_ratio=args.missing) as server:
+            benchmarks = Benchmarks(args, root, server)
+            for name in args.only or BENCHMARKS:
+                print("Running {}...".format(name))
+                results.append(harness.measure(name, getattr(benchmarks, name), trace_memory=not args.no_memory))
+            requests = dict(server.requests)
+    finally:
+        if args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print()
+    print(harness.format_results(results))
+    print()
+    print("Mock API requests: {}".format(", ".join("{} {}".format(route, count) for route, count in sorted(requests.items()))))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "results": [r._asdict() for r in results], "requests": requests}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+    Creates synthetic Steam directories: an installation with a number of
+    libraries full of app manifests, and users with shortcuts.vdf files.
+
+    Example:
+        tree = create_steam_tree("/tmp/steam", libraries=4, manifests=5000, users=3, shortcuts=10000)
+        env = SteamEnvironment(PathResolver(tree.install_path))
+"""
+
+import collections
+import os
+import random
+import struct
+
+import binary_vdf
+
+# Words the game names are made of
+WORDS = (
+    "Age", "Battle", "Blade", "Castle", "City", "Dark", "Dawn", "Dead", "Dragon", "Dream",
+    "Empire", "Fall", "Fire", "Frontier", "Galaxy", "Ghost", "Hero", "Hollow", "Hunter", "Iron",
+    "Island", "Journey", "Kingdom", "Knight", "Legend", "Light", "Lost", "Machine", "Night", "Ocean",
+    "Origins", "Planet", "Quest", "Rise", "Road", "Shadow", "Sky", "Soul", "Space", "Star",
+    "Storm", "Sword", "Tales", "Tower", "Valley", "War", "Wild", "Winter", "World", "Zero",
+)
+
+# What was created
+SteamTree = collections.namedtuple("SteamTree", ["install_path", "libraries", "users", "names"])
+
+def game_name(rng):
+
+    """
+        Returns a random game name, sometimes with a sequel number or an edition
+    """
+
+    name = " ".join(rng.sample(WORDS, rng.randint(1, 4)))
+    roll = rng.random()
+    if roll < 0.2:
+        name += " {}".format(rng.randint(2, 5))
+    elif roll < 0.25:
+        name += " - Definitive Edition"
+    return name
+
+def _cstring(text):
+    return text.encode("utf-8") + b"\x00"
+
+def _binary_map(entries):
+
+    """
+        Encodes a dictionary as binary VDF (strings, integers and nested maps)
+    """
+
+    data = bytearray()
+    for key, value in entries.items():
+        if isinstance(value, dict):
+            data += bytes([binary_vdf.TYPE_MAP]) + _cstring(key) + _binary_map(value)
+        elif isinstance(value, int):
+            data += bytes([binary_vdf.TYPE_INT32]) + _cstring(key) + struct.pack("<i", value)
+        else:
+            data += bytes([binary_vdf.TYPE_STRING]) + _cstring(key) + _cstring(value)
+    data.append(binary_vdf.TYPE_END)
+    return bytes(data)
+
+def shortcuts_vdf(shortcuts):
+
+    """
+        Returns the contents of a shortcuts.vdf file listing the given
+        (name, exe) pairs
+    """
+
+    entries = {}
+    for i, (name, exe) in enumerate(shortcuts):
+        entries[str(i)] = {
+            "appid": -(i + 1),
+            "AppName": name,
+            "Exe": "\"{}\"".format(exe),
+            "StartDir": "\"{}\"".format(os.path.dirname(exe)),
+            "icon": "",
+            "LaunchOptions": "",
+            "IsHidden": 0,
+            "LastPlayTime": 0,
+            "tags": {"0": "Favorite"} if i % 7 == 0 else {},
+        }
+    return _binary_map({"shortcuts": entries}) + bytes([binary_vdf.TYPE_END])
+
+def app_manifest(appid, name):
+
+    """
+        Returns the contents of an appmanifest_<appid>.acf file
+    """
+
+    return (
+        "\"AppState\"\n{{\n"
+        "\t\"appid\"\t\t\"{appid}\"\n"
+        "\t\"Universe\"\t\t\"1\"\n"
+        "\t\"name\"\t\t\"{name}\"\n"
+        "\t\"StateFlags\"\t\t\"4\"\n"
+        "\t\"installdir\"\t\t\"{name}\"\n"
+        "\t\"SizeOnDisk\"\t\t\"{size}\"\n"
+        "\t\"UserConfig\"\n\t{{\n\t\t\"language\"\t\t\"english\"\n\t}}\n"
+        "\t\"InstalledDepots\"\n\t{{\n\t\t\"{depot}\"\n\t\t{{\n\t\t\t\"manifest\"\t\t\"{manifest}\"\n\t\t}}\n\t}}\n"
+        "}}\n"
+    ).format(appid=appid, name=name, size=appid * 1024, depot=appid + 1, manifest=appid * 7919)
+
+def library_folders(libraries):
+
+    """
+        Returns the contents of a libraryfolders.vdf file (new format)
+    """
+
+    lines = ["\"libraryfolders\"\n{\n"]
+    for i, library in enumerate(libraries):
+        lines.append("\t\"{}\"\n\t{{\n\t\t\"path\"\t\t\"{}\"\n\t\t\"label\"\t\t\"\"\n\t}}\n".format(
+            i, library.replace("\\", "\\\\")))
+    lines.append("}\n")
+    return "".join(lines)
+
+def create_steam_tree(root, libraries=2, manifests=1000, users=2, shortcuts=1000, overlap=0.5, seed=0):
+
+    """
+        Creates a synthetic Steam directory
+
+        Parameters:
+            root - Folder to create it in
+            libraries - Number of libraries, the installation included
+            manifests - Number of app manifests, spread over the libraries
+            users - Number of Steam users
+            shortcuts - Number of Non-Steam games of every user
+            overlap - Share of the Non-Steam games every user has in common with the others
+            seed - Seed of the random names
+
+        Returns:
+            A SteamTree
+    """
+
+    rng = random.Random(seed)
+
+    install_path = os.path.join(root, "Steam")
+    library_paths = [install_path] + [os.path.join(root, "Library{}".format(i)) for i in range(1, libraries)]
+    for library in library_paths:
+        os.makedirs(os.path.join(library, "steamapps"), exist_ok=True)
+
+    with open(os.path.join(install_path, "steamapps", "libraryfolders.vdf"), "w", encoding="utf-8") as f:
+        f.write(library_folders(library_paths))
+
+    for i in range(manifests):
+        appid = 10 + i * 10
+        library = library_paths[i % len(library_paths)]
+        path = os.path.join(library, "steamapps", "appmanifest_{}.acf".format(appid))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(app_manifest(appid, game_name(rng)))
+
+    shared = [(game_name(rng), "C:\\Games\\Shared{}\\game.exe".format(i)) for i in range(int(shortcuts * overlap))]
+    user_ids = [str(10000000 + i) for i in range(users)]
+    names = set(name for name, exe in shared)
+    for user in user_ids:
+        own = [(game_name(rng), "C:\\Games\\{}\\{}\\game.exe".format(user, i)) for i in range(shortcuts - len(shared))]
+        names.update(name for name, exe in own)
+
+        config = os.path.join(install_path, "userdata", user, "config")
+        os.makedirs(os.path.join(config, "grid"), exist_ok=True)
+        with open(os.path.join(config, "shortcuts.vdf"), "wb") as f:
+            f.write(shortcuts_vdf(shared + own))
+
+    return SteamTree(install_path, library_paths, user_ids, sorted(names))
@@ -0,0 +1,251 @@
+"""
+    Reader for Steam's binary VDF format, as used by shortcuts.vdf.
+
+    A binary VDF file is a tree of typed key/value pairs. Every pair starts
+    with a type byte, followed by a null terminated key and the value:
+
+        0x00 - Nested map, terminated by 0x08
+        0x01 - Null terminated string
+        0x02 - 32bit integer
+        0x03 - 32bit float
+        0x07 - 64bit unsigned integer
+        0x0A - 64bit integer
+        0x08 - End of the current map
+"""
+
+import mmap
+import struct
+
+TYPE_MAP = 0x00
+TYPE_STRING = 0x01
+TYPE_INT32 = 0x02
+TYPE_FLOAT32 = 0x03
+TYPE_POINTER = 0x04
+TYPE_WIDESTRING = 0x05
+TYPE_COLOR = 0x06
+TYPE_UINT64 = 0x07
+TYPE_END = 0x08
+TYPE_INT64 = 0x0A
+TYPE_END_ALT = 0x0B
+
+_INT32 = struct.Struct("<i")
+_FLOAT32 = struct.Struct("<f")
+_UINT64 = struct.Struct("<Q")
+_INT64 = struct.Struct("<q")
+
+# Steam does not write the shortcut keys with a consistent case
+# (for example "AppName" and "appname"), so they are normalized to these names
+SHORTCUT_FIELDS = {key.lower(): key for key in (
+    "appid",
+    "AppName",
+    "Exe",
+    "StartDir",
+    "icon",
+    "ShortcutPath",
+    "LaunchOptions",
+    "IsHidden",
+    "AllowDesktopConfig",
+    "AllowOverlay",
+    "OpenVR",
+    "Devkit",
+    "DevkitGameID",
+    "DevkitOverrideAppID",
+    "LastPlayTime",
+    "FlatpakAppID",
+    "tags",
+)}
+
+def _read_string(data, pos):
+
+    """
+        Reads a null terminated UTF-8 string starting at pos.
+
+        Returns:
+            A tuple of the string and the position after the terminator
+    """
+
+    end = data.find(b"\x00", pos)
+    if end == -1:
+        raise ValueError("Unterminated string at offset {}".format(pos))
+    return data[pos:end].decode("utf-8", "replace"), end + 1
+
+def _read_value(data, pos, value_type):
+
+    """
+        Reads a value of the given type starting at pos.
+
+        Returns:
+            A tuple of the value and the position after it
+    """
+
+    if value_type == TYPE_MAP:
+        return _read_map(data, pos)
+    if value_type == TYPE_STRING:
+        return _read_string(data, pos)
+    if value_type in (TYPE_INT32, TYPE_POINTER, TYPE_COLOR):
+        return _INT32.unpack_from(data, pos)[0], pos + 4
+    if value_type == TYPE_FLOAT32:
+        return _FLOAT32.unpack_from(data, pos)[0], pos + 4
+    if value_type == TYPE_UINT64:
+        return _UINT64.unpack_from(data, pos)[0], pos + 8
+    if value_type == TYPE_INT64:
+        return _INT64.unpack_from(data, pos)[0], pos + 8
+    if value_type == TYPE_WIDESTRING:
+        end = pos
+        while data[end:end + 2] != b"\x00\x00":
+            if end >= len(data):
+                raise ValueError("Unterminated wide string at offset {}".format(pos))
+            end += 2
+        return data[pos:end].decode("utf-16-le", "replace"), end + 2
+    raise ValueError("Unknown value type 0x{:02x} at offset {}".format(value_type, pos - 1))
+
+def _read_map(data, pos):
+
+    """
+        Reads the key/value pairs of a map starting at pos, until its end marker.
+
+        Returns:
+            A tuple of the map as a dictionary and the position after the end marker
+    """
+
+    result = {}
+    length = len(data)
+    while pos < length:
+        value_type = data[pos]
+        pos += 1
+        if value_type in (TYPE_END, TYPE_END_ALT):
+            return result, pos
+        key, pos = _read_string(data, pos)
+        result[key], pos = _read_value(data, pos, value_type)
+
+    raise ValueError("Unexpected end of data")
+
+def loads(data):
+
+    """
+        Parses binary VDF data into a dictionary
+
+        Parameters:
+            data - The binary VDF contents (bytes, bytearray or mmap)
+    """
+
+    result = {}
+    pos = 0
+    length = len(data)
+    while pos < length:
+        value_type = data[pos]
+        pos += 1
+        if value_type in (TYPE_END, TYPE_END_ALT):
+            break
+        key, pos = _read_string(data, pos)
+        result[key], pos = _read_value(data, pos, value_type)
+
+    return result
+
+def _open_data(f, use_mmap):
+
+    """
+        Returns the contents of an open binary file, either read in one
+        go or memory mapped.
+    """
+
+    if use_mmap:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be memory mapped
+            return b""
+    return f.read()
+
+def load(path, use_mmap=False):
+
+    """
+        Parses a binary VDF file into a dictionary
+
+        Parameters:
+            path - Path of the binary VDF file
+            use_mmap - Whether to memory map the file instead of reading it.
+                       Defaults to False.
+    """
+
+    with open(path, "rb") as f:
+        data = _open_data(f, use_mmap)
+        try:
+            return loads(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+def normalize_shortcut(entry):
+
+    """
+        Converts a raw shortcut map into a shortcut record, with the keys
+        normalized to the names in SHORTCUT_FIELDS and the tags as a list.
+        Unknown keys are kept as they are.
+    """
+
+    shortcut = {}
+    for key, value in entry.items():
+        key = SHORTCUT_FIELDS.get(key.lower(), key)
+        if key == "tags" and isinstance(value, dict):
+            value = list(value.values())
+        shortcut[key] = value
+
+    return shortcut
+
+def iter_shortcuts(path, use_mmap=False):
+
+    """
+        Parses a shortcuts.vdf file lazily, yielding a record for
+        each Non-Steam game as soon as it has been read.
+
+        Every record is a dictionary containing all the fields of the
+        shortcut (see SHORTCUT_FIELDS). For example:
+        {
+            "appid": -1234567890,
+            "AppName": "Overwatch",
+            "Exe": "\"D:\\Program Files\\Overwatch\\Overwatch Launcher.exe\"",
+            "StartDir": "\"D:\\Program Files\\Overwatch\\\"",
+            "LaunchOptions": "",
+            "LastPlayTime": 1571234567,
+            "tags": ["Favorite"],
+            ...
+        }
+
+        Parameters:
+            path - Path of the shortcuts.vdf file
+            use_mmap - Whether to memory map the file instead of reading it.
+                       Defaults to False.
+
+        Raises:
+            ValueError - If the file is not a valid shortcuts.vdf file
+    """
+
+    with open(path, "rb") as f:
+        data = _open_data(f, use_mmap)
+        try:
+            if not data:
+                return
+
+            # The file is a single "shortcuts" map of numbered entries
+            if data[0] != TYPE_MAP:
+                raise ValueError("Not a shortcuts file: {}".format(path))
+            root, pos = _read_string(data, 1)
+            if root.lower() != "shortcuts":
+                raise ValueError("Not a shortcuts file: {}".format(path))
+
+            length = len(data)
+            while pos < length:
+                value_type = data[pos]
+                pos += 1
+                if value_type in (TYPE_END, TYPE_END_ALT):
+                    return
+                _, pos = _read_string(data, pos)
+                value, pos = _read_value(data, pos, value_type)
+                if value_type == TYPE_MAP:
+                    yield normalize_shortcut(value)
+
+            raise ValueError("Unexpected end of data in {}".format(path))
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
@@ -0,0 +1,575 @@
+"""
+    Local catalog of the Steam libraries, installed games, Non-Steam games
+    and the grid images of the Non-Steam games, in an SQLite database.
+
+    A refresh scans the Steam directory (reusing the scan cache, so only
+    the files that changed are parsed) and updates the catalog in one
+    transaction, writing only the rows that changed. Queries only read the
+    database, so they don't touch the Steam directory and can run while a
+    refresh is going on.
+
+    Example:
+        catalog = Catalog()
+        catalog.refresh(cache=ScanCache())
+        for game in catalog.shortcuts_without_grid():
+            print(game.name)
+        print(catalog.find_by_appid(228980))
+
+    From the command line:
+        python catalog.py refresh
+        python catalog.py missing-grids --format tsv
+        python catalog.py appid 228980
+"""
+
+import argparse
+import collections
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import cli
+import records
+import scan_cache
+import sync_manifest
+import utils
+
+# Default location of the catalog database
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".steamhelper", "catalog.sqlite")
+
+# Bumped whenever the schema changes. The catalog only holds what a refresh
+# finds, so an older catalog is dropped and rebuilt by the next refresh.
+VERSION = 1
+
+# Extensions of the grid images Steam uses
+GRID_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# The grid image status of a Non-Steam game:
+# has_grid - Whether its grid folder has an image for it
+# source - Where the image came from (see sync_manifest.SOURCE_*), None if grid.py didn't sync it
+# next_attempt - When grid.py tries again to get an image that could not be found (as time.time()), or None
+ArtworkStatus = collections.namedtuple("ArtworkStatus", ["has_grid", "source", "next_attempt"])
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)",
+    "CREATE TABLE IF NOT EXISTS libraries (path TEXT PRIMARY KEY, games INTEGER NOT NULL)",
+    """CREATE TABLE IF NOT EXISTS installed_games (
+        library TEXT NOT NULL,
+        appid INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        PRIMARY KEY (library, appid)
+    )""",
+    "CREATE INDEX IF NOT EXISTS installed_games_appid ON installed_games (appid)",
+    "CREATE INDEX IF NOT EXISTS installed_games_name ON installed_games (name COLLATE NOCASE)",
+    # The primary key also serves the lookups by user
+    """CREATE TABLE IF NOT EXISTS shortcuts (
+        user TEXT NOT NULL,
+        appid INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        exe TEXT NOT NULL,
+        has_grid INTEGER NOT NULL,
+        grid_source TEXT,
+        grid_next_attempt REAL,
+        PRIMARY KEY (user, appid)
+    )""",
+    "CREATE INDEX IF NOT EXISTS shortcuts_appid ON shortcuts (appid)",
+    "CREATE INDEX IF NOT EXISTS shortcuts_name ON shortcuts (name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS shortcuts_missing_grid ON shortcuts (user) WHERE has_grid = 0",
+)
+
+def _to_sqlite(appid):
+
+    """
+        Returns an app ID as a signed 64-bit integer, which is what SQLite stores.
+        The app IDs of Non-Steam games have their highest bit set.
+    """
+
+    appid = int(appid)
+    return appid - (1 << 64) if appid >= 1 << 63 else appid
+
+def _from_sqlite(value):
+    return value + (1 << 64) if value < 0 else value
+
+def _like(pattern):
+
+    """
+        Returns a shell-style pattern (* and ?) as a LIKE pattern (escaped with \\)
+    """
+
+    pattern = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return pattern.replace("*", "%").replace("?", "_")
+
+def grid_images(folder):
+
+    """
+        Returns the names of the grid images in a grid folder, lowercased
+    """
+
+    try:
+        with os.scandir(folder) as entries:
+            return set(entry.name.lower() for entry in entries
+                       if entry.name.lower().endswith(GRID_EXTENSIONS) and entry.is_file())
+    except OSError:
+        return set()
+
+def artwork_status(appid, images, manifest):
+
+    """
+        Returns the ArtworkStatus of a Non-Steam game
+
+        Parameters:
+            appid - The app ID of the game
+            images - The names of the images in the grid folder of its user (see grid_images)
+            manifest - The SyncManifest of the grid folder
+    """
+
+    has_grid = any("{}{}".format(appid, extension) in images for extension in GRID_EXTENSIONS)
+    entry = manifest.entry(appid) or {}
+    return ArtworkStatus(has_grid, entry.get("source") if has_grid else None,
+                         entry.get("next_attempt") if not has_grid else None)
+
+class Catalog(object):
+
+    """
+        The SQLite catalog. Safe to use from several threads.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+
+        """
+            Opens the catalog, creating it if needed
+
+            Parameters:
+                path - Location of the catalog database. ":memory:" keeps it in memory.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            # Readers (other processes) are not blocked by a refresh
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+            for table in ("meta", "libraries", "installed_games", "shortcuts"):
+                self._db.execute("DROP TABLE IF EXISTS " + table)
+            self._db.execute("PRAGMA user_version = {}".format(VERSION))
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def _set_refreshed(self, name):
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", ("refreshed_" + name, time.time()))
+
+    def refreshed(self, name):
+
+        """
+            Returns when a part of the catalog ("installed", "shortcuts" or "artwork")
+            was last refreshed (as time.time()), or None if it never was
+        """
+
+        rows = self._query("SELECT value FROM meta WHERE key = ?", ("refreshed_" + name,))
+        return rows[0][0] if rows else None
+
+    def _replace_rows(self, table, columns, keys, rows):
+
+        """
+            Makes a table hold exactly the given rows, only writing the rows
+            that changed, so the indexes aren't rebuilt when little changed.
+            Must be called in a transaction, with the lock held.
+
+            Parameters:
+                table - The table
+                columns - Its columns, in order
+                keys - Number of leading columns that make up its primary key
+                rows - The rows, as tuples of the columns
+        """
+
+        current = {row[:keys]: row for row in self._db.execute("SELECT {} FROM {}".format(", ".join(columns), table))}
+        wanted = {row[:keys]: row for row in rows}
+
+        where = " AND ".join("{} = ?".format(column) for column in columns[:keys])
+        self._db.executemany("DELETE FROM {} WHERE {}".format(table, where), [key for key in current if key not in wanted])
+        self._db.executemany("INSERT OR REPLACE INTO {} VALUES ({})".format(table, ", ".join("?" * len(columns))),
+                             [row for key, row in wanted.items() if current.get(key) != row])
+
+    def _resolve(self, env):
+
+        """
+            Resolves the Steam installation, its libraries and its users before
+            anything is scanned, so a refresh that can't find Steam fails
+            without changing the catalog
+
+            Raises:
+                OSError - If the installation or its libraries could not be found
+                SyntaxError - If libraryfolders.vdf could not be parsed
+        """
+
+        env = env or utils.get_default_environment()
+        env.install_path
+        env.libraries
+        env.users
+        return env
+
+    def _installed_rows(self, cache, env):
+
+        """
+            Scans the installed games
+
+            Returns:
+                A tuple of the rows of the libraries table and of the installed_games table
+        """
+
+        rows = [(game.library, game.appid, game.name) for game in utils.iter_installed_games(cache, env=env)]
+        games = collections.Counter(library for library, appid, name in rows)
+        return [(library, games[library]) for library in env.libraries], rows
+
+    def _shortcut_rows(self, cache, env):
+
+        """
+            Reads the Non-Steam games and the status of their grid images
+
+            Returns:
+                The rows of the shortcuts table
+        """
+
+        folders = {}
+        rows = []
+
+        for game in utils.iter_non_steam_games(cache, env=env):
+            if game.user not in folders:
+                folder = env.grid_folder(game.user)
+                folders[game.user] = (grid_images(folder), sync_manifest.SyncManifest(folder))
+            status = artwork_status(game.appid, *folders[game.user])
+            rows.append((game.user, _to_sqlite(game.appid), game.name, game.exe,
+                         int(status.has_grid), status.source, status.next_attempt))
+
+        return rows
+
+    def _write_installed(self, library_rows, rows):
+        self._replace_rows("libraries", ("path", "games"), 1, library_rows)
+        self._replace_rows("installed_games", ("library", "appid", "name"), 2, rows)
+        self._set_refreshed("installed")
+
+    def _write_shortcuts(self, rows):
+        self._replace_rows("shortcuts", ("user", "appid", "name", "exe", "has_grid", "grid_source", "grid_next_attempt"), 2, rows)
+        self._set_refreshed("shortcuts")
+        self._set_refreshed("artwork")
+
+    def refresh_installed(self, cache=None, env=None):
+
+        """
+            Updates the libraries and installed games to the ones found now
+
+            Parameters:
+                cache - A ScanCache, so only the manifests that changed are parsed.
+                        Defaults to None, which parses every manifest.
+                env - The SteamEnvironment to use. Defaults to the shared environment.
+
+            Returns:
+                The number of installed games
+
+            Raises:
+                OSError, SyntaxError - If Steam could not be found (see _resolve).
+                                       The catalog is left as it was.
+        """
+
+        env = self._resolve(env)
+        library_rows, rows = self._installed_rows(cache, env)
+
+        with self._lock, self._db:
+            self._write_installed(library_rows, rows)
+
+        return len(rows)
+
+    def refresh_shortcuts(self, cache=None, env=None):
+
+        """
+            Updates the Non-Steam games, and the status of their grid images,
+            to the ones found now
+
+            Parameters:
+                cache - A ScanCache, so only the shortcuts.vdf files that changed are parsed.
+                        Defaults to None, which parses every file.
+                env - The SteamEnvironment to use. Defaults to the shared environment.
+
+            Returns:
+                The number of Non-Steam games
+
+            Raises:
+                OSError, SyntaxError - If Steam could not be found (see _resolve).
+                                       The catalog is left as it was.
+        """
+
+        env = self._resolve(env)
+        rows = self._shortcut_rows(cache, env)
+
+        with self._lock, self._db:
+            self._write_shortcuts(rows)
+
+        return len(rows)
+
+    def refresh_artwork(self, env=None):
+
+        """
+            Updates the status of the grid images of the Non-Steam games
+            in the catalog, without reading their shortcuts.vdf files again
+            (for example after running grid.py)
+
+            Parameters:
+                env - The SteamEnvironment to use. Defaults to the shared environment.
+
+            Raises:
+                OSError, SyntaxError - If Steam could not be found (see _resolve).
+                                       The catalog is left as it was.
+        """
+
+        env = self._resolve(env)
+        folders = {}
+        updates = []
+
+        for user, value, has_grid, source, next_attempt in self._query(
+                "SELECT user, appid, has_grid, grid_source, grid_next_attempt FROM shortcuts"):
+            if user not in folders:
+                folder = env.grid_folder(user)
+                folders[user] = (grid_images(folder), sync_manifest.SyncManifest(folder))
+            status = artwork_status(_from_sqlite(value), *folders[user])
+            if status != (bool(has_grid), source, next_attempt):
+                updates.append((int(status.has_grid), status.source, status.next_attempt, user, value))
+
+        with self._lock, self._db:
+            self._db.executemany("UPDATE shortcuts SET has_grid = ?, grid_source = ?, grid_next_attempt = ? "
+                                 "WHERE user = ? AND appid = ?", updates)
+            self._set_refreshed("artwork")
+
+    def refresh(self, cache=None, env=None):
+
+        """
+            Refreshes the whole catalog. Everything is scanned first and then
+            written in one transaction, so a refresh that fails leaves the
+            previous catalog intact.
+
+            Parameters:
+                cache - A ScanCache, so only the files that changed are parsed.
+                        Defaults to None, which parses every file.
+                env - The SteamEnvironment to use. Defaults to the shared environment.
+
+            Returns:
+                A tuple of the number of installed games and Non-Steam games
+
+            Raises:
+                OSError, SyntaxError - If Steam could not be found (see _resolve).
+                                       The catalog is left as it was.
+        """
+
+        env = self._resolve(env)
+        library_rows, installed_rows = self._installed_rows(cache, env)
+        shortcut_rows = self._shortcut_rows(cache, env)
+
+        with self._lock, self._db:
+            self._write_installed(library_rows, installed_rows)
+            self._write_shortcuts(shortcut_rows)
+
+        return len(installed_rows), len(shortcut_rows)
+
+    @staticmethod
+    def _installed_game(row):
+        library, appid, name = row
+        return records.InstalledGame(appid, name, library)
+
+    @staticmethod
+    def _shortcut(row):
+        user, appid, name, exe = row[:4]
+        return records.Shortcut(_from_sqlite(appid), name, exe, user)
+
+    def libraries(self):
+
+        """
+            Returns a list of (library path, number of installed games) tuples
+        """
+
+        return self._query("SELECT path, games FROM libraries ORDER BY path")
+
+    def installed_games(self, library=None, name=None):
+
+        """
+            Returns the installed games, as records.InstalledGame records sorted by name
+
+            Parameters:
+                library - Only the games of this library folder. Defaults to None.
+                name - Only the games whose name matches this pattern (* and ?), ignoring case.
+                       Defaults to None.
+        """
+
+        sql = "SELECT library, appid, name FROM installed_games WHERE 1"
+        parameters = []
+        if library is not None:
+            sql += " AND library = ?"
+            parameters.append(library)
+        if name is not None:
+            sql += " AND name LIKE ? ESCAPE '\\'"
+            parameters.append(_like(name))
+
+        return [self._installed_game(row) for row in self._query(sql + " ORDER BY name COLLATE NOCASE", parameters)]
+
+    def shortcuts(self, user=None, name=None, has_grid=None):
+
+        """
+            Returns the Non-Steam games, as records.Shortcut records sorted by user and name
+
+            Parameters:
+                user - Only the games of this Steam user ID. Defaults to None.
+                name - Only the games whose name matches this pattern (* and ?), ignoring case.
+                       Defaults to None.
+                has_grid - Only the games that have (True) or lack (False) a grid image.
+                           Defaults to None.
+        """
+
+        sql = "SELECT user, appid, name, exe FROM shortcuts WHERE 1"
+        parameters = []
+        if user is not None:
+            sql += " AND user = ?"
+            parameters.append(str(user))
+        if name is not None:
+            sql += " AND name LIKE ? ESCAPE '\\'"
+            parameters.append(_like(name))
+        if has_grid is not None:
+            sql += " AND has_grid = ?"
+            parameters.append(int(has_grid))
+
+        return [self._shortcut(row) for row in self._query(sql + " ORDER BY user, name COLLATE NOCASE", parameters)]
+
+    def shortcuts_without_grid(self, user=None):
+
+        """
+            Returns the Non-Steam games that have no grid image,
+            as records.Shortcut records
+        """
+
+        return self.shortcuts(user=user, has_grid=False)
+
+    def artwork(self, user, appid):
+
+        """
+            Returns the ArtworkStatus of a Non-Steam game, or None if it is not in the catalog
+        """
+
+        rows = self._query("SELECT has_grid, grid_source, grid_next_attempt FROM shortcuts WHERE user = ? AND appid = ?",
+                           (str(user), _to_sqlite(appid)))
+        return ArtworkStatus(bool(rows[0][0]), rows[0][1], rows[0][2]) if rows else None
+
+    def find_by_appid(self, appid):
+
+        """
+            Returns the installed games and Non-Steam games with an app ID,
+            as records.InstalledGame and records.Shortcut records
+        """
+
+        appid = _to_sqlite(appid)
+        installed = self._query("SELECT library, appid, name FROM installed_games WHERE appid = ?", (appid,))
+        shortcuts = self._query("SELECT user, appid, name, exe FROM shortcuts WHERE appid = ?", (appid,))
+        return [self._installed_game(row) for row in installed] + [self._shortcut(row) for row in shortcuts]
+
+    def counts(self):
+
+        """
+            Returns the number of libraries, installed games, Non-Steam games
+            and Non-Steam games without a grid image, as a dictionary
+        """
+
+        with self._lock:
+            count = lambda sql: self._db.execute(sql).fetchone()[0]
+            return {
+                "libraries": count("SELECT COUNT(*) FROM libraries"),
+                "installed_games": count("SELECT COUNT(*) FROM installed_games"),
+                "shortcuts": count("SELECT COUNT(*) FROM shortcuts"),
+                "shortcuts_without_grid": count("SELECT COUNT(*) FROM shortcuts WHERE has_grid = 0"),
+            }
+
+    def close(self):
+
+        """
+            Closes the catalog database
+        """
+
+        with self._lock:
+            self._db.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python catalog.py", description="Local catalog of the Steam games")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Location of the catalog database")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    refresh = commands.add_parser("refresh", help="Scan the Steam directory and replace the catalog")
+    refresh.add_argument("--artwork", action="store_true", help="Only update the status of the grid images")
+    refresh.add_argument("--no-cache", action="store_true", help="Parse every file, without the scan cache")
+
+    commands.add_parser("counts", help="Print the number of games")
+
+    for name, description in (("installed", "List the installed games"),
+                              ("nonsteam", "List the Non-Steam games"),
+                              ("missing-grids", "List the Non-Steam games without a grid image"),
+                              ("appid", "List the games with an app ID")):
+        command = commands.add_parser(name, help=description, description=description)
+        if name == "appid":
+            command.add_argument("appid", type=int, help="The app ID")
+        else:
+            command.add_argument("--name", help="Only list the games whose name matches this pattern (* and ?), ignoring case")
+        if name == "installed":
+            command.add_argument("--library", metavar="PATH", help="Only list the games of this library folder")
+        elif name != "appid":
+            command.add_argument("--user", metavar="ID", help="Only list the games of this Steam user ID")
+        command.add_argument("--format", choices=cli.FORMATS, default="ndjson", help="Output format. Defaults to ndjson.")
+        command.add_argument("--no-header", action="store_true", help="Don't write the header line of the TSV format")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    catalog = Catalog(args.path)
+
+    if args.command == "refresh":
+        started = time.time()
+        try:
+            if args.artwork:
+                catalog.refresh_artwork()
+            else:
+                catalog.refresh(None if args.no_cache else scan_cache.ScanCache())
+        except (OSError, SyntaxError) as e:
+            print("Could not find the Steam installation, the catalog was not changed.", file=sys.stderr)
+            print(e, file=sys.stderr)
+            return 1
+        print("Refreshed the catalog in {:.2f}s: {}".format(time.time() - started, catalog.counts()), file=sys.stderr)
+        return 0
+
+    if args.command == "counts":
+        for name, count in catalog.counts().items():
+            print("{}\t{}".format(name, count))
+        return 0
+
+    if args.command == "installed":
+        games, fields = catalog.installed_games(args.library, args.name), cli.FIELDS["installed"]
+    elif args.command == "appid":
+        games, fields = catalog.find_by_appid(args.appid), ("appid", "name", "library", "exe", "user")
+    else:
+        has_grid = False if args.command == "missing-grids" else None
+        games, fields = catalog.shortcuts(args.user, args.name, has_grid), cli.FIELDS["nonsteam"]
+
+    cli.write_to_stdout(games, fields, args.format, not args.no_header)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
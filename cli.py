@@ -0,0 +1,245 @@
+"""
+    Lists installed Steam games and Non-Steam games in a format other
+    programs can read, writing every game as soon as it is found.
+
+    Formats:
+        ndjson - One JSON object per line (the default)
+        json - A JSON array of objects
+        tsv - Tab separated values, with a header line
+
+    Examples:
+        python cli.py installed --fields appid,name
+        python cli.py installed --library "D:\\SteamLibrary" --format tsv
+        python cli.py nonsteam --user 12345678 --name "*dragon*"
+
+    Messages (a missing shortcuts.vdf, an unreadable manifest, ...) are
+    written to stderr, so stdout only has the games.
+
+    In the JSON formats the app IDs are strings: the IDs of Non-Steam games
+    are larger than 2^53, which JavaScript and jq can't read as numbers.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import sys
+
+import scan_cache
+import utils
+
+# The fields of the games of every listing, in their default order
+FIELDS = {
+    "installed": ("appid", "name", "library"),
+    "nonsteam": ("appid", "name", "exe", "user"),
+}
+
+FORMATS = ("ndjson", "json", "tsv")
+
+# Printed to stderr when a listing finds nothing
+NOT_FOUND = {
+    "installed": "Could not find any Steam games installed on your system.",
+    "nonsteam": "Could not find any Non-Steam games in your Steam library.",
+}
+
+# Characters escaped in TSV values
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def iter_games(listing, cache=None, users=None, libraries=None, name=None):
+
+    """
+        Yields the games of a listing, as they are found
+
+        Parameters:
+            listing - "installed" or "nonsteam"
+            cache - A ScanCache. Defaults to None, which parses every file.
+            users - User IDs to list the Non-Steam games of. Defaults to None, which lists every user.
+            libraries - Library folders to list the installed games of. Defaults to None, which lists every library.
+            name - A shell-style pattern (*, ?, [seq]) the names must match, ignoring case.
+                   Defaults to None, which lists every name.
+    """
+
+    if listing == "installed":
+        games = utils.iter_installed_games(cache=cache, libraries=libraries)
+    else:
+        games = utils.iter_non_steam_games(cache=cache, users=users)
+
+    if name is None:
+        yield from games
+        return
+
+    pattern = name.lower()
+    for game in games:
+        if fnmatch.fnmatchcase(game["name"].lower(), pattern):
+            yield game
+
+def _json_object(game, fields):
+
+    """
+        Returns the fields of a game as a dictionary to write as JSON,
+        with the app ID as a string
+    """
+
+    data = {field: game.get(field) for field in fields}
+    if data.get("appid") is not None:
+        data["appid"] = str(data["appid"])
+    return data
+
+def write_ndjson(games, fields, stream):
+    for game in games:
+        stream.write(json.dumps(_json_object(game, fields), ensure_ascii=False) + "\n")
+        stream.flush()
+
+def write_json(games, fields, stream):
+    stream.write("[")
+    separator = "\n"
+    for game in games:
+        stream.write(separator + json.dumps(_json_object(game, fields), ensure_ascii=False))
+        stream.flush()
+        separator = ",\n"
+    stream.write("\n]\n" if separator != "\n" else "]\n")
+
+def write_tsv(games, fields, stream, header=True):
+    if header:
+        stream.write("\t".join(fields) + "\n")
+    for game in games:
+        values = ("" if game.get(field) is None else str(game.get(field)) for field in fields)
+        stream.write("\t".join(value.translate(_TSV_ESCAPES) for value in values) + "\n")
+        stream.flush()
+
+def write_games(games, fields, output_format="ndjson", stream=None, header=True):
+
+    """
+        Writes games to a stream, one at a time
+
+        Parameters:
+            games - An iterable of game dictionaries
+            fields - The fields of the games to write, in order
+            output_format - One of FORMATS. Defaults to "ndjson".
+            stream - Where to write. Defaults to sys.stdout.
+            header - Whether to write the header line of the TSV format. Defaults to True.
+
+        Returns:
+            The number of games written
+    """
+
+    stream = stream or sys.stdout
+    written = 0
+
+    def count(games):
+        nonlocal written
+        for game in games:
+            written += 1
+            yield game
+
+    if output_format == "ndjson":
+        write_ndjson(count(games), fields, stream)
+    elif output_format == "json":
+        write_json(count(games), fields, stream)
+    elif output_format == "tsv":
+        write_tsv(count(games), fields, stream, header)
+    else:
+        raise ValueError("Unknown format: " + output_format)
+
+    return written
+
+def write_to_stdout(games, fields, output_format="ndjson", header=True):
+
+    """
+        Writes games to stdout (see write_games), encoded as UTF-8 whatever
+        the locale is, so names in any language can be written. The messages
+        the helpers print while the games are found go to stderr, and a reader
+        that stops reading (for example "| head") is not an error.
+
+        Returns:
+            The number of games written, or None if the reader stopped reading
+    """
+
+    output = sys.stdout
+    # A piped stdout uses the locale encoding (cp1252 on many Windows systems)
+    if hasattr(output, "reconfigure"):
+        output.reconfigure(encoding="utf-8")
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return write_games(games, fields, output_format, output, header)
+    except BrokenPipeError:
+        # Point stdout at devnull so flushing it on exit doesn't fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), output.fileno())
+        return None
+
+def parse_fields(listing, value):
+
+    """
+        Parses the comma separated list of the --fields option
+
+        Raises:
+            argparse.ArgumentTypeError - If a field is unknown
+    """
+
+    fields = tuple(field.strip() for field in value.split(",") if field.strip())
+    unknown = [field for field in fields if field not in FIELDS[listing]]
+    if unknown or not fields:
+        raise argparse.ArgumentTypeError("unknown fields: {} (choose from {})".format(
+            ", ".join(unknown) or "none given", ", ".join(FIELDS[listing])))
+    return fields
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python cli.py", description="Lists installed Steam games and Non-Steam games")
+    listings = parser.add_subparsers(dest="listing", metavar="listing")
+    listings.required = True
+
+    for listing, description in (("installed", "Steam games installed on the system"),
+                                 ("nonsteam", "Non-Steam games added to the library of the Steam users")):
+        subparser = listings.add_parser(listing, help=description, description=description)
+        subparser.add_argument("--format", choices=FORMATS, default="ndjson", help="Output format. Defaults to ndjson.")
+        subparser.add_argument("--fields", type=lambda value, listing=listing: parse_fields(listing, value),
+                               default=FIELDS[listing],
+                               help="Comma separated fields to write. Defaults to {}.".format(",".join(FIELDS[listing])))
+        subparser.add_argument("--name", help="Only list the games whose name matches this pattern (*, ?, [seq]), ignoring case")
+        if listing == "installed":
+            subparser.add_argument("--library", action="append", dest="libraries", metavar="PATH",
+                                   help="Only list the games of this library folder. Can be given more than once.")
+        else:
+            subparser.add_argument("--user", action="append", dest="users", metavar="ID",
+                                   help="Only list the games of this Steam user ID. Can be given more than once.")
+        subparser.add_argument("--no-header", action="store_true", help="Don't write the header line of the TSV format")
+        subparser.add_argument("--no-cache", action="store_true", help="Parse every file, without the scan cache")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+
+    """
+        Runs the command line interface
+
+        Parameters:
+            argv - The arguments. Defaults to None, which uses sys.argv.
+
+        Returns:
+            The exit status
+    """
+
+    args = parse_args(argv)
+
+    # Find Steam before anything is written, so a missing installation is reported instead of a traceback
+    env = utils.get_default_environment()
+    try:
+        env.install_path
+        if args.listing == "nonsteam":
+            env.users
+    except OSError as e:
+        print("Could not find the Steam installation.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        return 1
+
+    cache = None if args.no_cache else scan_cache.ScanCache()
+    games = iter_games(args.listing, cache, getattr(args, "users", None), getattr(args, "libraries", None), args.name)
+
+    written = write_to_stdout(games, args.fields, args.format, not args.no_header)
+    if written == 0:
+        print(NOT_FOUND[args.listing], file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,9 +26,15 @@ CRC algorithms implemented in Python.
 If you want to study the Python implementation of the CRC routines, then this
 is a good place to start from.
 
-The algorithms Bit by Bit, Bit by Bit Fast and Table-Driven are implemented.
+The algorithms Bit by Bit, Bit by Bit Fast, Table-Driven and Slice-by-8 are
+implemented.  The generated tables are cached per parameter set, so creating
+many Crc objects with the same parameters only pays for the table once.  When
+the parameters describe the CRC-32 polynomial used by zlib, the calculation
+is handed over to zlib.crc32.
 
-This module can also be used as a library from within Python.
+This module can also be used as a library from within Python.  Running it
+(python crc_algorithms.py) checks every algorithm against bit_by_bit, see
+self_test.
 
 Examples
 ========
@@ -43,8 +49,44 @@ This is an example use of the different algorithms:
 >>> print("0x%x" % crc.bit_by_bit("123456789"))
 >>> print("0x%x" % crc.bit_by_bit_fast("123456789"))
 >>> print("0x%x" % crc.table_driven("123456789"))
+>>> print("0x%x" % crc.crc("123456789"))
 """
 
+import zlib
+
+
+# Tables generated by gen_table and gen_slice8_tables, shared by all Crc
+# objects and keyed by the parameters that influence the table contents.
+_table_cache = {}
+
+
+# function _octets
+###############################################################################
+def _octets(in_str):
+    """
+    return the input message as an iterable of octets.  Strings are taken
+    character by character (as the original algorithms did), bytes-like
+    objects are used as they are.
+    """
+    if isinstance(in_str, str):
+        return [ord(c) for c in in_str]
+    return in_str
+
+
+# function _to_bytes
+###############################################################################
+def _to_bytes(in_str):
+    """
+    return the input message as a bytes-like object, or None if a string
+    contains characters that do not fit in an octet.
+    """
+    if isinstance(in_str, str):
+        try:
+            return in_str.encode("latin-1")
+        except UnicodeEncodeError:
+            return None
+    return in_str
+
 # Class Crc
 ###############################################################################
 class Crc(object):
@@ -88,6 +130,12 @@ class Crc(object):
         else:
             self.CrcShift = 0
 
+        # Faster paths used by crc() when the parameters allow it
+        self.SupportsSlice8 = self.Width == 32 and self.ReflectIn and self.TableIdxWidth == 8
+        self.SupportsZlib = self.SupportsSlice8 and self.Poly == 0x04C11DB7 and self.ReflectOut
+        if self.SupportsZlib:
+            self.ZlibInit = self.reflect(self.XorIn, self.Width) ^ 0xffffffff
+
 
     # function __get_nondirect_init
     ###############################################################################
@@ -128,8 +176,7 @@ class Crc(object):
         value at the end.
         """
         register = self.NonDirectInit
-        for c in in_str:
-            octet = ord(c)
+        for octet in _octets(in_str):
             if self.ReflectIn:
                 octet = self.reflect(octet, 8)
             for i in range(8):
@@ -158,8 +205,7 @@ class Crc(object):
         wich are appended to the input message in the bit-by-bit algorithm.
         """
         register = self.DirectInit
-        for c in in_str:
-            octet = ord(c)
+        for octet in _octets(in_str):
             if self.ReflectIn:
                 octet = self.reflect(octet, 8)
             for i in range(8):
@@ -202,27 +248,186 @@ class Crc(object):
         return tbl
 
 
+    # function get_table
+    ###############################################################################
+    def get_table(self):
+        """
+        return the CRC table for this parameter set.  The table is generated
+        by gen_table the first time it is needed and then shared by every Crc
+        object with the same parameters.
+        """
+        key = ("table", self.Width, self.Poly, self.ReflectIn, self.TableIdxWidth)
+        tbl = _table_cache.get(key)
+        if tbl is None:
+            tbl = _table_cache.setdefault(key, self.gen_table())
+        return tbl
+
+
     # function table_driven
     ###############################################################################
     def table_driven(self, in_str):
         """
         The Standard table_driven CRC algorithm.
         """
-        tbl = self.gen_table()
+        tbl = self.get_table()
 
         register = self.DirectInit << self.CrcShift
         if not self.ReflectIn:
-            for c in in_str:
-                tblidx = ((register >> (self.Width - self.TableIdxWidth + self.CrcShift)) ^ ord(c)) & 0xff
+            for octet in _octets(in_str):
+                tblidx = ((register >> (self.Width - self.TableIdxWidth + self.CrcShift)) ^ octet) & 0xff
                 register = ((register << (self.TableIdxWidth - self.CrcShift)) ^ tbl[tblidx]) & (self.Mask << self.CrcShift)
             register = register >> self.CrcShift
         else:
             register = self.reflect(register, self.Width + self.CrcShift) << self.CrcShift
-            for c in in_str:
-                tblidx = ((register >> self.CrcShift) ^ ord(c)) & 0xff
+            for octet in _octets(in_str):
+                tblidx = ((register >> self.CrcShift) ^ octet) & 0xff
                 register = ((register >> self.TableIdxWidth) ^ tbl[tblidx]) & (self.Mask << self.CrcShift)
             register = self.reflect(register, self.Width + self.CrcShift) & self.Mask
 
         if self.ReflectOut:
             register = self.reflect(register, self.Width)
         return register ^ self.XorOut
+
+
+    # function gen_slice8_tables
+    ###############################################################################
+    def gen_slice8_tables(self):
+        """
+        This function generates the eight CRC tables used for the slice-by-8
+        algorithm.  The first table is the table of the table_driven algorithm,
+        every following table advances the previous one by one more octet.
+        Only reflected 32 bit algorithms are supported.
+        """
+        key = ("slice8", self.Width, self.Poly, self.ReflectIn)
+        tbls = _table_cache.get(key)
+        if tbls is None:
+            tbls = [self.get_table()]
+            for k in range(1, 8):
+                prev = tbls[k - 1]
+                tbls.append([(prev[i] >> 8) ^ tbls[0][prev[i] & 0xff] for i in range(256)])
+            tbls = _table_cache.setdefault(key, tbls)
+        return tbls
+
+
+    # function slice_by_8
+    ###############################################################################
+    def slice_by_8(self, in_str):
+        """
+        Slice-by-8 CRC algorithm.  This function processes eight octets per
+        iteration using eight lookup tables, and falls back to the table_driven
+        algorithm for the parameter sets it does not support (anything other
+        than a reflected 32 bit CRC).
+        """
+        if not self.SupportsSlice8:
+            return self.table_driven(in_str)
+
+        data = _to_bytes(in_str)
+        if data is None:
+            return self.table_driven(in_str)
+
+        t0, t1, t2, t3, t4, t5, t6, t7 = self.gen_slice8_tables()
+        register = self.reflect(self.DirectInit, self.Width)
+        length = len(data)
+        blocks = length - (length % 8)
+        for i in range(0, blocks, 8):
+            register ^= data[i] | (data[i + 1] << 8) | (data[i + 2] << 16) | (data[i + 3] << 24)
+            register = (t7[register & 0xff] ^ t6[(register >> 8) & 0xff] ^
+                        t5[(register >> 16) & 0xff] ^ t4[register >> 24] ^
+                        t3[data[i + 4]] ^ t2[data[i + 5]] ^
+                        t1[data[i + 6]] ^ t0[data[i + 7]])
+        for i in range(blocks, length):
+            register = (register >> 8) ^ t0[(register ^ data[i]) & 0xff]
+        register = self.reflect(register, self.Width)
+
+        if self.ReflectOut:
+            register = self.reflect(register, self.Width)
+        return register ^ self.XorOut
+
+
+    # function zlib_crc32
+    ###############################################################################
+    def zlib_crc32(self, in_str):
+        """
+        CRC calculation using zlib.crc32.  Only valid when the parameters use
+        the CRC-32 polynomial with reflected input and output (see
+        SupportsZlib); the initial and final XOR values are adjusted to what
+        zlib expects.
+        """
+        data = _to_bytes(in_str)
+        if not self.SupportsZlib or data is None:
+            return self.slice_by_8(in_str)
+        return zlib.crc32(data, self.ZlibInit) ^ 0xffffffff ^ self.XorOut
+
+
+    # function crc
+    ###############################################################################
+    def crc(self, in_str):
+        """
+        Calculate the CRC with the fastest algorithm available for this
+        parameter set: zlib.crc32 for the zlib polynomial, slice-by-8 for other
+        reflected 32 bit algorithms and table_driven for everything else.
+        All of them return the same value as bit_by_bit.
+        """
+        if self.SupportsZlib:
+            return self.zlib_crc32(in_str)
+        if self.SupportsSlice8:
+            return self.slice_by_8(in_str)
+        return self.table_driven(in_str)
+
+
+# Parameter sets checked by self_test: (name, width, poly, reflect_in, xor_in, reflect_out, xor_out).
+# They cover the zlib path, slice-by-8, and table_driven for non-reflected and narrow CRCs.
+SELF_TEST_MODELS = (
+    ("crc-32",              32, 0x04C11DB7, True,  0xffffffff, True,  0xffffffff),
+    ("crc-32/jamcrc",       32, 0x04C11DB7, True,  0xffffffff, True,  0x00000000),
+    ("crc-32/xor-in-0",     32, 0x04C11DB7, True,  0x00000000, True,  0xffffffff),
+    ("crc-32c",             32, 0x1EDC6F41, True,  0xffffffff, True,  0xffffffff),
+    ("crc-32/reflect-in",   32, 0x04C11DB7, True,  0xffffffff, False, 0xffffffff),
+    ("crc-32/bzip2",        32, 0x04C11DB7, False, 0xffffffff, False, 0xffffffff),
+    ("crc-16/arc",          16, 0x8005,     True,  0x0000,     True,  0x0000),
+    ("crc-16/ccitt-false",  16, 0x1021,     False, 0xffff,     False, 0x0000),
+    ("crc-8",                8, 0x07,       False, 0x00,       False, 0x00),
+    ("crc-5/usb",            5, 0x05,       True,  0x1f,       True,  0x1f),
+)
+
+# Input lengths checked by self_test: every tail of slice-by-8 (0 to 7 octets),
+# with zero, one, two and many full blocks before it
+SELF_TEST_LENGTHS = tuple(range(0, 24)) + (63, 64, 65, 1000)
+
+
+# function self_test
+###############################################################################
+def self_test():
+    """
+    Check every algorithm against bit_by_bit, for all the SELF_TEST_MODELS
+    and SELF_TEST_LENGTHS, with bytes and str input.
+
+    Returns a list of the mismatches found, as strings.  An empty list means
+    all the algorithms agree.
+    """
+    failures = []
+    for name, width, poly, reflect_in, xor_in, reflect_out, xor_out in SELF_TEST_MODELS:
+        crc = Crc(width = width, poly = poly, reflect_in = reflect_in, xor_in = xor_in,
+                  reflect_out = reflect_out, xor_out = xor_out)
+        algorithms = (("bit_by_bit_fast", crc.bit_by_bit_fast), ("table_driven", crc.table_driven),
+                      ("slice_by_8", crc.slice_by_8), ("zlib_crc32", crc.zlib_crc32), ("crc", crc.crc))
+        for length in SELF_TEST_LENGTHS:
+            data = bytes((i * 131 + 7) & 0xff for i in range(length))
+            for message in (data, data.decode("latin-1")):
+                expected = crc.bit_by_bit(message)
+                for algorithm, function in algorithms:
+                    result = function(message)
+                    if result != expected:
+                        failures.append("%s: %s of %d %s octets returned 0x%x instead of 0x%x" % (
+                            name, algorithm, length, type(message).__name__, result, expected))
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    failures = self_test()
+    for failure in failures:
+        print(failure)
+    print("%d mismatches" % len(failures))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,393 @@
+"""
+    Streaming, resumable and verified image downloads.
+
+    A download is streamed in chunks to a "<file_name>.part" file next to its
+    destination. The ETag or Last-Modified date of the image is kept next to
+    it, in "<file_name>.part.json". If a previous attempt left a partial file,
+    the download is resumed from where it stopped with an HTTP Range request,
+    sent with If-Range so a server whose image changed sends the whole new
+    image instead of the rest of it. A partial file without a validator is
+    downloaded again from the start. The size is limited while streaming, the
+    first bytes must be those of an image, and only a complete file is
+    renamed into place, so the destination is never a truncated, mixed or
+    non-image file.
+
+    The requests go through a RequestScheduler (pooled connections, rate
+    limiting, retries), with the headers set on every request.
+
+    Example:
+        download("https://cdn2.steamgriddb.com/grid/....png", "12345.png")
+        data = download_bytes("https://images.igdb.com/....jpg")
+"""
+
+import io
+import json
+import os
+import re
+import time
+import requests
+import atomic_file
+import metrics
+import request_scheduler
+
+# Largest file accepted, in bytes
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024
+
+# Size of the chunks read from the network
+CHUNK_SIZE = 1 << 16
+
+# Sent with every download, some image hosts refuse requests without a browser user agent
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36",
+}
+
+# Extension of the partial files
+PART_SUFFIX = ".part"
+
+# Extension of the files with the validator (ETag, Last-Modified) of a partial file
+VALIDATOR_SUFFIX = ".part.json"
+
+# Partial files older than this are removed by remove_stale_parts, in seconds
+DEFAULT_PART_MAX_AGE = 24 * 60 * 60
+
+# Leading bytes of the image formats that are accepted
+IMAGE_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",
+)
+
+# Number of bytes needed to recognize an image
+SIGNATURE_SIZE = 12
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+class DownloadError(requests.RequestException):
+
+    """
+        Raised when a download completed but its contents are not acceptable
+    """
+
+class FileTooLarge(DownloadError):
+
+    """
+        Raised when a download is larger than the maximum size
+    """
+
+class NotAnImage(DownloadError):
+
+    """
+        Raised when a download is not an image
+    """
+
+def is_image(header):
+
+    """
+        Returns whether the first bytes of a file are those of an image
+        (PNG, JPEG, GIF, BMP or WebP)
+    """
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return True
+    return any(header.startswith(signature) for signature in IMAGE_SIGNATURES)
+
+def _content_length(r):
+
+    """
+        Returns the Content-Length of a response, or None if it has none
+        or the body is encoded (the length is then the encoded length)
+    """
+
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+
+    try:
+        return int(r.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+def _resume_offset(r, offset):
+
+    """
+        Returns the offset the body of a response starts at: offset if the
+        server resumed the download as asked, 0 if it sent the whole file
+
+        Raises:
+            DownloadError - If the server resumed from a different offset
+    """
+
+    if r.status_code != 206:
+        return 0
+
+    match = _CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+    if match is None or int(match.group(1)) != offset:
+        raise DownloadError("Unexpected Content-Range from the server", response=r)
+    return offset
+
+def _response_validator(r):
+
+    """
+        Returns the validator of a response, a dictionary with its strong
+        ETag and its Last-Modified date, or None if it has neither
+    """
+
+    etag = r.headers.get("ETag")
+    # A weak ETag can't be used to join byte ranges
+    if etag is not None and etag.startswith("W/"):
+        etag = None
+    last_modified = r.headers.get("Last-Modified")
+
+    if etag is None and last_modified is None:
+        return None
+    return {"etag": etag, "last_modified": last_modified}
+
+def _read_validator(file_name, url):
+
+    """
+        Returns the validator saved for the partial file of a download,
+        or None if there is none or it was saved for another URL
+    """
+
+    try:
+        with open(file_name + VALIDATOR_SUFFIX, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get("url") != url:
+        return None
+    if data.get("etag") is None and data.get("last_modified") is None:
+        return None
+    return data
+
+def _write_validator(file_name, url, validator):
+
+    """
+        Saves the validator of the partial file of a download, or removes
+        the saved one if the response has no validator
+    """
+
+    validator_path = file_name + VALIDATOR_SUFFIX
+    if validator is None:
+        try:
+            os.remove(validator_path)
+        except OSError:
+            pass
+        return
+
+    atomic_file.atomic_write(validator_path, json.dumps(dict(validator, url=url)))
+
+def _same_validator(saved, validator):
+
+    """
+        Returns whether a response has the validator saved for a partial file
+    """
+
+    if validator is None:
+        return False
+    if saved.get("etag") is not None:
+        return saved["etag"] == validator["etag"]
+    return saved["last_modified"] == validator["last_modified"]
+
+def discard(file_name):
+
+    """
+        Removes the partial file of a download and its validator, if any
+
+        Parameters:
+            file_name - The destination of the download
+    """
+
+    for path in (file_name + PART_SUFFIX, file_name + VALIDATOR_SUFFIX):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def remove_stale_parts(folder, max_age=DEFAULT_PART_MAX_AGE):
+
+    """
+        Removes the partial files (and their validators) of the downloads
+        that were abandoned in a folder
+
+        Parameters:
+            folder - The folder to clean
+            max_age - Only the files not modified for this long are removed, so
+                      the downloads of another run are kept. In seconds.
+                      Defaults to DEFAULT_PART_MAX_AGE.
+
+        Returns:
+            The number of files removed
+    """
+
+    oldest = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return 0
+
+    for entry in entries:
+        if not entry.name.endswith((PART_SUFFIX, VALIDATOR_SUFFIX)):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < oldest:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+
+    return removed
+
+def download(url, file_name, scheduler=None, headers=None, max_size=DEFAULT_MAX_SIZE, resume=True):
+
+    """
+        Downloads an image to a file
+
+        Parameters:
+            url - URL of the image
+            file_name - Where to save the image. It is replaced only if the download succeeds.
+            scheduler - RequestScheduler to send the request with.
+                        Defaults to request_scheduler.get_default_scheduler().
+            headers - Headers to send, on top of DEFAULT_HEADERS. Defaults to None.
+            max_size - Largest file accepted, in bytes. Defaults to DEFAULT_MAX_SIZE.
+            resume - Whether to resume a partial download left by a previous attempt.
+                     It is resumed only if its ETag or Last-Modified date was saved, and
+                     only if the image did not change since. Defaults to True.
+
+        Returns:
+            The size of the file, in bytes
+
+        Raises:
+            requests.RequestException - If the download failed. The partial file is kept
+                                        so the download can be resumed, unless the contents
+                                        are not acceptable (DownloadError). See discard.
+            OSError - If the file could not be written
+    """
+
+    scheduler = scheduler or request_scheduler.get_default_scheduler()
+    part_path = file_name + PART_SUFFIX
+
+    request_headers = dict(DEFAULT_HEADERS)
+    request_headers.update(headers or {})
+
+    offset = 0
+    saved = None
+    if resume:
+        try:
+            offset = os.path.getsize(part_path)
+        except OSError:
+            offset = 0
+    if offset > 0:
+        saved = _read_validator(file_name, url)
+        if saved is None:
+            # Without a validator, the rest of the file could be from another image
+            discard(file_name)
+            offset = 0
+    if offset > 0:
+        request_headers["Range"] = "bytes={}-".format(offset)
+        request_headers["If-Range"] = saved["etag"] if saved.get("etag") is not None else saved["last_modified"]
+
+    try:
+        with scheduler.get(url, headers=request_headers, stream=True) as r:
+            # The partial file is already complete, or changed on the server
+            if r.status_code == 416:
+                r.close()
+                discard(file_name)
+                return download(url, file_name, scheduler, headers, max_size, resume=False)
+
+            r.raise_for_status()
+            offset = _resume_offset(r, offset)
+
+            validator = _response_validator(r)
+            if offset and not _same_validator(saved, validator):
+                # The server ignored If-Range and resumed a different image
+                r.close()
+                discard(file_name)
+                return download(url, file_name, scheduler, headers, max_size, resume=False)
+            if not offset:
+                _write_validator(file_name, url, validator)
+
+            length = _content_length(r)
+            if length is not None and offset + length > max_size:
+                raise FileTooLarge("{} is larger than {} bytes".format(url, max_size), response=r)
+
+            size = offset
+            with open(part_path, "r+b" if offset else "w+b") as f:
+                f.seek(offset)
+                f.truncate()
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLarge("{} is larger than {} bytes".format(url, max_size), response=r)
+                    f.write(chunk)
+
+                f.seek(0)
+                if not is_image(f.read(SIGNATURE_SIZE)):
+                    raise NotAnImage("{} is not an image".format(url), response=r)
+
+            if length is not None and size != offset + length:
+                raise requests.ConnectionError("Incomplete download of {}".format(url))
+    except DownloadError:
+        discard(file_name)
+        raise
+
+    os.replace(part_path, file_name)
+    discard(file_name)
+
+    run_metrics = metrics.get_default_metrics()
+    run_metrics.incr("download.files")
+    run_metrics.incr("download.bytes", size - offset)
+    if offset:
+        run_metrics.incr("download.resumed")
+
+    return size
+
+def download_bytes(url, scheduler=None, headers=None, max_size=DEFAULT_MAX_SIZE):
+
+    """
+        Downloads an image into memory
+
+        Parameters:
+            See download
+
+        Returns:
+            The contents of the image as bytes
+
+        Raises:
+            requests.RequestException - If the download failed or the contents are not
+                                        acceptable (DownloadError)
+    """
+
+    scheduler = scheduler or request_scheduler.get_default_scheduler()
+
+    request_headers = dict(DEFAULT_HEADERS)
+    request_headers.update(headers or {})
+
+    buffer = io.BytesIO()
+    with scheduler.get(url, headers=request_headers, stream=True) as r:
+        r.raise_for_status()
+
+        length = _content_length(r)
+        if length is not None and length > max_size:
+            raise FileTooLarge("{} is larger than {} bytes".format(url, max_size), response=r)
+
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            if buffer.tell() + len(chunk) > max_size:
+                raise FileTooLarge("{} is larger than {} bytes".format(url, max_size), response=r)
+            buffer.write(chunk)
+
+        if length is not None and buffer.tell() != length:
+            raise requests.ConnectionError("Incomplete download of {}".format(url))
+
+    data = buffer.getvalue()
+    if not is_image(data[:SIGNATURE_SIZE]):
+        raise NotAnImage("{} is not an image".format(url))
+
+    run_metrics = metrics.get_default_metrics()
+    run_metrics.incr("download.files")
+    run_metrics.incr("download.bytes", len(data))
+
+    return data
@@ -1,9 +1,20 @@
 import config
 import utils
-import requests
+import grid_images
+import steamgriddb
+import grid_fetcher
+import downloader
+import name_matcher
+import artwork
+import artwork_store
+import sync_manifest
+import igdb
+import response_cache
+import metrics
+import contextlib
 import os
+import time
 import colorama
-import urllib
 
 """
     Generates grid images for Non-Steam games
@@ -11,183 +22,246 @@ import urllib
     and creating custom images for games that have no
     images on SteamGridDB.
 """
-colorama.init()
+# Whether to use the cached SteamGridDB and IGDB responses (response_cache.USE),
+# fetch them again (response_cache.REFRESH) or not cache them at all (response_cache.BYPASS)
+CACHE_MODE = response_cache.USE
 
-# Get all the Non-Steam games
-games = utils.get_non_steam_games()
-if not games:
-    print("Could not find any Non-Steam games in your Steam library.")
-    exit()
+# Number of SteamGridDB requests in flight at the same time
+CONCURRENCY = 8
 
-headers = {"Authorization": "Bearer {}".format(config.STEAMGRIDDB_API_KEY)}
+# Artwork created for the games that have no images on SteamGridDB.
+# Set to artwork.DEFAULT_VARIANTS to also create the portrait capsule, hero and logo.
+CUSTOM_VARIANTS = (artwork.GRID,)
 
-# To keep track if the program updated anything
-dirty = False
+# Number of processes rendering custom images. None uses all the CPU cores.
+RENDER_WORKERS = None
 
-# To keep track of the games that the script could not find images for
-# on SteamGridDB. Can try to search other different criteria
-not_found_image = []
+# Download every image once and share it between the Steam users (by hardlink when possible)
+SHARE_ARTWORK = True
 
-# To keep track of the games that the script could not find any images
-# for on SteamGridDB. Can create an image by ourselves.
-not_found_anything = []
-
-# Go through every game in the Non-Steam games list
-for game in games:
-    grid_folder = utils.get_steam_install_path() + "\\userdata\\" + game["user"] + "\\config\\grid\\"
-
-    # Check if an image already exists. If so, skip this game
-    if os.path.isfile("{}{}.png".format(grid_folder, game["appid"])):
-        print("{}[O]{} {} - Image already exists.".format(colorama.Back.MAGENTA, colorama.Style.RESET_ALL, game["name"]))
-        continue
-
-    name = game["name"]
-
-    # Search the game on SteamGridDB by the game name in the library
-    try:
-        url = "https://www.steamgriddb.com/api/v2/search/autocomplete/{}".format(name)
-        r = requests.get(url, headers=headers).json()
-    except:
-        print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        # TODO: Add to not_found at all
-        continue
-
-    # Check if the request was not successful or nothing was found
-    if r["success"] != True or not r["data"]:
-        print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        # TODO: Add to not_found at all
-        continue
-
-    r = r["data"]
-
-    # Check which entry's name is most similar to the original game name
-    max_similarity = 0
-    max_similarity_index = 0
-    i = 0
-    for entry in r:
-        ratio = utils.string_similarity(name, entry["name"])
-        if ratio > max_similarity:
-            max_similarity = ratio
-            max_similarity_index = i
-
-        i += 1
-
-    game_id = r[max_similarity_index]["id"]
-
-    # Search grid images on SteamGridDB
-    try:
-        url = "https://www.steamgriddb.com/api/v2/grids/game/{}&dimensions=460x215&920x430".format(game_id)
-        r = requests.get(url, headers=headers).json()
-    except:
-        print("{}[X]{} {} - Could not get images from Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        not_found_image.append(game)
-        continue
-
-    # Check if the request was not successful or nothing was found
-    if r["success"] != True or not r["data"]:
-        print("{}[X]{} {} - Could not get images from Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        not_found_image.append(game)
-        continue
-
-    r = r["data"]
-
-    # Get the first grid image url
-    url = r[0]["url"]
-
-    # Create the grid folder if it doesn't exist
-    if not os.path.isdir(grid_folder):
-        os.mkdir(grid_folder)
-
-    # Save the image in the grid folder
-    file_name = "{}{}.png".format(grid_folder, game["appid"])
-    urllib.request.urlretrieve(url, file_name)
-    print("{}[V]{} {} - Grid image downloaded successfully from Steam Grid DB.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
-    dirty = True
+# Minimum similarity (0 to 1) between a game name and a SteamGridDB search result
+MATCH_THRESHOLD = 0.3
 
 # Try to find any other image for the games that the script
 # could not find images for on SteamGridDB
 # Set to False because I don't want the script to search
 # for different dimension of images. You can set this to True.
 FIND_OTHER_IMAGES = False 
-if FIND_OTHER_IMAGES == False:
-    for game in not_found_image:
-        not_found_anything.append(game)
 
-if len(not_found_image) > 0 and FIND_OTHER_IMAGES == True:
-    print("\nTrying to find different grid images on SteamGridDB...\n")
+# Where to write the JSON report of the run (stage times, counters, latencies). None to not write it.
+METRICS_REPORT = os.path.join(os.path.expanduser("~"), ".steamhelper", "grid_report.json")
 
-    for game in not_found_image:
-        grid_folder = utils.get_steam_install_path() + "\\userdata\\" + game["user"] + "\\config\\grid\\"
+# Seconds between two lines of the live metrics summary. None to not print it.
+LIVE_SUMMARY_INTERVAL = 5
 
-        name = game["name"]
+# Profile the run with cProfile (CPU) and tracemalloc (memory), and add the results to the report
+PROFILE_CPU = False
+PROFILE_MEMORY = False
 
-        # Search the game on SteamGridDB by the game name in the library
-        try:
-            url = "https://www.steamgriddb.com/api/v2/search/autocomplete/{}".format(name)
-            r = requests.get(url, headers=headers).json()
-        except:
-            print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-            continue
+def most_similar_entry(name, entries):
+    # Check which entry's name is most similar to the original game name.
+    # None if none of them is similar enough, the game is then reported as not found.
+    matcher = name_matcher.NameMatcher(entries, key=lambda entry: entry["name"])
+    return matcher.best(name, MATCH_THRESHOLD)
 
-        # Check if the request was not successful or nothing was found
-        if r["success"] != True or not r["data"]:
-            print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-            continue
-
-        r = r["data"]
-        game_id = r[0]["id"]
+def main():
+    colorama.init()
 
-        # Search grid images on SteamGridDB
-        try:
-            url = "https://www.steamgriddb.com/api/v2/grids/game/{}".format(game_id)
-            r = requests.get(url, headers=headers).json()
-        except:
+    run_metrics = metrics.get_default_metrics()
+    live = metrics.LiveSummary(run_metrics, LIVE_SUMMARY_INTERVAL) if LIVE_SUMMARY_INTERVAL else contextlib.nullcontext()
+    try:
+        with live, metrics.profile(run_metrics, PROFILE_CPU, PROFILE_MEMORY):
+            sync(run_metrics)
+    finally:
+        if METRICS_REPORT:
+            run_metrics.write_json(METRICS_REPORT)
+            print("Run report written to {}".format(METRICS_REPORT))
+
+def sync(run_metrics):
+    # Resolve the Steam installation once for all the games
+    env = utils.get_default_environment()
+
+    # Get all the Non-Steam games
+    with run_metrics.stage("scan"):
+        games = utils.get_non_steam_games(env=env)
+    run_metrics.incr("games", len(games))
+    if not games:
+        print("Could not find any Non-Steam games in your Steam library.")
+        return
+
+    cache = response_cache.ResponseCache(mode=CACHE_MODE)
+
+    # One client per API shares its connections between all the requests
+    client = steamgriddb.SteamGridDB(config.STEAMGRIDDB_API_KEY, cache=cache)
+    igdb_client = igdb.IGDB(config.IGDB_API_KEY, cache=cache)
+
+    store = artwork_store.ArtworkStore() if SHARE_ARTWORK else None
+
+    # The sync manifest of every grid folder, to know which images are
+    # already synced and which games failed recently
+    manifests = {}
+
+    def grid_file(game):
+        return os.path.join(env.grid_folder(game["user"]), "{}.png".format(game["appid"]))
+
+    def get_manifest(game):
+        grid_folder = env.grid_folder(game["user"])
+        if grid_folder not in manifests:
+            manifests[grid_folder] = sync_manifest.SyncManifest(grid_folder)
+        return manifests[grid_folder]
+
+    def record_failure(game, reason):
+        run_metrics.incr("games.failed")
+        get_manifest(game).record_failure(game["appid"], reason)
+        # The game is not tried again for a while, don't keep its partial download
+        downloader.discard(grid_file(game))
+
+    # To keep track if the program updated anything
+    dirty = False
+
+    # To keep track of the games that the script could not find images for
+    # on SteamGridDB. Can try to search other different criteria
+    not_found_image = []
+
+    # To keep track of the games that the script could not find any images
+    # for on SteamGridDB. Can create an image by ourselves.
+    not_found_anything = []
+
+    def report_fetch_error(game):
+        # A request or the download failed, the game is tried again on the next run without a backoff
+        # and without a custom image
+        print("{}[X]{} {} - Could not get the grid image from Steam Grid DB, will try again on the next run.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+        run_metrics.incr("steamgriddb.errors")
+
+    def report_grid(result):
+        game = result.game
+        if result.status == grid_fetcher.NOT_FOUND_GAME:
+            print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+            record_failure(game, result.status)
+        elif result.status == grid_fetcher.NOT_FOUND_IMAGE:
             print("{}[X]{} {} - Could not get images from Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-            not_found_anything.append(game)
-            continue
+            not_found_image.append(game)
+            run_metrics.incr("steamgriddb.not_found")
+        elif result.status == grid_fetcher.FAILED:
+            report_fetch_error(game)
+        else:
+            print("{}[V]{} {} - Grid image downloaded successfully from Steam Grid DB.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
+            record_grid(result)
 
-        # Check if the request was not successful or nothing was found
-        if r["success"] != True or not r["data"]:
+    def report_alternative_grid(result):
+        game = result.game
+        if result.status == grid_fetcher.NOT_FOUND_GAME:
+            print("{}[X]{} {} - Could not get find game on Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+            record_failure(game, result.status)
+        elif result.status == grid_fetcher.NOT_FOUND_IMAGE:
             print("{}[X]{} {} - Could not get images from Steam Grid DB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
             not_found_anything.append(game)
-            continue
+            run_metrics.incr("steamgriddb.not_found")
+        elif result.status == grid_fetcher.FAILED:
+            report_fetch_error(game)
+        else:
+            print("{}[V]{} {} - Alternative grid image downloaded successfully from Steam Grid DB.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
+            record_grid(result)
 
-        r = r["data"]
+    def record_grid(result):
+        run_metrics.incr("games.downloaded")
+        try:
+            get_manifest(result.game).record_success(result.game["appid"], result.file_name, sync_manifest.SOURCE_STEAMGRIDDB,
+                                                     result.game_id, result.image_id)
+        except OSError:
+            pass
 
-        # Get the first grid image url
-        url = r[0]["url"]
+    def report_custom_grid(game, success):
+        if success:
+            print("{}[V]{} {} - Custom grid image created successfully.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
+            run_metrics.incr("games.custom")
+            downloader.discard(grid_file(game))
+            try:
+                get_manifest(game).record_success(game["appid"], grid_file(game), sync_manifest.SOURCE_CUSTOM)
+            except OSError:
+                pass
+        else:
+            print("{}[X]{} {} - Could not get create custom grid image.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+            record_failure(game, "no_custom_image")
+
+    # Go through every game in the Non-Steam games list
+    jobs = []
+    for game in games:
+        file_name = grid_file(game)
+
+        # Check if an image already exists, or if the game failed recently. If so, skip this game
+        manifest = get_manifest(game)
+        state = manifest.check(game["appid"], file_name)
+        if state in (sync_manifest.UP_TO_DATE, sync_manifest.CHANGED, sync_manifest.UNTRACKED):
+            print("{}[O]{} {} - Image already exists.".format(colorama.Back.MAGENTA, colorama.Style.RESET_ALL, game["name"]))
+            run_metrics.incr("games.skipped")
+            # Remember images that were not created by the script, so they are not read again
+            if state != sync_manifest.UP_TO_DATE:
+                try:
+                    manifest.adopt(game["appid"], file_name)
+                except OSError:
+                    pass
+            continue
+        if state == sync_manifest.BACKOFF:
+            retry = time.strftime("%Y-%m-%d %H:%M", time.localtime(manifest.entry(game["appid"])["next_attempt"]))
+            print("{}[O]{} {} - No image was found on the last try. Trying again after {}.".format(colorama.Back.MAGENTA, colorama.Style.RESET_ALL, game["name"], retry))
+            run_metrics.incr("games.backoff")
+            continue
+        if state == sync_manifest.INVALID:
+            print("{}[O]{} {} - Image is broken, replacing it.".format(colorama.Back.MAGENTA, colorama.Style.RESET_ALL, game["name"]))
 
-        # Create the grid folder if it doesn't exist
-        if not os.path.isdir(grid_folder):
-            os.mkdir(grid_folder)
+        jobs.append((game, file_name))
 
-        # Save the image in the grid folder
-        file_name = "{}{}.png".format(grid_folder, game["appid"])
-        urllib.request.urlretrieve(url, file_name)
-        print("{}[V]{} {} - Alternative grid image downloaded successfully from Steam Grid DB.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
+    # Search the games on SteamGridDB and download their grid images, concurrently
+    with run_metrics.stage("steamgriddb"):
+        results = grid_fetcher.fetch_grids(client, jobs, CONCURRENCY, dimensions=("460x215", "920x430"),
+                                           choose=most_similar_entry, store=store, on_result=report_grid)
+    if any(result.status == grid_fetcher.DOWNLOADED for result in results):
         dirty = True
 
-# Create custom images for all the games that have no images
-# on SteamGridDB.
-if len(not_found_anything) > 0:
-    print("\nTrying to create custom images for the games that have no images on Steam Grid DB...\n")
+    if FIND_OTHER_IMAGES == False:
+        for game in not_found_image:
+            not_found_anything.append(game)
 
-    for game in not_found_anything:
-        grid_folder = utils.get_steam_install_path() + "\\userdata\\" + game["user"] + "\\config\\grid\\"
+    if len(not_found_image) > 0 and FIND_OTHER_IMAGES == True:
+        print("\nTrying to find different grid images on SteamGridDB...\n")
 
-        # Create the grid folder if it doesn't exist
-        if not os.path.isdir(grid_folder):
-            os.mkdir(grid_folder)
+        jobs = [(game, grid_file(game)) for game in not_found_image]
 
-        # Create and save the image in the grid folder
-        file_name = "{}{}.png".format(grid_folder, game["appid"])
-        if utils.create_grid_image(game, file_name) == True:
-            print("{}[V]{} {} - Custom grid image created successfully.".format(colorama.Back.GREEN, colorama.Style.RESET_ALL, game["name"]))
+        # Search again without limiting the dimensions
+        with run_metrics.stage("steamgriddb_alternative"):
+            results = grid_fetcher.fetch_grids(client, jobs, CONCURRENCY, choose=most_similar_entry, store=store,
+                                               on_result=report_alternative_grid)
+        if any(result.status == grid_fetcher.DOWNLOADED for result in results):
             dirty = True
-        else:
-            print("{}[X]{} {} - Could not get create custom grid image.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
 
-if dirty == True:
-    print("\nGrid images updated. Please restart Steam to see the changes.")
-else:
-    print("\nNothing was updated.\n")
\ No newline at end of file
+    # Create custom images for all the games that have no images
+    # on SteamGridDB.
+    if len(not_found_anything) > 0:
+        print("\nTrying to create custom images for the games that have no images on Steam Grid DB...\n")
+
+        jobs = [(game, grid_file(game)) for game in not_found_anything]
+
+        # Download the cover images on threads and render them on all the CPU cores
+        with run_metrics.stage("custom"):
+            results = grid_images.create_grid_images(jobs, igdb_client=igdb_client, variants=CUSTOM_VARIANTS,
+                                               workers=RENDER_WORKERS, on_result=report_custom_grid)
+        if any(results):
+            dirty = True
+
+    for grid_folder, manifest in manifests.items():
+        manifest.save()
+        # Remove the partial downloads abandoned by previous runs
+        downloader.remove_stale_parts(grid_folder)
+
+    if store is not None:
+        store.save()
+        downloader.remove_stale_parts(store.temp_dir)
+
+    if dirty == True:
+        print("\nGrid images updated. Please restart Steam to see the changes.")
+    else:
+        print("\nNothing was updated.\n")
+
+if __name__ == "__main__":
+    main()
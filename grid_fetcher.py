@@ -0,0 +1,154 @@
+"""
+    Concurrent engine for fetching grid images from SteamGridDB.
+
+    Every game goes through three stages: searching the game, listing its
+    grid images and downloading the first one. The games are handled by
+    asyncio tasks, so the stages of different games overlap, while the
+    blocking requests run on a thread pool that shares the client's
+    keep-alive connections.
+
+    With an ArtworkStore, an image wanted by several Steam users is
+    downloaded once and placed into every user's grid folder.
+
+    Example:
+        def report(result):
+            print(result.game["name"], result.status)
+
+        fetch_grids(client, [(game, file_name)], concurrency=8, on_result=report)
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import os
+import requests
+import metrics
+import steamgriddb
+
+# Default number of requests in flight at the same time
+DEFAULT_CONCURRENCY = 8
+
+# The game was not found on SteamGridDB (no search result, or none similar enough)
+NOT_FOUND_GAME = "not_found_game"
+
+# The game was found, but it has no grid images
+NOT_FOUND_IMAGE = "not_found_image"
+
+# The grid image was downloaded
+DOWNLOADED = "downloaded"
+
+# A request or the download failed (network error, open circuit breaker, refused
+# API key, ...). The game should be tried again on the next run.
+FAILED = "failed"
+
+# The outcome of fetching the grid image of one game, and the SteamGridDB
+# IDs of the game and image that were found (None if they were not)
+GridResult = collections.namedtuple("GridResult", ["game", "file_name", "status", "game_id", "image_id"],
+                                    defaults=(None, None))
+
+def first_entry(name, entries):
+
+    """
+        Chooses the first search result
+    """
+
+    return entries[0]
+
+async def _fetch_game(client, game, file_name, dimensions, choose, store, run):
+
+    """
+        Fetches the grid image of one game
+
+        Returns:
+            A GridResult
+    """
+
+    run_metrics = metrics.get_default_metrics()
+
+    # Search the game on SteamGridDB by the game name in the library
+    entries = await run(run_metrics.timed("steamgriddb.search", client.search), game["name"])
+    if entries is steamgriddb.FAILED:
+        return GridResult(game, file_name, FAILED)
+    if not entries:
+        return GridResult(game, file_name, NOT_FOUND_GAME)
+
+    entry = choose(game["name"], entries)
+    if entry is None:
+        return GridResult(game, file_name, NOT_FOUND_GAME)
+    game_id = entry["id"]
+
+    # Search grid images on SteamGridDB
+    grids = await run(run_metrics.timed("steamgriddb.grids", client.grids), game_id, dimensions)
+    if grids is steamgriddb.FAILED:
+        return GridResult(game, file_name, FAILED, game_id)
+    if not grids:
+        return GridResult(game, file_name, NOT_FOUND_IMAGE, game_id)
+
+    # Create the grid folder if it doesn't exist
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+    # Save the first grid image in the grid folder
+    try:
+        if store is None:
+            await run(run_metrics.timed("steamgriddb.download", client.download), grids[0]["url"], file_name)
+        else:
+            await run(run_metrics.timed("steamgriddb.download", store.install), grids[0]["url"], file_name, client.download)
+    except (requests.RequestException, OSError):
+        # The image exists, so don't fall back to another one or a custom image
+        return GridResult(game, file_name, FAILED, game_id)
+
+    return GridResult(game, file_name, DOWNLOADED, game_id, grids[0].get("id"))
+
+async def _fetch_all(client, jobs, concurrency, dimensions, choose, store, on_result):
+
+    """
+        Fetches the grid images of all the jobs, at most concurrency
+        requests at a time
+    """
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+
+    async def run(function, *args):
+        async with semaphore:
+            return await loop.run_in_executor(executor, function, *args)
+
+    async def fetch(game, file_name):
+        result = await _fetch_game(client, game, file_name, dimensions, choose, store, run)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    try:
+        return await asyncio.gather(*(fetch(game, file_name) for game, file_name in jobs))
+    finally:
+        executor.shutdown(wait=False)
+
+def fetch_grids(client, jobs, concurrency=DEFAULT_CONCURRENCY, dimensions=None, choose=first_entry, store=None,
+                on_result=None):
+
+    """
+        Fetches grid images for many games concurrently
+
+        Parameters:
+            client - A SteamGridDB client
+            jobs - A list of (game, file_name) tuples, where game is a Non-Steam game
+                   dictionary and file_name is where to save its grid image
+            concurrency - Maximum number of requests in flight. Defaults to DEFAULT_CONCURRENCY.
+            dimensions - Dimensions of the grid images to look for. Defaults to None (any).
+            choose - Function that takes the game name and the search results and
+                     returns the result to use, or None if none of them is the game.
+                     Defaults to the first result.
+            store - An ArtworkStore to download the images through, so every image
+                    is downloaded only once. Defaults to None (download every image).
+            on_result - Function called with every GridResult as soon as it is ready.
+
+        Returns:
+            A list of GridResult, in the same order as the jobs
+    """
+
+    if not jobs:
+        return []
+
+    return asyncio.run(_fetch_all(client, jobs, concurrency, dimensions, choose, store, on_result))
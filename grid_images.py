@@ -0,0 +1,279 @@
+"""
+    Helpers that create custom grid images for Non-Steam games from
+    their cover images on IGDB.
+
+    Example:
+        create_grid_images([(game, "12345.png")], with_text=True)
+"""
+
+import config
+import os
+import time
+import requests
+import concurrent.futures
+import colorama
+import artwork
+import downloader
+import igdb
+import metrics
+import response_cache
+
+_igdb_client = None
+
+def get_igdb_client():
+
+    """
+        Returns the IGDB client used by create_grid_image when
+        no client is passed to it. Its responses are cached on disk.
+    """
+
+    global _igdb_client
+
+    if _igdb_client is None:
+        _igdb_client = igdb.IGDB(config.IGDB_API_KEY, cache=response_cache.ResponseCache())
+    return _igdb_client
+
+def find_grid_sources(games, igdb_client=None):
+    """
+        Finds the cover images of many games on IGDB, to create custom
+        grid images from. All the games are searched with a few multiquery
+        requests, and all their covers are fetched at once.
+
+        Paramaters:
+            games - A list of dictionaries containing the Non-Steam game information
+            igdb_client - The IGDB client to search with. Defaults to get_igdb_client().
+
+        Returns:
+            A list with, for every game, a tuple of its cover image URL and its slug,
+            or None if no cover image was found
+    """
+
+    igdb_client = igdb_client or get_igdb_client()
+
+    run_metrics = metrics.get_default_metrics()
+
+    # Search IGDB for the game IDs by providing the game names
+    with run_metrics.timer("igdb.search_games"):
+        found = igdb_client.search_games([game["name"] for game in games])
+
+    # Get the cover images of all the games that were found
+    with run_metrics.timer("igdb.covers"):
+        covers = igdb_client.covers([r["cover"] for r in found.values() if r and r.get("cover")])
+
+    sources = []
+    for game in games:
+        r = found.get(game["name"])
+        if not r:
+            print("{}[X]{} Could not find {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+            sources.append(None)
+            continue
+
+        cover = covers.get(r["cover"]) if r.get("cover") else None
+        if not cover:
+            print("{}[X]{} Could not find a cover image for {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+            sources.append(None)
+            continue
+
+        # Fix the cover image URL and set the link to the "screenshot_huge" template
+        cover_url = "http://" + cover["url"].replace("//", "").replace("t_thumb", "t_1080p")
+
+        # Save the game's slug to use as text for the grid image
+        sources.append((cover_url, r.get("slug", "")))
+
+    return sources
+
+def download_grid_source(game, cover_url, slug, with_text=False):
+    """
+        Downloads the cover image of a game found by find_grid_sources
+
+        Returns:
+            A tuple of the cover image bytes and the text to draw on it (or None),
+            or None if the cover image could not be downloaded
+    """
+
+    # Download the cover image into memory
+    try:
+        with metrics.get_default_metrics().timer("igdb.cover_download"):
+            data = download_bytes(cover_url)
+    except requests.RequestException:
+        print("{}[X]{} Could not download the cover image for {} from IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+        return None
+
+    name_text = None
+
+    # If the user wants to have the game's name of the image
+    if with_text == True:
+        # Draw the game's name on the image. It is wrapped and sized
+        # to fit when it is drawn (see text_layout).
+        name_text = game["name"]
+        if slug != "":
+            name_text = slug.replace('-', ' ')
+
+    return data, name_text
+
+def fetch_grid_source(game, with_text=False, igdb_client=None):
+    """
+        Finds and downloads the cover image of a game on IGDB,
+        to create a custom grid image from
+
+        Paramaters:
+            game - A dictionary containing the Non-Steam game information
+            with_text - Whether the game's name should be drawn on the grid image
+            igdb_client - The IGDB client to search with. Defaults to get_igdb_client().
+
+        Returns:
+            A tuple of the cover image bytes and the text to draw on it (or None),
+            or None if no cover image could be downloaded
+    """
+
+    source = find_grid_sources([game], igdb_client)[0]
+    if source is None:
+        return None
+
+    return download_grid_source(game, source[0], source[1], with_text)
+
+def _render_timed(data, variants, title):
+
+    """
+        Renders artwork variants (see artwork.render_variants_safe) in a worker
+        process, and returns the images with the seconds it took
+    """
+
+    start = time.perf_counter()
+    images = artwork.render_variants_safe(data, variants, title)
+    return images, time.perf_counter() - start
+
+def _save_grid_images(game, file_name, images):
+
+    """
+        Saves the rendered artwork variants of a game next to file_name
+
+        Returns:
+            True if the images were saved, False otherwise
+    """
+
+    if images is None:
+        print("{}[X]{} Could not read the cover image for {} from IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
+        return False
+
+    folder, name = os.path.split(file_name)
+    artwork.write_variants(folder, os.path.splitext(name)[0], images)
+    return True
+
+def create_grid_image(game, file_name, with_text=False, igdb_client=None, variants=(artwork.GRID,)):
+    """
+        Creates a grid image for a game by looking for a big image
+        on IGDB, and then manipulating it to look good as a grid image
+
+        Paramaters:
+            game - A dictionary containing the Non-Steam game information
+            file_name - A string telling the function where to save the image to
+            igdb_client - The IGDB client to search with. Defaults to get_igdb_client().
+            variants - The artwork variants to create from the cover image (see artwork.DEFAULT_VARIANTS).
+                       They are saved next to file_name, with their suffix added to its name.
+                       Defaults to the grid image only.
+    """
+
+    source = fetch_grid_source(game, with_text, igdb_client)
+    if source is None:
+        return False
+
+    # Decode the image once, and edit, resize and crop it to every variant
+    return _save_grid_images(game, file_name, artwork.render_variants_safe(source[0], variants, source[1]))
+
+def create_grid_images(jobs, with_text=False, igdb_client=None, variants=(artwork.GRID,),
+                       workers=None, fetch_workers=8, on_result=None):
+    """
+        Creates grid images for many games. The games are looked up on IGDB
+        in batches, then the cover images are downloaded by a pool of threads,
+        and rendered by a pool of processes as soon as they are downloaded,
+        so the downloads and the rendering overlap.
+
+        Paramaters:
+            jobs - A list of (game, file_name) tuples (see create_grid_image)
+            with_text - Whether the games' names should be drawn on the grid images
+            igdb_client - The IGDB client to search with. Defaults to get_igdb_client().
+            variants - The artwork variants to create (see create_grid_image)
+            workers - Number of rendering processes. Defaults to the number of CPU cores.
+            fetch_workers - Number of downloading threads. Defaults to 8.
+            on_result - Function called with (game, success) for every game when it is done
+
+        Returns:
+            A list of whether the images of every job were created, in the same order as the jobs
+    """
+
+    igdb_client = igdb_client or get_igdb_client()
+    results = [False] * len(jobs)
+
+    def report(index, success):
+        results[index] = success
+        if on_result is not None:
+            on_result(jobs[index][0], success)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+         concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as renderers:
+        sources = find_grid_sources([game for game, file_name in jobs], igdb_client)
+
+        fetches = {}
+        for index, ((game, file_name), source) in enumerate(zip(jobs, sources)):
+            if source is None:
+                report(index, False)
+                continue
+            fetches[fetchers.submit(download_grid_source, game, source[0], source[1], with_text)] = index
+
+        # Render every cover image as soon as it is downloaded
+        renders = {}
+        for future in concurrent.futures.as_completed(fetches):
+            index = fetches[future]
+            source = future.result()
+            if source is None:
+                report(index, False)
+                continue
+            renders[renderers.submit(_render_timed, source[0], variants, source[1])] = index
+
+        run_metrics = metrics.get_default_metrics()
+        for future in concurrent.futures.as_completed(renders):
+            index = renders[future]
+            game, file_name = jobs[index]
+            images, seconds = future.result()
+            run_metrics.observe("render", seconds)
+            report(index, _save_grid_images(game, file_name, images))
+
+    return results
+
+def download_bytes(url):
+
+    """
+        Downloads an image into memory
+
+        Returns:
+            The contents of the image as bytes
+
+        Raises:
+            requests.RequestException - If the download failed, or it is too large or not an image
+    """
+
+    return downloader.download_bytes(url)
+
+def resize_and_crop(img_path, modified_path, size, crop_type='middle'):
+    """
+    (Thanks to github.com/sigilioso)
+
+    Resize and crop an image to fit the specified size.
+
+    args:
+        img_path: path for the image to resize.
+        modified_path: path to store the modified image.
+        size: `(width, height)` tuple.
+        crop_type: can be 'top', 'middle' or 'bottom', depending on this
+            value, the image will cropped getting the 'top/left', 'middle' or
+            'bottom/right' of the image to fit the size.
+    raises:
+        Exception: if can not open the file in img_path of there is problems
+            to save the image.
+        ValueError: if an invalid `crop_type` is provided.
+    """
+    with open(img_path, "rb") as f:
+        img, original_size = artwork.open_image(f.read(), size)
+    img = artwork.fit_image(img, size, crop_type)
+    img.save(modified_path)
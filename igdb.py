@@ -0,0 +1,250 @@
+"""
+    Client for the IGDB API. Its requests are sent through a
+    RequestScheduler, which keeps a pool of keep-alive connections.
+
+    Many games can be looked up at once: their searches are combined into
+    multiquery requests, and all their covers are fetched with one
+    "where id = (...)" query, so the number of round-trips doesn't grow
+    with the number of games.
+
+    Example:
+        client = IGDB(config.IGDB_API_KEY)
+        game = client.search_game("Overwatch")
+        cover = client.cover(game["cover"])
+
+        games = client.search_games(["Overwatch", "Half-Life 2"])
+        covers = client.covers([game["cover"] for game in games.values() if game])
+"""
+
+import requests
+import metrics
+import request_scheduler
+
+# Base URL of the IGDB API
+BASE_URL = "https://api-v3.igdb.com"
+
+# Maximum number of queries in one multiquery request
+MULTIQUERY_SIZE = 10
+
+# Maximum number of results of one query
+MAX_LIMIT = 500
+
+# Fields of the games returned by the searches
+GAME_FIELDS = "artworks,cover,slug"
+
+# Result of a multiquery query whose request failed (as opposed to None,
+# nothing was found). Failures are transient, so they are never cached.
+FAILED = object()
+
+def _quote(text):
+
+    """
+        Returns a string as a quoted string of the IGDB query language
+    """
+
+    return "\"{}\"".format(text.replace("\\", "").replace("\"", ""))
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class IGDB(object):
+
+    """
+        An IGDB API client. Safe to use from several threads.
+    """
+
+    def __init__(self, api_key, scheduler=None, base_url=BASE_URL, cache=None):
+
+        """
+            Parameters:
+                api_key - IGDB API key
+                scheduler - RequestScheduler to send the requests with.
+                            Defaults to request_scheduler.get_default_scheduler().
+                base_url - Base URL of the API. Defaults to BASE_URL.
+                cache - A ResponseCache for the responses. Defaults to None (no caching).
+        """
+
+        self.scheduler = scheduler or request_scheduler.get_default_scheduler()
+        self.headers = {"user-key": api_key}
+        self.base_url = base_url
+        self.cache = cache
+
+    def _fetch(self, endpoint, query):
+
+        """
+            Sends a query to an endpoint of the API
+
+            Returns:
+                The list of results, or None if nothing was found
+
+            Raises:
+                requests.RequestException - If the request failed
+                ValueError - If the response is not valid JSON
+        """
+
+        with metrics.get_default_metrics().timer("igdb" + endpoint):
+            r = self.scheduler.post(self.base_url + endpoint, headers=self.headers, data=query.encode("utf-8"))
+        r.raise_for_status()
+        return r.json() or None
+
+    def query(self, endpoint, query):
+
+        """
+            Sends a query to an endpoint of the API, or returns the
+            cached response if there is one
+
+            Parameters:
+                endpoint - The endpoint, for example "/games"
+                query - The query in the IGDB query language
+
+            Returns:
+                The list of results, or None if the request failed or nothing was found
+        """
+
+        try:
+            if self.cache is None:
+                return self._fetch(endpoint, query)
+            return self.cache.cached("igdb" + endpoint, query, lambda: self._fetch(endpoint, query))
+        except (requests.RequestException, ValueError):
+            return None
+
+    def search_game(self, name):
+
+        """
+            Searches a game by name
+
+            Returns:
+                The best match (a dictionary with "artworks", "cover" and "slug"),
+                or None if nothing was found
+        """
+
+        r = self.query("/games", "search {}; fields {};".format(_quote(name), GAME_FIELDS))
+        if not r:
+            return None
+        return r[0]
+
+    def cover(self, cover_id):
+
+        """
+            Gets a cover image by its ID
+
+            Returns:
+                The cover (a dictionary with "url", "width", "height", ...),
+                or None if it was not found
+        """
+
+        r = self.query("/covers", "fields *; where id={};".format(cover_id))
+        if not r:
+            return None
+        return r[0]
+
+    def _cached_items(self, endpoint, keys):
+
+        """
+            Looks up items cached one by one (see search_games and covers)
+
+            Returns:
+                A tuple of a dictionary of the cached keys and their items,
+                and a list of the keys that are not cached
+        """
+
+        found = {}
+        missing = []
+        for key in keys:
+            hit, value = self.cache.get(endpoint, key) if self.cache is not None else (False, None)
+            if hit:
+                found[key] = value
+            else:
+                missing.append(key)
+        return found, missing
+
+    def _cache_item(self, endpoint, key, value):
+        if self.cache is not None:
+            self.cache.set(endpoint, key, value)
+
+    def multiquery(self, queries):
+
+        """
+            Sends several queries in as few requests as possible
+
+            Parameters:
+                queries - A list of (endpoint, query) tuples, for example ("games", "search \"Overwatch\"; fields slug;")
+
+            Returns:
+                A list of the results of every query, in the same order as the queries.
+                The results of a query are None if nothing was found, and FAILED
+                if its request failed.
+        """
+
+        results = [FAILED] * len(queries)
+        for start in range(0, len(queries), MULTIQUERY_SIZE):
+            batch = queries[start:start + MULTIQUERY_SIZE]
+            body = "".join("query {} \"{}\" {{ {} }};".format(endpoint, start + i, query)
+                           for i, (endpoint, query) in enumerate(batch))
+            try:
+                r = self._fetch("/multiquery", body)
+            except (requests.RequestException, ValueError):
+                continue
+
+            # The batch was answered: the queries without results found nothing
+            results[start:start + len(batch)] = [None] * len(batch)
+            for entry in r or ():
+                try:
+                    i = int(entry["name"])
+                    if start <= i < start + len(batch):
+                        results[i] = entry.get("result") or None
+                except (KeyError, ValueError, TypeError):
+                    continue
+        return results
+
+    def search_games(self, names):
+
+        """
+            Searches many games by name, with multiquery requests
+
+            Returns:
+                A dictionary of every name and its best match (see search_game),
+                or None if nothing was found or its request failed.
+                Only the names whose request was answered are cached.
+        """
+
+        names = list(dict.fromkeys(names))
+        results, missing = self._cached_items("igdb/search", names)
+
+        queries = [("games", "search {}; fields {}; limit 1;".format(_quote(name), GAME_FIELDS)) for name in missing]
+        for name, r in zip(missing, self.multiquery(queries)):
+            if r is FAILED:
+                results[name] = None
+                continue
+            results[name] = r[0] if r else None
+            self._cache_item("igdb/search", name, results[name])
+
+        return results
+
+    def covers(self, cover_ids):
+
+        """
+            Gets many cover images by their IDs, MAX_LIMIT covers per request
+
+            Returns:
+                A dictionary of every cover ID and its cover (see cover),
+                or None if it was not found
+        """
+
+        cover_ids = list(dict.fromkeys(cover_ids))
+        results, missing = self._cached_items("igdb/cover", cover_ids)
+
+        for batch in _chunks(missing, MAX_LIMIT):
+            query = "fields *; where id = ({}); limit {};".format(",".join(str(cover_id) for cover_id in batch), len(batch))
+            try:
+                r = self._fetch("/covers", query) or []
+            except (requests.RequestException, ValueError):
+                continue
+
+            by_id = {cover.get("id"): cover for cover in r}
+            for cover_id in batch:
+                results[cover_id] = by_id.get(cover_id)
+                self._cache_item("igdb/cover", cover_id, results[cover_id])
+
+        return results
@@ -0,0 +1,146 @@
+"""
+    Concurrent scanner for the app manifests (.acf) of Steam libraries.
+
+    Libraries are grouped by the drive they are on, and every drive gets its
+    own pool of worker threads, so a slow hard drive does not hold back the
+    libraries on a fast one. Results are streamed back as soon as they are parsed.
+
+    Example:
+        for path, game in scan_libraries(libraries, read_manifest):
+            print(game)
+"""
+
+import os
+import queue
+import threading
+
+# Default number of worker threads for each drive
+DEFAULT_WORKERS = 4
+
+# Put on the results queue by a drive's thread when it is done
+_DONE = object()
+
+def get_drive(path):
+
+    """
+        Returns an identifier of the drive a path is on
+    """
+
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.splitdrive(os.path.abspath(path))[0]
+
+def group_by_drive(libraries):
+
+    """
+        Groups library paths by the drive they are on
+
+        Returns:
+            A list of lists of library paths, one list for every drive
+    """
+
+    drives = {}
+    for library in libraries:
+        drives.setdefault(get_drive(library), []).append(library)
+
+    return list(drives.values())
+
+def iter_manifest_paths(library):
+
+    """
+        Yields the paths of the app manifest files (.acf) of a library
+
+        Parameters:
+            library - The library folder (the one containing "steamapps")
+    """
+
+    try:
+        with os.scandir(os.path.join(library, "steamapps")) as entries:
+            for entry in entries:
+                if entry.name.endswith(".acf") and entry.is_file():
+                    yield entry.path
+    except OSError:
+        print("Could not read the Steam library at " + library)
+
+def _scan_drive(libraries, parse, workers, results, cache, namespace):
+
+    """
+        Scans the libraries of one drive with its own pool of worker threads,
+        putting (path, data) tuples on the results queue as they are parsed.
+        Plain threads are used rather than concurrent.futures, which is slow
+        to import, to keep the listing scripts quick to start.
+    """
+
+    paths = queue.Queue()
+
+    def work():
+        while True:
+            path = paths.get()
+            if path is _DONE:
+                return
+            try:
+                if cache is None:
+                    data = parse(path)
+                else:
+                    data = cache.get(namespace, path, parse)
+            except (OSError, ValueError, KeyError, SyntaxError) as e:
+                print("Could not read manifest " + path)
+                print(e)
+                continue
+            results.put((path, data))
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, workers))]
+    try:
+        for thread in threads:
+            thread.start()
+        for library in libraries:
+            for path in iter_manifest_paths(library):
+                paths.put(path)
+    finally:
+        for thread in threads:
+            paths.put(_DONE)
+        for thread in threads:
+            if thread.ident is not None:
+                thread.join()
+        results.put(_DONE)
+
+def scan_libraries(libraries, parse, workers=DEFAULT_WORKERS, cache=None, namespace="manifests", prune=True):
+
+    """
+        Scans the app manifests of Steam libraries concurrently,
+        yielding them as soon as they are parsed.
+
+        Parameters:
+            libraries - A list of library folders
+            parse - Function that takes a manifest path and returns its parsed contents
+            workers - Number of worker threads for each drive. Defaults to DEFAULT_WORKERS.
+            cache - A ScanCache to reuse manifests parsed by previous scans. Defaults to None.
+            namespace - The cache namespace of the manifests. Defaults to "manifests".
+            prune - Whether to drop the cache entries of the manifests that were not seen.
+                    Set it to False when scanning only some of the libraries. Defaults to True.
+
+        Returns:
+            A generator of (path, data) tuples, in the order they finished parsing
+    """
+
+    drives = group_by_drive(libraries)
+    results = queue.Queue()
+
+    prune = prune and cache is not None
+    if prune:
+        cache.begin(namespace)
+
+    for drive in drives:
+        threading.Thread(target=_scan_drive, args=(drive, parse, workers, results, cache, namespace), daemon=True).start()
+
+    remaining = len(drives)
+    while remaining:
+        result = results.get()
+        if result is _DONE:
+            remaining -= 1
+            continue
+        yield result
+
+    if prune:
+        cache.end(namespace)
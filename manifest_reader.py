@@ -0,0 +1,115 @@
+"""
+    Lightweight reader for Steam app manifests (appmanifest_*.acf).
+
+    Only the top level keys of the "AppState" section that are asked for
+    are read, and reading stops as soon as all of them were found. Anything
+    the reader does not expect (escaped characters, unusual layout, missing
+    keys) makes it fall back to a full parse with the vdf module.
+
+    Example:
+        read_manifest(path, ("appid", "name", "SizeOnDisk"))
+        {"appid": "228980", "name": "Steamworks Common Redistributables", "SizeOnDisk": "121000000"}
+"""
+
+import re
+
+# Keys read when none are given
+DEFAULT_KEYS = ("appid", "name")
+
+# A "key" "value" line
+_PAIR = re.compile(r'^\s*"([^"\\]*)"\s+"([^"\\]*)"\s*$')
+
+# A "key" line that opens a nested section
+_SECTION = re.compile(r'^\s*"([^"\\]*)"\s*$')
+
+def _full_parse(path, keys):
+
+    """
+        Reads the requested keys with a full vdf parse of the manifest
+    """
+
+    import vdf
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        manifest = vdf.parse(f)
+
+    # Find the AppState section regardless of its case
+    state = {}
+    for name, section in manifest.items():
+        if name.lower() == "appstate" and isinstance(section, dict):
+            state = section
+            break
+
+    values = {key.lower(): value for key, value in state.items() if not isinstance(value, dict)}
+    return {key: values[key.lower()] for key in keys if key.lower() in values}
+
+def read_manifest(path, keys=DEFAULT_KEYS):
+
+    """
+        Reads some of the top level keys of an app manifest
+
+        Parameters:
+            path - Path of the manifest file (.acf)
+            keys - The keys to read from the AppState section
+                   (for example appid, name, SizeOnDisk, StateFlags, LastUpdated).
+                   Keys are matched case-insensitively.
+                   Defaults to DEFAULT_KEYS.
+
+        Returns:
+            A dictionary of the requested keys that exist in the manifest, and their
+            values as strings
+
+        Raises:
+            OSError - If the file can not be read
+            SyntaxError - If the manifest can not be parsed
+    """
+
+    wanted = {key.lower(): key for key in keys}
+    found = {}
+    depth = 0
+    in_state = False
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped:
+                continue
+
+            if stripped == "{":
+                if not in_state:
+                    return _full_parse(path, keys)
+                depth += 1
+                continue
+            if stripped == "}":
+                depth -= 1
+                if depth <= 0:
+                    break
+                continue
+
+            if depth == 0:
+                # The only thing expected outside of a section is the AppState key
+                match = _SECTION.match(line)
+                if match is None or match.group(1).lower() != "appstate":
+                    return _full_parse(path, keys)
+                in_state = True
+                continue
+
+            if depth > 1:
+                continue
+
+            match = _PAIR.match(line)
+            if match is not None:
+                key = match.group(1).lower()
+                if key in wanted and wanted[key] not in found:
+                    found[wanted[key]] = match.group(2)
+                    if len(found) == len(wanted):
+                        return found
+                continue
+
+            if _SECTION.match(line) is None:
+                return _full_parse(path, keys)
+
+    if not in_state or len(found) != len(wanted):
+        return _full_parse(path, keys)
+
+    return found
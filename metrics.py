@@ -0,0 +1,341 @@
+"""
+    Run metrics: stage timers, counters, and latency histograms,
+    with optional cProfile and tracemalloc hooks.
+
+    The helpers record into the shared Metrics object (get_default_metrics()),
+    which can be printed as a live one-line summary while a run is going, and
+    written as a JSON report at the end of it.
+
+    Example:
+        metrics = get_default_metrics()
+        with metrics.stage("download"):
+            ...
+        metrics.incr("download.bytes", len(data))
+        metrics.observe("http.latency", 0.12)
+
+        with LiveSummary(metrics), profile(metrics, cpu=True):
+            run()
+        metrics.write_json("report.json")
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import atomic_file
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60)
+
+# Seconds between two lines of the live summary
+DEFAULT_INTERVAL = 5
+
+# Number of functions and allocation sites kept in the profiles
+PROFILE_TOP = 25
+
+class Histogram(object):
+
+    """
+        Counts values in the buckets of BUCKETS (and one for larger values)
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, fraction):
+
+        """
+            Returns an estimate of a percentile: the upper bound of the bucket
+            it falls in (or the maximum, for the last bucket)
+        """
+
+        if not self.count:
+            return None
+
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": {("{}".format(bound) if i < len(BUCKETS) else "inf"): count
+                        for i, (bound, count) in enumerate(zip(BUCKETS + (None,), self.counts)) if count},
+        }
+
+class Metrics(object):
+
+    """
+        Counters, stage timers and histograms of a run. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._stages = {}
+        self._histograms = {}
+        self._active = []
+        self._extra = {}
+
+    def incr(self, name, value=1):
+
+        """
+            Adds value to a counter
+        """
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+
+        """
+            Adds a latency to a histogram
+        """
+
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+
+        """
+            Times a stage of the run. A stage can run more than once,
+            its times are added up.
+        """
+
+        start = time.perf_counter()
+        with self._lock:
+            self._active.append(name)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active.remove(name)
+                stage = self._stages.setdefault(name, {"seconds": 0.0, "runs": 0})
+                stage["seconds"] += elapsed
+                stage["runs"] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name):
+
+        """
+            Times one operation into a histogram
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name, function):
+
+        """
+            Returns a function that calls function and times every call into a histogram
+        """
+
+        def wrapper(*args, **kwargs):
+            with self.timer(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def set_extra(self, name, value):
+
+        """
+            Adds a section to the report (for example a profile)
+        """
+
+        with self._lock:
+            self._extra[name] = value
+
+    def report(self):
+
+        """
+            Returns everything that was recorded, as a JSON serializable dictionary
+        """
+
+        with self._lock:
+            report = {
+                "started": self.started,
+                "seconds": time.time() - self.started,
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+                "active_stages": list(self._active),
+                "counters": dict(self._counters),
+                "histograms": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+            }
+            report.update(self._extra)
+        return report
+
+    def summary(self):
+
+        """
+            Returns a one-line summary of the run so far
+        """
+
+        with self._lock:
+            parts = ["{:.1f}s".format(time.time() - self.started)]
+            if self._active:
+                parts.append("stage: {}".format(", ".join(self._active)))
+            for name in sorted(self._counters):
+                parts.append("{} {}".format(name, self._counters[name]))
+            for name in sorted(self._histograms):
+                histogram = self._histograms[name]
+                parts.append("{} n={} p50={:.0f}ms p90={:.0f}ms".format(
+                    name, histogram.count, histogram.percentile(0.5) * 1000, histogram.percentile(0.9) * 1000))
+        return " | ".join(parts)
+
+    def write_json(self, path):
+
+        """
+            Writes the report to a JSON file, replacing it atomically
+        """
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        atomic_file.atomic_write(path, json.dumps(self.report(), indent=2, sort_keys=True))
+
+    def reset(self):
+
+        """
+            Forgets everything that was recorded
+        """
+
+        with self._lock:
+            self.started = time.time()
+            self._counters = {}
+            self._stages = {}
+            self._histograms = {}
+            self._extra = {}
+
+class LiveSummary(object):
+
+    """
+        Prints the summary of a Metrics object every interval seconds,
+        on a background thread, while it is used as a context manager
+    """
+
+    def __init__(self, metrics, interval=DEFAULT_INTERVAL, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            print("[metrics] " + self.metrics.summary(), file=self.stream, flush=True)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+@contextlib.contextmanager
+def profile(metrics, cpu=False, memory=False, stats_path=None):
+
+    """
+        Profiles a block of code, adding the top functions (cProfile) and
+        the top allocation sites (tracemalloc) to the report of metrics
+
+        Parameters:
+            metrics - The Metrics to add the profiles to
+            cpu - Whether to profile with cProfile
+            memory - Whether to trace memory allocations with tracemalloc
+            stats_path - Where to also dump the raw cProfile stats (for pstats or snakeviz).
+                         Defaults to None.
+    """
+
+    if not cpu and not memory:
+        yield
+        return
+
+    # Only imported when profiling, they are slow to import
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile() if cpu else None
+    if memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if stats_path:
+                profiler.dump_stats(stats_path)
+
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+            metrics.set_extra("cpu_profile", output.getvalue())
+
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            tracemalloc.stop()
+            metrics.set_extra("memory_profile", {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"location": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in top],
+            })
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+def get_default_metrics():
+
+    """
+        Returns the Metrics shared by the helpers
+    """
+
+    global _default_metrics
+
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
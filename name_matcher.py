@@ -0,0 +1,249 @@
+"""
+    Fuzzy matching of game names.
+
+    Names are normalized first (case, accents, punctuation, roman numerals,
+    edition suffixes like "GOTY" or "Definitive Edition"), then compared by
+    their character trigrams and words. Candidates are kept in a trigram
+    index, so matching many names against a big catalog only compares each
+    name with the candidates that share trigrams with it.
+
+    Example:
+        matcher = NameMatcher(["The Witcher 3: Wild Hunt", "Half-Life 2"])
+        matcher.match("Witcher III - Game of the Year Edition")
+        [Match(entry='The Witcher 3: Wild Hunt', name='The Witcher 3: Wild Hunt', score=0.84)]
+"""
+
+import collections
+import heapq
+import re
+import unicodedata
+
+# Default minimum score of a match
+DEFAULT_THRESHOLD = 0.5
+
+# Weight of the trigram similarity in the score (the rest is the word similarity)
+TRIGRAM_WEIGHT = 0.5
+
+# Score multiplier for names with different numbers ("Half-Life" and "Half-Life 2")
+NUMBER_MISMATCH_PENALTY = 0.8
+
+# Suffixes that don't change which game a name refers to
+EDITION_SUFFIXES = (
+    "game of the year edition",
+    "game of the year",
+    "goty edition",
+    "goty",
+    "definitive edition",
+    "deluxe edition",
+    "complete edition",
+    "enhanced edition",
+    "special edition",
+    "collectors edition",
+    "gold edition",
+    "ultimate edition",
+    "anniversary edition",
+    "standard edition",
+    "directors cut",
+    "remastered",
+    "edition",
+)
+
+# Leading words that are often left out
+LEADING_ARTICLES = ("the",)
+
+_ROMAN_NUMERALS = {"i": 1, "v": 5, "x": 10, "l": 50}
+_ROMAN_NUMERAL = re.compile(r"^(x{0,3})(ix|iv|v?i{0,3})$")
+_NOT_WORD = re.compile(r"[^a-z0-9]+")
+
+# A scored match of a candidate
+Match = collections.namedtuple("Match", ["entry", "name", "score"])
+
+def _roman_to_int(word):
+
+    """
+        Returns the value of a roman numeral from II to XXXIX,
+        or None if the word is not one
+    """
+
+    if len(word) < 2 or not _ROMAN_NUMERAL.match(word):
+        return None
+
+    value = 0
+    for i, c in enumerate(word):
+        digit = _ROMAN_NUMERALS[c]
+        if i + 1 < len(word) and _ROMAN_NUMERALS[word[i + 1]] > digit:
+            value -= digit
+        else:
+            value += digit
+    return value
+
+def normalize(name):
+
+    """
+        Normalizes a game name for comparison: lower case, no accents,
+        no punctuation, arabic numbers instead of roman numerals,
+        and no edition suffix or leading article
+
+        Example:
+            normalize("The Witcher III: Wild Hunt - GOTY") == "witcher 3 wild hunt"
+    """
+
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    name = name.replace("&", " and ").replace("'", "")
+
+    words = []
+    for word in _NOT_WORD.split(name):
+        if not word:
+            continue
+        value = _roman_to_int(word)
+        words.append(str(value) if value is not None else word)
+
+    name = " ".join(words)
+
+    # Remove edition suffixes, possibly more than one ("remastered edition")
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in EDITION_SUFFIXES:
+            if name.endswith(" " + suffix):
+                name = name[:-len(suffix) - 1]
+                stripped = True
+
+    for article in LEADING_ARTICLES:
+        if name.startswith(article + " "):
+            name = name[len(article) + 1:]
+
+    return name
+
+def trigrams(normalized):
+
+    """
+        Returns the set of character trigrams of a normalized name
+    """
+
+    padded = "  " + normalized + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameMatcher(object):
+
+    """
+        A trigram index of candidate names that can be searched for
+        the candidates most similar to a name
+    """
+
+    def __init__(self, entries=(), key=None):
+
+        """
+            Parameters:
+                entries - The candidates. Either names, or any objects when key is given.
+                key - Function that returns the name of an entry. Defaults to None
+                      (the entries are the names).
+        """
+
+        self.key = key or (lambda entry: entry)
+        self._entries = []
+        self._names = []
+        self._normalized = []
+        self._trigrams = []
+        self._words = []
+        self._numbers = []
+        self._index = collections.defaultdict(list)
+        self._exact = collections.defaultdict(list)
+
+        self.add(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entries):
+
+        """
+            Adds candidates to the index
+        """
+
+        for entry in entries:
+            name = self.key(entry)
+            normalized = normalize(name)
+            grams = trigrams(normalized)
+
+            i = len(self._entries)
+            self._entries.append(entry)
+            self._names.append(name)
+            self._normalized.append(normalized)
+            self._trigrams.append(len(grams))
+            self._words.append(frozenset(normalized.split()))
+            self._numbers.append(frozenset(word for word in normalized.split() if word.isdigit()))
+            self._exact[normalized].append(i)
+            for gram in grams:
+                self._index[gram].append(i)
+
+    def match(self, name, k=5, threshold=DEFAULT_THRESHOLD):
+
+        """
+            Finds the candidates most similar to a name
+
+            Parameters:
+                name - The name to look for
+                k - Maximum number of matches to return. Defaults to 5.
+                threshold - Minimum score (0 to 1) of a match. Defaults to DEFAULT_THRESHOLD.
+
+            Returns:
+                A list of up to k Match tuples, best first
+        """
+
+        normalized = normalize(name)
+        grams = trigrams(normalized)
+        words = frozenset(normalized.split())
+        numbers = frozenset(word for word in words if word.isdigit())
+
+        # Count the trigrams every candidate shares with the name
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self._index.get(gram, ()))
+
+        exact = set(self._exact.get(normalized, ()))
+
+        scores = []
+        for i, count in shared.items():
+            if i in exact:
+                score = 1.0
+            else:
+                dice = 2.0 * count / (len(grams) + self._trigrams[i])
+
+                # How many of the words of the shorter name are in the other one
+                smaller = min(len(words), len(self._words[i]))
+                overlap = len(words & self._words[i]) / smaller if smaller else 0.0
+
+                score = TRIGRAM_WEIGHT * dice + (1 - TRIGRAM_WEIGHT) * overlap
+                if numbers != self._numbers[i]:
+                    score *= NUMBER_MISMATCH_PENALTY
+            if score >= threshold:
+                # Ties go to the candidate that was added first
+                scores.append((score, -i))
+
+        best = heapq.nlargest(k, scores)
+        return [Match(self._entries[-i], self._names[-i], score) for score, i in best]
+
+    def best(self, name, threshold=DEFAULT_THRESHOLD):
+
+        """
+            Returns the entry most similar to a name,
+            or None if no candidate scores at least threshold
+        """
+
+        matches = self.match(name, 1, threshold)
+        if not matches:
+            return None
+        return matches[0].entry
+
+    def match_many(self, names, k=5, threshold=DEFAULT_THRESHOLD):
+
+        """
+            Finds the best candidates for many names
+
+            Returns:
+                A dictionary of every name and its list of Match tuples
+        """
+
+        return {name: self.match(name, k, threshold) for name in names}
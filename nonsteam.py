@@ -1,13 +1,12 @@
-import utils
+import sys
+import cli
 
 """
-    Prints a list of Non-Steam games added to your Steam library
-    Each entry contains the game's name, exe, app ID, user ID
-"""
+    Prints a list of Non-Steam games added to your Steam library, as they are found
+    Each entry contains the game's app ID, name, exe and user ID
 
-games = utils.get_non_steam_games()
-if not games:
-    print("Could not find any Non-Steam games in your Steam library.")
-    exit()
+    Takes the options of "python cli.py nonsteam", for example:
+        python nonsteam.py --user 12345678 --format json
+"""
 
-print(games)
\ No newline at end of file
+sys.exit(cli.main(["nonsteam"] + sys.argv[1:]))
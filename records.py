@@ -0,0 +1,109 @@
+"""
+    Compact records of the games found by utils: installed Steam games
+    and Non-Steam games (shortcuts).
+
+    The records use __slots__ instead of a dictionary per game, store the
+    app IDs as ints, and intern the strings many records share (user IDs,
+    library paths), so large inventories take a fraction of the memory.
+    They can still be used like the dictionaries the helpers used to return.
+
+    Example:
+        game = Shortcut(14990700086697132032, "Overwatch", "\"D:\\Overwatch\\Overwatch.exe\"", "12345678")
+        print(game.appid, game["name"], game.get("user"), dict(game))
+"""
+
+import sys
+
+class Record(object):
+
+    """
+        Base of the records: dictionary-style access to their fields
+        (game["name"], game.get("name"), "name" in game, dict(game), ...).
+        The fields are fixed, a record can not get new keys.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def values(self):
+        return [getattr(self, key) for key in self.__slots__]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join("{}={!r}".format(key, value) for key, value in self.items()))
+
+class InstalledGame(Record):
+
+    """
+        A Steam game installed in a library
+
+        Fields:
+            appid - The app ID, as an int
+            name - The name of the game
+            library - The library folder the game is installed in
+    """
+
+    __slots__ = ("appid", "name", "library")
+
+    def __init__(self, appid, name, library=None):
+        self.appid = int(appid)
+        self.name = name
+        self.library = sys.intern(library) if library is not None else None
+
+class Shortcut(Record):
+
+    """
+        A Non-Steam game added to the library of a Steam user
+
+        Fields:
+            appid - The app ID generated for the game, as an int
+            name - The name of the game
+            exe - The target of the shortcut, usually quoted
+            user - The ID of the Steam user
+    """
+
+    __slots__ = ("appid", "name", "exe", "user")
+
+    def __init__(self, appid, name, exe, user):
+        self.appid = int(appid) if appid is not None else None
+        self.name = name
+        self.exe = exe
+        self.user = sys.intern(user)
@@ -0,0 +1,372 @@
+"""
+    Shared scheduler for the HTTP requests sent to the APIs.
+
+    Every request goes through:
+        - A per-host token bucket, so the API rate limits are respected
+        - A deadline for the whole request, retries included, and a timeout
+          for every attempt, so one stalled socket can't hang a run
+        - Retries with jittered exponential backoff on connection errors,
+          timeouts, 429 and 5xx responses, honoring Retry-After
+        - A per-host circuit breaker, which stops sending requests to a host
+          that keeps failing, and lets one through again after a while
+
+    Example:
+        scheduler = RequestScheduler()
+        r = scheduler.get("https://www.steamgriddb.com/api/v2/...", headers=headers)
+"""
+
+import email.utils
+import random
+import threading
+import time
+import urllib.parse
+import requests
+import metrics
+
+# Requests per second and burst size allowed for each host.
+# Hosts that are not listed get DEFAULT_RATE and DEFAULT_BURST.
+HOST_RATE_LIMITS = {
+    "www.steamgriddb.com": (10, 20),
+    "api-v3.igdb.com": (4, 4),
+}
+DEFAULT_RATE = 10
+DEFAULT_BURST = 20
+
+# Seconds to wait for the server on every attempt
+DEFAULT_TIMEOUT = 10
+
+# Seconds a request may take, including all its retries
+DEFAULT_DEADLINE = 60
+
+# Number of retries after the first attempt
+DEFAULT_RETRIES = 3
+
+# Base and maximum seconds to wait between retries
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30
+
+# Consecutive failures that open a host's circuit, and seconds until it is tried again
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60
+
+# Number of connections kept open to every host
+DEFAULT_POOL_SIZE = 16
+
+# Response statuses that are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class DeadlineExceeded(requests.Timeout):
+
+    """
+        Raised when a request could not be completed before its deadline
+    """
+
+class CircuitOpenError(requests.ConnectionError):
+
+    """
+        Raised when a request is refused because its host kept failing
+    """
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+
+    """
+        Creates a requests session that keeps up to pool_size
+        connections open for reuse
+    """
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class TokenBucket(object):
+
+    """
+        Allows rate requests per second on average, and bursts of up to burst requests
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+
+        """
+            Waits until a request may be sent
+
+            Parameters:
+                deadline - time.monotonic() value after which to give up
+
+            Raises:
+                DeadlineExceeded - If no request may be sent before the deadline
+        """
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            if now + wait > deadline:
+                raise DeadlineExceeded("Rate limit wait would exceed the deadline")
+            time.sleep(wait)
+
+class CircuitBreaker(object):
+
+    """
+        Opens after failure_threshold consecutive failures, refusing requests
+        for reset_timeout seconds. After that, one request is let through:
+        if it succeeds the circuit closes, otherwise it opens again. If it
+        ends without either (release()), the next request is let through.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened = None
+        # The thread sending the trial request, or None
+        self._trial = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+
+        """
+            Returns whether a request may be sent
+        """
+
+        with self._lock:
+            if self._opened is None:
+                return True
+            if self._trial is None and time.monotonic() - self._opened >= self.reset_timeout:
+                self._trial = threading.get_ident()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or self._failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+                self._trial = None
+
+    def release(self):
+
+        """
+            Ends the trial request of the calling thread, if it has one,
+            without an outcome. Does nothing after record_success or record_failure.
+        """
+
+        with self._lock:
+            if self._trial == threading.get_ident():
+                self._trial = None
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened is not None
+
+def parse_retry_after(value):
+
+    """
+        Returns the seconds to wait from a Retry-After header
+        (either seconds or an HTTP date), or None if it is missing or invalid
+    """
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+class RequestScheduler(object):
+
+    """
+        Sends HTTP requests with rate limiting, deadlines, retries and
+        circuit breaking. Safe to use from several threads.
+    """
+
+    def __init__(self, session=None, host_rate_limits=HOST_RATE_LIMITS, timeout=DEFAULT_TIMEOUT,
+                 deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+
+        """
+            Parameters:
+                session - requests session to send the requests with.
+                          Defaults to a new session from create_session().
+                host_rate_limits - Dictionary of host to (requests per second, burst).
+                                   Defaults to HOST_RATE_LIMITS.
+                timeout - Seconds to wait for the server on every attempt.
+                deadline - Seconds a request may take, including all its retries.
+                retries - Number of retries after the first attempt.
+                backoff - Base seconds to wait between retries, doubled on every retry.
+                max_backoff - Maximum seconds to wait between retries.
+                failure_threshold - Consecutive failures that open a host's circuit.
+                reset_timeout - Seconds until a host with an open circuit is tried again.
+        """
+
+        self.session = session or create_session()
+        self.host_rate_limits = host_rate_limits
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retried = 0
+        self.failed = 0
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+
+        """
+            Returns the token bucket and circuit breaker of a host
+        """
+
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.host_rate_limits.get(host, (DEFAULT_RATE, DEFAULT_BURST))
+                self._buckets[host] = TokenBucket(rate, burst)
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._buckets[host], self._breakers[host]
+
+    def _backoff(self, attempt):
+
+        """
+            Returns the seconds to wait before a retry, with full jitter
+        """
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, deadline=None, **kwargs):
+
+        """
+            Sends an HTTP request
+
+            Parameters:
+                method - HTTP method
+                url - URL to send the request to
+                deadline - Seconds the request may take, including all its retries.
+                           Defaults to the scheduler's deadline.
+                kwargs - Passed on to requests (headers, params, data, stream, ...)
+
+            Returns:
+                The requests.Response. Responses with an error status are returned
+                as they are once the retries are exhausted.
+
+            Raises:
+                requests.RequestException - If the request could not be sent
+                                            (CircuitOpenError and DeadlineExceeded included)
+        """
+
+        host = urllib.parse.urlsplit(url).netloc
+        bucket, breaker = self._host_state(host)
+        run_metrics = metrics.get_default_metrics()
+        end = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                with self._lock:
+                    self.failed += 1
+                run_metrics.incr("http.failures")
+                raise CircuitOpenError("Too many failures from {}, not sending requests for now".format(host))
+
+            try:
+                bucket.acquire(end)
+
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self.failed += 1
+                    run_metrics.incr("http.failures")
+                    raise DeadlineExceeded("Deadline exceeded for {}".format(url))
+
+                wait = None
+                run_metrics.incr("http.requests")
+                try:
+                    with run_metrics.timer("http.request"):
+                        r = self.session.request(method, url, timeout=min(self.timeout, remaining), **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    breaker.record_failure()
+                    error = e
+                else:
+                    if r.status_code not in RETRY_STATUSES:
+                        breaker.record_success()
+                        return r
+                    # Rate limiting is the server asking to slow down, not a broken host
+                    if r.status_code != 429:
+                        breaker.record_failure()
+                    error = None
+                    wait = parse_retry_after(r.headers.get("Retry-After"))
+            finally:
+                # A trial request that ended without an outcome (deadline, rate limited,
+                # unexpected error) must not keep the circuit half-open forever
+                breaker.release()
+
+            if wait is None:
+                wait = self._backoff(attempt)
+
+            attempt += 1
+            if attempt > self.retries or time.monotonic() + wait >= end:
+                with self._lock:
+                    self.failed += 1
+                run_metrics.incr("http.failures")
+                if error is not None:
+                    raise error
+                return r
+
+            if error is None:
+                r.close()
+            with self._lock:
+                self.retried += 1
+            run_metrics.incr("http.retries")
+            time.sleep(wait)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler():
+
+    """
+        Returns the RequestScheduler shared by the helpers when
+        no scheduler is passed to them
+    """
+
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
@@ -0,0 +1,200 @@
+"""
+    Persistent cache for the responses of the SteamGridDB and IGDB APIs.
+
+    Responses are keyed by endpoint and query, expire after a TTL and the
+    least recently used ones are evicted when the cache grows too big.
+    "Not found" results are cached too (as None), with a shorter TTL.
+
+    Example:
+        cache = ResponseCache()
+        data = cache.cached("/search/autocomplete", {"term": "Overwatch"}, fetch)
+"""
+
+import hashlib
+import json
+import metrics
+import os
+import sqlite3
+import threading
+import time
+
+# Default location of the cache database
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".steamhelper", "responses.sqlite")
+
+# Seconds a response is kept
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# Seconds a "not found" result is kept
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+
+# Maximum number of responses kept
+DEFAULT_MAX_ENTRIES = 20000
+
+# Cache modes:
+# USE - Return cached responses and cache new ones
+# REFRESH - Ignore cached responses, but cache the new ones
+# BYPASS - Don't use the cache at all
+USE = "use"
+REFRESH = "refresh"
+BYPASS = "bypass"
+
+class ResponseCache(object):
+
+    """
+        An SQLite backed cache of API responses. Safe to use from several threads.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, mode=USE):
+
+        """
+            Parameters:
+                path - Location of the cache database. ":memory:" keeps it in memory.
+                ttl - Seconds a response is kept. Defaults to DEFAULT_TTL.
+                negative_ttl - Seconds a "not found" result is kept. Defaults to DEFAULT_NEGATIVE_TTL.
+                max_entries - Maximum number of responses kept. Defaults to DEFAULT_MAX_ENTRIES.
+                mode - USE, REFRESH or BYPASS. Defaults to USE.
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                value TEXT,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def key(endpoint, query):
+
+        """
+            Returns the cache key of an endpoint and query
+        """
+
+        return hashlib.sha1(json.dumps([endpoint, query], sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, endpoint, query):
+
+        """
+            Looks a response up in the cache
+
+            Returns:
+                A tuple of whether the response was found, and the response
+                (None for a cached "not found" result)
+        """
+
+        if self.mode != USE:
+            return False, None
+
+        now = time.time()
+        key = self.key(endpoint, query)
+
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                metrics.get_default_metrics().incr("cache.misses")
+                return False, None
+
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        metrics.get_default_metrics().incr("cache.hits")
+
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def set(self, endpoint, query, value):
+
+        """
+            Stores a response in the cache
+
+            Parameters:
+                endpoint - The API endpoint
+                query - The query sent to the endpoint (anything JSON serializable)
+                value - The response (anything JSON serializable), or None for "not found"
+        """
+
+        if self.mode == BYPASS:
+            return
+
+        now = time.time()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        value = json.dumps(value) if value is not None else None
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (self.key(endpoint, query), endpoint, value, now + ttl, now))
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+
+        """
+            Removes the expired responses, and the least recently used
+            ones if there are more than max_entries
+        """
+
+        self._db.execute("DELETE FROM responses WHERE expires < ?", (now,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute("DELETE FROM responses WHERE key IN "
+                             "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+
+    def cached(self, endpoint, query, fetch):
+
+        """
+            Returns a cached response, or fetches and caches it
+
+            Parameters:
+                endpoint - The API endpoint
+                query - The query sent to the endpoint
+                fetch - Function that takes no arguments and returns the response,
+                        or None if nothing was found. Exceptions it raises
+                        are not cached.
+        """
+
+        found, value = self.get(endpoint, query)
+        if found:
+            return value
+
+        value = fetch()
+        self.set(endpoint, query, value)
+        return value
+
+    def clear(self):
+
+        """
+            Removes every response from the cache
+        """
+
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+
+        """
+            Closes the cache database
+        """
+
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,212 @@
+"""
+    Persistent cache for the results of parsing Steam files
+    (app manifests, shortcuts.vdf, ...).
+
+    Every entry is keyed by the file path, and remembers the modification
+    time and size the file had when it was parsed. A later scan only parses
+    the files that changed since, and forgets the files that were deleted.
+
+    Example:
+        cache = ScanCache()
+        games = cache.scan("manifests", paths, parse_manifest)
+        print(cache.delta("manifests"))
+        cache.save()
+"""
+
+import collections
+import json
+import os
+import threading
+import atomic_file
+
+# Default location of the cache file
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".steamhelper", "scan_cache.json")
+
+# Bumped whenever the format of the cache file changes
+VERSION = 1
+
+# What changed in a namespace during the last scan, as lists of paths
+ScanDelta = collections.namedtuple("ScanDelta", ["added", "changed", "removed"])
+
+class ScanCache(object):
+
+    """
+        An on-disk cache of parsed files, split into namespaces
+        (for example "manifests" and "shortcuts").
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+
+        """
+            Loads the cache from disk. A missing or unreadable cache file
+            results in an empty cache.
+
+            Parameters:
+                path - Location of the cache file. None keeps the cache in memory only.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._seen = {}
+        self._deltas = {}
+        self._dirty = False
+
+        if path is None:
+            return
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if contents.get("version") == VERSION:
+            self._entries = contents.get("namespaces", {})
+
+    def begin(self, namespace):
+
+        """
+            Starts a scan of a namespace. Every file that is not passed
+            to get() before end() is called is considered deleted.
+        """
+
+        with self._lock:
+            self._entries.setdefault(namespace, {})
+            self._seen[namespace] = set()
+            self._deltas[namespace] = ScanDelta([], [], [])
+
+    def get(self, namespace, path, parse):
+
+        """
+            Returns the parsed contents of a file, parsing it only if it
+            is not cached or changed since it was cached.
+
+            Parameters:
+                namespace - Namespace the file belongs to
+                path - Path of the file
+                parse - Function that takes the path and returns the parsed
+                        contents. The result must be JSON serializable.
+
+            Raises:
+                OSError - If the file does not exist or can not be read
+        """
+
+        stat = os.stat(path)
+
+        with self._lock:
+            entries = self._entries.setdefault(namespace, {})
+            self._seen.setdefault(namespace, set()).add(path)
+            entry = entries.get(path)
+            if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return entry["data"]
+
+        data = parse(path)
+
+        with self._lock:
+            delta = self._deltas.setdefault(namespace, ScanDelta([], [], []))
+            if path in entries:
+                delta.changed.append(path)
+            else:
+                delta.added.append(path)
+            entries[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "data": data}
+            self._dirty = True
+
+        return data
+
+    def end(self, namespace):
+
+        """
+            Finishes a scan of a namespace, dropping the entries of the files
+            that were not seen since begin() was called.
+
+            Returns:
+                A ScanDelta of what changed during the scan
+        """
+
+        with self._lock:
+            entries = self._entries.setdefault(namespace, {})
+            seen = self._seen.pop(namespace, set())
+            delta = self._deltas.setdefault(namespace, ScanDelta([], [], []))
+
+            for path in [path for path in entries if path not in seen]:
+                del entries[path]
+                delta.removed.append(path)
+                self._dirty = True
+
+            return delta
+
+    def scan(self, namespace, paths, parse):
+
+        """
+            Scans a complete namespace: parses the given files if needed and
+            drops the entries of the files that are not in the list anymore.
+            Files that can not be read are skipped.
+
+            Returns:
+                A dictionary of each path and its parsed contents
+        """
+
+        self.begin(namespace)
+
+        results = {}
+        for path in paths:
+            try:
+                results[path] = self.get(namespace, path, parse)
+            except OSError:
+                continue
+
+        self.end(namespace)
+
+        return results
+
+    def delta(self, namespace):
+
+        """
+            Returns a ScanDelta of what changed in a namespace during
+            the last scan.
+        """
+
+        with self._lock:
+            return self._deltas.get(namespace, ScanDelta([], [], []))
+
+    def clear(self, namespace=None):
+
+        """
+            Forgets every entry of a namespace, or of all namespaces
+            if no namespace is given.
+        """
+
+        with self._lock:
+            if namespace is None:
+                self._entries = {}
+            else:
+                self._entries.pop(namespace, None)
+            self._dirty = True
+
+    def save(self):
+
+        """
+            Writes the cache to disk, if anything changed since it was loaded.
+            The file is replaced atomically so a crash never leaves a partial cache.
+        """
+
+        if self.path is None:
+            return
+
+        with self._lock:
+            if not self._dirty:
+                return
+            contents = json.dumps({"version": VERSION, "namespaces": self._entries})
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic_file.atomic_write(self.path, contents)
+        except BaseException:
+            # Keep the changes for the next save
+            with self._lock:
+                self._dirty = True
+            raise
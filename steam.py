@@ -1,13 +1,12 @@
-import utils
+import sys
+import cli
 
 """
-    Prints a list of installed Steam games
-    Each entry contains the game's appid, name
-"""
+    Prints a list of installed Steam games, as they are found
+    Each entry contains the game's appid, name and library
 
-games = utils.get_installed_games()
-if not games:
-    print("Could not find any Steam games installed on your system.")
-    exit()
+    Takes the options of "python cli.py installed", for example:
+        python steam.py --format tsv --fields appid,name
+"""
 
-print(games)
\ No newline at end of file
+sys.exit(cli.main(["installed"] + sys.argv[1:]))
@@ -0,0 +1,296 @@
+"""
+    Information about the local Steam installation (installation path,
+    users, libraries, grid folders), resolved once and cached.
+
+    Where the installation is found is decided by a resolver:
+        RegistryResolver - Looks in the Windows registry (default on Windows)
+        PathResolver - Uses a known directory (default elsewhere, and handy
+                       for pointing the helpers at a copy of a Steam directory)
+
+    Example:
+        env = SteamEnvironment(PathResolver("/home/me/.local/share/Steam"))
+        for user in env.users:
+            print(env.grid_folder(user))
+"""
+
+import os
+import sys
+import threading
+
+class RegistryResolver(object):
+
+    """
+        Finds the Steam installation path in the Windows registry
+    """
+
+    def install_path(self):
+
+        """
+            Returns the Steam installation path
+
+            Raises:
+                OSError - If Steam is not installed
+        """
+
+        import platform
+        import winreg
+
+        # Set the key path according to the architecture - 32/64 bits
+        key_path = "SOFTWARE\\WOW6432Node\\Valve\\Steam"
+        if not platform.machine().endswith("64"):
+            key_path = "SOFTWARE\\Valve\\Steam"
+
+        # Open the registry key and query the value of InstallPath
+        reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
+        k = winreg.OpenKey(reg, key_path)
+        try:
+            return winreg.QueryValueEx(k, "InstallPath")[0]
+        finally:
+            winreg.CloseKey(k)
+
+class PathResolver(object):
+
+    """
+        Uses the first existing directory out of a list of candidates
+        as the Steam installation path
+    """
+
+    # Where Steam is usually installed on Linux and macOS
+    DEFAULT_PATHS = (
+        os.path.join("~", ".steam", "steam"),
+        os.path.join("~", ".local", "share", "Steam"),
+        os.path.join("~", "Library", "Application Support", "Steam"),
+    )
+
+    def __init__(self, *paths):
+
+        """
+            Parameters:
+                paths - Candidate installation directories.
+                        Defaults to DEFAULT_PATHS.
+        """
+
+        self.paths = paths or self.DEFAULT_PATHS
+
+    def install_path(self):
+
+        """
+            Returns the Steam installation path
+
+            Raises:
+                OSError - If none of the candidate directories exists
+        """
+
+        for path in self.paths:
+            path = os.path.expanduser(path)
+            if os.path.isdir(path):
+                return path
+
+        raise FileNotFoundError("None of the Steam directories exist: " + ", ".join(self.paths))
+
+def default_resolver():
+
+    """
+        Returns the resolver suitable for the current operating system
+    """
+
+    if sys.platform == "win32":
+        return RegistryResolver()
+    return PathResolver()
+
+def read_libraries(install_dir, including_install=True):
+
+    """
+        Reads the Steam library locations from libraryfolders.vdf.
+        Both the old format (paths as values) and the new one (a section
+        with a "path" key for every library) are supported.
+
+        Parameters:
+            install_dir - Steam installation directory
+            including_install - Whether to include the installation directory as a library or not.
+                                Defaults to True.
+
+        Returns:
+            A list of library paths
+
+        Raises:
+            OSError - If libraryfolders.vdf can not be read
+            SyntaxError - If libraryfolders.vdf can not be parsed
+    """
+
+    import vdf
+
+    with open(os.path.join(install_dir, "steamapps", "libraryfolders.vdf"), encoding="utf-8") as f:
+        folders = vdf.parse(f)
+
+    # The section is called "LibraryFolders" in old files and "libraryfolders" in new ones
+    entries = {}
+    for name, section in folders.items():
+        if name.lower() == "libraryfolders":
+            entries = section
+            break
+
+    libraries = []
+
+    # Include the installation directory as a library, if wanted
+    if including_install:
+        libraries.append(install_dir)
+
+    # Libraries are compared by their real path: on Linux the installation
+    # directory is usually found through the ~/.steam/steam symlink
+    real_path = lambda path: os.path.normcase(os.path.realpath(path))
+    seen = set([real_path(install_dir)])
+
+    # Libraries are numbered entries, other entries are statistics
+    for key in sorted((key for key in entries if key.isdigit()), key=int):
+        library = entries[key]
+        if isinstance(library, dict):
+            library = library.get("path")
+        if not library:
+            continue
+
+        # New files also list the installation directory
+        if real_path(library) in seen:
+            continue
+
+        seen.add(real_path(library))
+        libraries.append(library)
+
+    return libraries
+
+class SteamEnvironment(object):
+
+    """
+        The local Steam installation. Every property is resolved the first
+        time it is used and then cached, until invalidate() is called.
+    """
+
+    def __init__(self, resolver=None):
+
+        """
+            Parameters:
+                resolver - Object with an install_path() method that finds the
+                           installation. Defaults to default_resolver().
+        """
+
+        self.resolver = resolver or default_resolver()
+        self._lock = threading.RLock()
+        self._cache = {}
+
+    def _cached(self, name, resolve):
+
+        """
+            Returns a cached value, resolving it first if needed
+        """
+
+        with self._lock:
+            if name not in self._cache:
+                self._cache[name] = resolve()
+            return self._cache[name]
+
+    def invalidate(self, name=None):
+
+        """
+            Forgets a cached value ("install_path", "users" or "libraries"),
+            or all of them if no name is given, so it is resolved again
+            the next time it is used.
+        """
+
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    @property
+    def install_path(self):
+
+        """
+            The Steam installation directory
+
+            Raises:
+                OSError - If the installation could not be found
+        """
+
+        return self._cached("install_path", self.resolver.install_path)
+
+    @property
+    def users(self):
+
+        """
+            A list of the user ID's on Steam, found in the "userdata" folder
+        """
+
+        def resolve():
+            userdata = os.path.join(self.install_path, "userdata")
+            return [user for user in os.listdir(userdata) if os.path.isdir(os.path.join(userdata, user))]
+
+        return self._cached("users", resolve)
+
+    @property
+    def libraries(self):
+
+        """
+            A list of the Steam library folders, starting with the installation directory
+        """
+
+        return self._cached("libraries", lambda: read_libraries(self.install_path))
+
+    @property
+    def executable(self):
+
+        """
+            Path of the Steam executable
+        """
+
+        name = "Steam.exe" if sys.platform == "win32" else "steam"
+        return os.path.join(self.install_path, name)
+
+    def steamapps_folder(self, library):
+
+        """
+            Returns the folder containing the app manifests of a library
+        """
+
+        return os.path.join(library, "steamapps")
+
+    def config_folder(self, user):
+
+        """
+            Returns the config folder of a Steam user
+        """
+
+        return os.path.join(self.install_path, "userdata", user, "config")
+
+    def shortcuts_path(self, user):
+
+        """
+            Returns the path of the shortcuts.vdf file of a Steam user
+        """
+
+        return os.path.join(self.config_folder(user), "shortcuts.vdf")
+
+    def grid_folder(self, user):
+
+        """
+            Returns the folder that holds the grid images of a Steam user
+        """
+
+        return os.path.join(self.config_folder(user), "grid")
+
+_default_environment = None
+_default_environment_lock = threading.Lock()
+
+def get_default_environment():
+
+    """
+        Returns the SteamEnvironment shared by the helpers when
+        no environment is passed to them
+    """
+
+    global _default_environment
+
+    with _default_environment_lock:
+        if _default_environment is None:
+            _default_environment = SteamEnvironment()
+        return _default_environment
@@ -0,0 +1,43 @@
+"""
+    Helpers for the Steam Web API.
+"""
+
+import config
+import requests
+import request_scheduler
+
+def get_request(url):
+
+    """
+        Sends a GET request and returns the result as JSON
+        
+        Parameters:
+            url - URL to send the GET request to
+    """
+
+    r = request_scheduler.get_default_scheduler().get(url)
+    return r.json()
+
+def get_id_by_username(username):
+
+    """
+        Gets a Steam ID by the username
+        Returns ID or None if could not retrieve.
+
+        Parameters:
+            username - Steam username
+    """
+
+    id = None
+
+    try:
+        result = get_request("http://api.steampowered.com/ISteamUser/ResolveVanityURL/v0001/?key=" + config.STEAM_API_KEY + "&vanityurl=" + username)
+        if result["response"]["success"] == 1:
+            id = result["response"]["steamid"]
+        else:
+            raise ValueError("Unknown username")
+    except (requests.RequestException, ValueError, KeyError):
+        print("An error occured while trying to get your Steam ID.")
+        return None
+
+    return id
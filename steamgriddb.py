@@ -0,0 +1,136 @@
+"""
+    Client for the SteamGridDB API. Its requests are sent through a
+    RequestScheduler, which keeps a pool of keep-alive connections.
+
+    Example:
+        client = SteamGridDB(config.STEAMGRIDDB_API_KEY)
+        entries = client.search("Overwatch")
+        grids = client.grids(entries[0]["id"], dimensions=("460x215", "920x430"))
+        client.download(grids[0]["url"], "grid.png")
+"""
+
+import requests
+import downloader
+import request_scheduler
+
+# Base URL of the SteamGridDB API
+BASE_URL = "https://www.steamgriddb.com/api/v2"
+
+# Returned by the requests that failed (as opposed to None, nothing was found),
+# for example when the network is down or the API key is refused
+FAILED = object()
+
+class SteamGridDB(object):
+
+    """
+        A SteamGridDB API client. Safe to use from several threads.
+    """
+
+    def __init__(self, api_key, scheduler=None, base_url=BASE_URL, cache=None):
+
+        """
+            Parameters:
+                api_key - SteamGridDB API key
+                scheduler - RequestScheduler to send the requests with.
+                            Defaults to request_scheduler.get_default_scheduler().
+                base_url - Base URL of the API. Defaults to BASE_URL.
+                cache - A ResponseCache for the search and grids responses.
+                        Defaults to None (no caching).
+        """
+
+        self.scheduler = scheduler or request_scheduler.get_default_scheduler()
+        self.headers = {"Authorization": "Bearer {}".format(api_key)}
+        self.base_url = base_url
+        self.cache = cache
+
+    def _fetch_data(self, path, params=None):
+
+        """
+            Sends a GET request to the API and returns the "data" of the response,
+            or None if nothing was found (a 404, or a successful response without data)
+
+            Raises:
+                requests.RequestException - If the request failed, including any error
+                                            status other than 404 (for example 401 or 403
+                                            for a bad API key), so it is not cached as "not found"
+                ValueError - If the response is not valid JSON
+        """
+
+        r = self.scheduler.get(self.base_url + path, params=params, headers=self.headers)
+
+        if r.status_code == 404:
+            return None
+        if not 200 <= r.status_code < 300:
+            raise requests.HTTPError("{} error for {}".format(r.status_code, r.url), response=r)
+
+        data = r.json()
+
+        if data.get("success") != True:
+            raise requests.HTTPError("Unsuccessful response for {}: {}".format(r.url, data.get("errors")), response=r)
+
+        # Nothing was found
+        if not data.get("data"):
+            return None
+
+        return data["data"]
+
+    def _get_data(self, path, params=None):
+
+        """
+            Returns the "data" of an API response, from the cache if possible,
+            None if nothing was found, or FAILED if the request failed
+        """
+
+        try:
+            if self.cache is None:
+                return self._fetch_data(path, params)
+            return self.cache.cached("steamgriddb" + path, params, lambda: self._fetch_data(path, params))
+        except (requests.RequestException, ValueError):
+            return FAILED
+
+    def search(self, name):
+
+        """
+            Searches games on SteamGridDB by name
+
+            Returns:
+                A list of matching games (dictionaries with "id" and "name"),
+                None if nothing was found, or FAILED if the request failed
+        """
+
+        return self._get_data("/search/autocomplete/{}".format(requests.utils.quote(name, safe="")))
+
+    def grids(self, game_id, dimensions=None):
+
+        """
+            Gets the grid images of a game
+
+            Parameters:
+                game_id - SteamGridDB game ID
+                dimensions - A list of dimensions to limit the results to
+                             (for example ["460x215", "920x430"]). Defaults to None (all dimensions).
+
+            Returns:
+                A list of grid images (dictionaries with "id" and "url"),
+                None if nothing was found, or FAILED if the request failed
+        """
+
+        params = None
+        if dimensions:
+            params = {"dimensions": ",".join(dimensions)}
+
+        return self._get_data("/grids/game/{}".format(game_id), params)
+
+    def download(self, url, file_name):
+
+        """
+            Downloads an image to a file. The file is only replaced once the
+            whole image is downloaded, and an interrupted download is resumed
+            by the next call (see downloader.download).
+
+            Raises:
+                requests.RequestException - If the download failed
+                OSError - If the file could not be written
+        """
+
+        downloader.download(url, file_name, self.scheduler)
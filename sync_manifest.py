@@ -0,0 +1,276 @@
+"""
+    Record of the grid images synced into a Steam user's grid folder.
+
+    For every app ID, the manifest remembers where its image came from
+    (SteamGridDB game and image IDs, or a custom image), the hash, size
+    and dimensions of the file that was written, and when it was last
+    attempted. With it a sync only touches what changed:
+        - Images that are still the ones that were written are skipped
+          without being read (their modification time and size match)
+        - Images the user replaced are left alone
+        - Invalid images (for example truncated ones) are fetched again
+        - Games that could not be resolved are retried with an
+          exponential backoff instead of on every run
+
+    Example:
+        manifest = SyncManifest(grid_folder)
+        if manifest.check(appid, file_name) == MISSING:
+            ...
+            manifest.record_success(appid, file_name, SOURCE_STEAMGRIDDB, game_id, image_id)
+        manifest.save()
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import atomic_file
+
+# Name of the manifest file in the grid folder
+FILE_NAME = "steamhelper_sync.json"
+
+# Bumped whenever the format of the manifest changes
+VERSION = 1
+
+# Seconds to wait before retrying a game that failed once,
+# doubled on every failure up to MAX_BACKOFF
+DEFAULT_BACKOFF = 24 * 60 * 60
+MAX_BACKOFF = 30 * 24 * 60 * 60
+
+# Where an image came from
+SOURCE_STEAMGRIDDB = "steamgriddb"
+SOURCE_CUSTOM = "custom"
+SOURCE_EXTERNAL = "external"
+
+# States of an image (see SyncManifest.check)
+UP_TO_DATE = "up_to_date"
+CHANGED = "changed"
+UNTRACKED = "untracked"
+INVALID = "invalid"
+MISSING = "missing"
+BACKOFF = "backoff"
+
+def file_hash(path):
+
+    """
+        Returns the SHA-256 hex digest of a file's contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def image_size(path):
+
+    """
+        Returns the dimensions of an image file, or None if it is not a
+        valid image. The file is checked without being decoded
+        (for PNG files, the checksums of all the chunks are verified).
+    """
+
+    # Imported here so reading manifests (for example by the catalog) doesn't load Pillow
+    from PIL import Image
+
+    try:
+        with Image.open(path) as im:
+            size = im.size
+            im.verify()
+        return size
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+
+class SyncManifest(object):
+
+    """
+        The sync manifest of one grid folder. Safe to use from several threads.
+    """
+
+    def __init__(self, folder, backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF):
+
+        """
+            Loads the manifest of a grid folder. A missing or unreadable
+            manifest results in an empty one.
+
+            Parameters:
+                folder - The grid folder
+                backoff - Seconds to wait before retrying a game that failed once
+                max_backoff - Maximum seconds to wait before retrying a game
+        """
+
+        self.folder = folder
+        self.path = os.path.join(folder, FILE_NAME)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                contents = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if contents.get("version") == VERSION:
+            self._entries = contents.get("entries", {})
+
+    def entry(self, appid):
+
+        """
+            Returns a copy of the entry of an app ID, or None if it has none
+        """
+
+        with self._lock:
+            entry = self._entries.get(str(appid))
+            return dict(entry) if entry is not None else None
+
+    def check(self, appid, file_name):
+
+        """
+            Returns the state of the image of an app ID:
+                UP_TO_DATE - It is the image that was written by the last sync
+                CHANGED - It was replaced since the last sync (by the user, most likely)
+                UNTRACKED - It was not written by a sync (and is a valid image)
+                INVALID - It is not a valid image, and should be fetched again
+                MISSING - There is no image, and it should be fetched
+                BACKOFF - There is no image, but the last attempts failed
+                          and it is too early to try again
+        """
+
+        appid = str(appid)
+        with self._lock:
+            entry = dict(self._entries.get(appid) or {})
+
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            if entry.get("next_attempt", 0) > time.time():
+                return BACKOFF
+            return MISSING
+
+        if entry.get("hash"):
+            if entry.get("mtime") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                return UP_TO_DATE
+            # Touched without being changed (copied back, restored from a backup, ...)
+            if entry.get("size") == stat.st_size and file_hash(file_name) == entry["hash"]:
+                with self._lock:
+                    self._entries[appid]["mtime"] = stat.st_mtime_ns
+                    self._dirty = True
+                return UP_TO_DATE
+
+        if image_size(file_name) is None:
+            return INVALID
+
+        return CHANGED if entry.get("hash") else UNTRACKED
+
+    def _record_file(self, appid, file_name, fields):
+
+        """
+            Replaces the entry of an app ID with the given fields and
+            the hash, size and dimensions of file_name
+        """
+
+        stat = os.stat(file_name)
+        size = image_size(file_name)
+
+        entry = dict(fields)
+        entry.update({
+            "hash": file_hash(file_name),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "width": size[0] if size else None,
+            "height": size[1] if size else None,
+            "last_attempt": time.time(),
+            "failures": 0,
+        })
+
+        with self._lock:
+            self._entries[str(appid)] = entry
+            self._dirty = True
+
+    def record_success(self, appid, file_name, source, game_id=None, image_id=None):
+
+        """
+            Records the image that was just written for an app ID
+
+            Parameters:
+                appid - The app ID
+                file_name - The image file
+                source - Where the image came from (SOURCE_STEAMGRIDDB or SOURCE_CUSTOM)
+                game_id - SteamGridDB ID of the game, if known
+                image_id - SteamGridDB ID of the image, if known
+
+            Raises:
+                OSError - If the image can not be read
+        """
+
+        self._record_file(appid, file_name, {"source": source, "game_id": game_id, "image_id": image_id})
+
+    def adopt(self, appid, file_name):
+
+        """
+            Records an image that was not written by a sync (SOURCE_EXTERNAL),
+            so it is recognized as up to date from now on
+
+            Raises:
+                OSError - If the image can not be read
+        """
+
+        self._record_file(appid, file_name, {"source": SOURCE_EXTERNAL, "game_id": None, "image_id": None})
+
+    def record_failure(self, appid, reason=None):
+
+        """
+            Records a failed attempt to get an image for an app ID,
+            and when to try again
+
+            Returns:
+                The time (as time.time()) after which to try again
+        """
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(str(appid), {})
+            failures = entry.get("failures", 0) + 1
+            entry["failures"] = failures
+            entry["last_attempt"] = now
+            entry["reason"] = reason
+            entry["next_attempt"] = now + min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+            self._dirty = True
+            return entry["next_attempt"]
+
+    def forget(self, appid):
+
+        """
+            Removes the entry of an app ID, so its image is treated as
+            untracked (or missing) on the next check
+        """
+
+        with self._lock:
+            if self._entries.pop(str(appid), None) is not None:
+                self._dirty = True
+
+    def save(self):
+
+        """
+            Writes the manifest to disk, if anything changed since it was loaded.
+            The file is replaced atomically so a crash never leaves a partial manifest.
+        """
+
+        with self._lock:
+            if not self._dirty:
+                return
+            contents = json.dumps({"version": VERSION, "entries": self._entries})
+            self._dirty = False
+
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            atomic_file.atomic_write(self.path, contents)
+        except BaseException:
+            # Keep the changes for the next save
+            with self._lock:
+                self._dirty = True
+            raise
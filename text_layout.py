@@ -0,0 +1,211 @@
+"""
+    Text layout for the titles drawn on grid images.
+
+    Every font face and size is loaded from its file once per process,
+    and the widths of the words measured with it are kept, so laying out
+    thousands of titles doesn't parse the same TTF or measure the same
+    words again. A title is wrapped on as many lines as it needs and the
+    largest font size that fits the box is picked. The layout of every
+    title and box size is memoized.
+
+    Example:
+        layout = layout_text("The Witcher 3 Wild Hunt", "grid-font.ttf", (400, 180), 60)
+        for line, x, y in layout.lines:
+            draw.text((x, y), line, font=get_font("grid-font.ttf", layout.size))
+"""
+
+import collections
+import functools
+import threading
+
+from PIL import ImageFont
+
+# Number of fonts (face and size) kept loaded
+FONT_CACHE_SIZE = 64
+
+# Number of layouts kept
+LAYOUT_CACHE_SIZE = 4096
+
+# Number of word widths kept for every font
+WIDTH_CACHE_SIZE = 8192
+
+# Default smallest font size used before giving up on fitting a title
+DEFAULT_MIN_SIZE = 8
+
+# Default maximum number of lines of a title
+DEFAULT_MAX_LINES = 3
+
+# Space between lines, relative to the line height
+LINE_SPACING = 0.1
+
+# A laid out text:
+# size - Font size
+# lines - A tuple of (line, x, y), relative to the top left corner of the box
+# width, height - Size of the text
+# fits - Whether the text fits in the box (False if even the smallest size overflows it)
+Layout = collections.namedtuple("Layout", ["size", "lines", "width", "height", "fits"])
+
+class FontMetrics(object):
+
+    """
+        A loaded font and the widths of the words measured with it
+    """
+
+    def __init__(self, path, size):
+        self.font = ImageFont.truetype(path, size)
+        self.size = size
+        ascent, descent = self.font.getmetrics()
+        self.line_height = ascent + descent
+        self.space_width = self.font.getlength(" ")
+        self._widths = {}
+        self._lock = threading.Lock()
+
+    def width(self, text):
+
+        """
+            Returns the width of a text (normally a single word)
+        """
+
+        width = self._widths.get(text)
+        if width is None:
+            width = self.font.getlength(text)
+            with self._lock:
+                if len(self._widths) >= WIDTH_CACHE_SIZE:
+                    self._widths.clear()
+                self._widths[text] = width
+        return width
+
+    def line_width(self, words):
+
+        """
+            Returns the width of the words of a line, separated by spaces
+        """
+
+        return sum(self.width(word) for word in words) + self.space_width * max(0, len(words) - 1)
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_metrics(path, size):
+
+    """
+        Returns the FontMetrics of a font face and size, loading it only once
+    """
+
+    return FontMetrics(path, size)
+
+def get_font(path, size):
+
+    """
+        Returns the ImageFont of a font face and size, loading it only once
+    """
+
+    return get_metrics(path, size).font
+
+def _split_word(word, metrics, max_width):
+
+    """
+        Splits a word that is wider than max_width into pieces that fit
+    """
+
+    pieces = []
+    piece = ""
+    for c in word:
+        if piece and metrics.width(piece + c) > max_width:
+            pieces.append(piece)
+            piece = c
+        else:
+            piece += c
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+def wrap(text, metrics, max_width):
+
+    """
+        Wraps a text into lines no wider than max_width, breaking lines
+        between words, and inside the words that don't fit on a line alone.
+        Line breaks already in the text are kept.
+
+        Returns:
+            A list of lines, every line a list of words
+    """
+
+    lines = []
+    for paragraph in text.split("\n"):
+        line = []
+        for word in paragraph.split():
+            pieces = [word] if metrics.width(word) <= max_width else _split_word(word, metrics, max_width)
+            for piece in pieces:
+                if line and metrics.line_width(line + [piece]) > max_width:
+                    lines.append(line)
+                    line = []
+                line.append(piece)
+        lines.append(line)
+    return lines
+
+def _layout_at(text, path, size, box, max_lines):
+
+    """
+        Lays out a text at one font size
+
+        Returns:
+            A Layout
+    """
+
+    metrics = get_metrics(path, size)
+    lines = wrap(text, metrics, box[0])
+    widths = [metrics.line_width(line) for line in lines]
+
+    step = metrics.line_height * (1 + LINE_SPACING)
+    height = round(step * (len(lines) - 1) + metrics.line_height)
+    width = round(max(widths)) if widths else 0
+
+    placed = tuple((" ".join(line), round((box[0] - line_width) / 2), round(i * step))
+                   for i, (line, line_width) in enumerate(zip(lines, widths)))
+
+    fits = len(lines) <= max_lines and width <= box[0] and height <= box[1]
+    return Layout(size, placed, width, height, fits)
+
+@functools.lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def layout_text(text, path, box, max_size, min_size=DEFAULT_MIN_SIZE, max_lines=DEFAULT_MAX_LINES):
+
+    """
+        Lays out a text in a box with the largest font size that fits,
+        centering every line horizontally
+
+        Parameters:
+            text - The text
+            path - Path of the font file
+            box - (width, height) of the box the text should fit in
+            max_size - Largest font size to use
+            min_size - Smallest font size to use. Defaults to DEFAULT_MIN_SIZE.
+            max_lines - Maximum number of lines. Defaults to DEFAULT_MAX_LINES.
+
+        Returns:
+            A Layout. If the text doesn't fit even at min_size, the layout
+            at min_size is returned, with fits set to False.
+    """
+
+    min_size = max(1, min(min_size, max_size))
+
+    # Binary search the largest size that fits
+    best = None
+    low, high = min_size, max_size
+    while low <= high:
+        size = (low + high) // 2
+        layout = _layout_at(text, path, size, box, max_lines)
+        if layout.fits:
+            best = layout
+            low = size + 1
+        else:
+            high = size - 1
+
+    return best or _layout_at(text, path, min_size, box, max_lines)
+
+def clear_caches():
+
+    """
+        Unloads the fonts and forgets the layouts
+    """
+
+    layout_text.cache_clear()
+    get_metrics.cache_clear()
@@ -1,128 +1,113 @@
-import config
-import winreg
-import platform
-import vdf
-import requests
-import os
-import subprocess
-import crc_algorithms
-import re
-import colorama
-import urllib
-import math
-from PIL import Image, ImageFilter, ImageEnhance, ImageFont, ImageDraw
-from difflib import SequenceMatcher
-
-def get_request(url):
-
-    """
-        Sends a GET request and returns the result as JSON
-        
-        Parameters:
-            url - URL to send the GET request to
-    """
-
-    r = requests.get(url)
-    return r.json()
-
-def get_id_by_username(username):
-
-    """
-        Gets a Steam ID by the username
-        Returns ID or None if could not retrieve.
-
-        Parameters:
-            username - Steam username
-    """
-
-    result = get_request("http://api.steampowered.com/ISteamUser/ResolveVanityURL/v0001/?key=" + config.STEAM_API_KEY + "&vanityurl=" + username)
-    id = None
-
-    try:
-        if result["response"]["success"] == 1:
-            id = result["response"]["steamid"]
-        else:
-            raise Exception
-    except:
-        print("An error occured while trying to get your Steam ID.")
-        return None
+"""
+    Helpers for the Steam installation: libraries, installed games,
+    users, Non-Steam games and their app IDs.
 
-    return id
+    This module only imports what listing the games needs, so the scripts
+    that list games start quickly. The helpers that download and create
+    grid images live in grid_images, and the Steam Web API helpers in
+    steam_web. They can still be used from here (utils.create_grid_image,
+    utils.get_id_by_username, ...), which imports them the first time.
+"""
 
-def get_libraries(install_dir, including_install=True):
+import os
+import subprocess
+import binary_vdf
+import library_scanner
+import manifest_reader
+import records
+import steam_environment
+import collections
+import threading
+
+# Helpers that moved to other modules, imported the first time they are used from here
+_MOVED = {
+    "get_request": "steam_web",
+    "get_id_by_username": "steam_web",
+    "get_igdb_client": "grid_images",
+    "find_grid_sources": "grid_images",
+    "download_grid_source": "grid_images",
+    "fetch_grid_source": "grid_images",
+    "create_grid_image": "grid_images",
+    "create_grid_images": "grid_images",
+    "download_bytes": "grid_images",
+    "resize_and_crop": "grid_images",
+}
+
+def __getattr__(name):
+    if name in _MOVED:
+        module = __import__(_MOVED[name])
+        return getattr(module, name)
+    if name == "APPID_CRC":
+        return get_appid_crc()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def get_libraries(install_dir=None, including_install=True, env=None):
 
     """
         Gets the steam libary locations installed on the system
         and returns them as a list
 
         Parameters:
-            install_dir - Steam installation directory
+            install_dir - Steam installation directory. Defaults to None,
+                          which uses the libraries of the Steam environment.
             including_install - Whether to include the installation directory as a library or not.
                                 Defaults to True.
+            env - The SteamEnvironment to use. Defaults to the shared environment.
     """
 
-    # Parse the vdf file into JSON
     try:
-        f = vdf.parse(open(install_dir + "\\steamapps\\libraryfolders.vdf"))
-    except:
+        if install_dir is None:
+            libraries = list((env or get_default_environment()).libraries)
+            return libraries if including_install else libraries[1:]
+
+        return steam_environment.read_libraries(install_dir, including_install)
+    except (OSError, SyntaxError):
         print("Could not find libraryfoldes.vdf")
         return
-    
-    libraries = []
 
-    # Include the installation directory as a library, if wanted
-    if including_install:
-        libraries.append(install_dir)
+def get_default_environment():
 
-    # Loop through the LibraryFolders entry
-    for i in range(0, len(f["LibraryFolders"])):
-        # Skip the first and second entries
-        if i == 0 or i == 1:
-            continue
-
-        libraries.append(f["LibraryFolders"][str(i - 1)])
+    """
+        Returns the SteamEnvironment used by the helpers
+        when no environment is passed to them
+    """
 
-    return libraries
+    return steam_environment.get_default_environment()
 
-def get_steam_install_path():
+def get_steam_install_path(env=None):
 
     """
         Gets the steam installation path on the system
-        by looking in the registry.
+        (by looking in the registry on Windows).
+        The path is only looked up once per environment.
+
+        Parameters:
+            env - The SteamEnvironment to use. Defaults to the shared environment.
 
         Returns:
             The path, or None if it could not find the installatino
     """
 
     try:
-        # Set the key path according to the architecture - 32/64 bits
-
-        key_path = "SOFTWARE\\WOW6432Node\\Valve\\Steam"
-        if not is_64():
-            key_path = "SOFTWARE\\Valve\\Steam"
-
-        # Open the registry key and query the value of InstallPath
-        reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
-        k = winreg.OpenKey(reg, key_path)
-        value = winreg.QueryValueEx(k, "InstallPath")
-        winreg.CloseKey(k)
-
-        return value[0]
+        return (env or get_default_environment()).install_path
     except Exception as e:
         print("Could not find Steam installation directory.")
         print(e)
         return None
 
-def get_steam_users():
+def get_steam_users(env=None):
     """
         Gets the users ID's on Steam by checking in the
         Steam installation directory under the "userdata" folder
 
+        Parameters:
+            env - The SteamEnvironment to use. Defaults to the shared environment.
+
         Returns:
             A list of the user ID's on Steam
     """
 
-    return os.listdir(get_steam_install_path() + "\\userdata")
+    return list((env or get_default_environment()).users)
 
 def is_64():
 
@@ -131,53 +116,179 @@ def is_64():
         If so, returns True. Otherwise, returns False.
     """
 
+    import platform
+
     return platform.machine().endswith("64")
 
-def get_installed_games():
+def _read_manifest(path):
 
     """
-        Finds Steam games installed on the system,
-        by searching each Steam library.
+        Reads the game details from an app manifest file (.acf)
+    """
 
-        Returns:
-            A list of dictionary entries of games installed on the system.
+    manifest = manifest_reader.read_manifest(path, ("appid", "name"))
+
+    return {"name": manifest["name"], "appid": manifest["appid"]}
+
+def get_library(manifest_path):
+
+    """
+        Returns the library folder of an app manifest path
+        (the folder containing "steamapps")
+    """
+
+    return os.path.dirname(os.path.dirname(manifest_path))
+
+def iter_installed_games(cache=None, workers=library_scanner.DEFAULT_WORKERS, env=None, libraries=None):
+
+    """
+        Finds Steam games installed on the system, by searching each Steam
+        library, and yields them as soon as their manifest is read.
+        The cache is saved once every library was scanned.
+
+        Parameters:
+            cache - A ScanCache to reuse the manifests parsed by previous scans.
+                    Defaults to None, which parses every manifest.
+            workers - Number of threads scanning each drive.
+                      Defaults to library_scanner.DEFAULT_WORKERS.
+            env - The SteamEnvironment to use. Defaults to the shared environment.
+            libraries - The library folders to scan. Defaults to None, which scans all of them.
+
+        Yields:
+            records.InstalledGame records of the games installed on the system,
+            in the order they were read. They can also be used as dictionaries.
             For example:
             {
-                id: 228980
+                appid: 228980
                 name: Steamworks Common Redistributables
+                library: C:\\Program Files (x86)\\Steam
             }
     """
 
-    games = []
+    found = get_libraries(env=env)
+    if not found:
+        return
+
+    # Only prune the cache when every library is scanned
+    complete = libraries is None
+    if not complete:
+        wanted = set(os.path.normcase(os.path.realpath(library)) for library in libraries)
+        found = [library for library in found if os.path.normcase(os.path.realpath(library)) in wanted]
+
+    # Get the game details from the manifest files (.acf) of every library
+    for path, game in library_scanner.scan_libraries(found, _read_manifest, workers, cache, prune=complete):
+        yield records.InstalledGame(game["appid"], game["name"], get_library(path))
+
+    if cache is not None:
+        cache.save()
 
-    for library in get_libraries(get_steam_install_path()):
-        # Add \steamapps to the library folder
-        library += "\\steamapps\\"
+def get_installed_games(cache=None, workers=library_scanner.DEFAULT_WORKERS, env=None):
 
-        # Search for manifest files (.acf)
-        files = os.listdir(library)
-        for file in files:
-            if file.endswith("acf"):
-                # Get the game details from the manifest file
-                f = vdf.parse(open(library + file))
-                appid = f["AppState"]["appid"]
-                name = f["AppState"]["name"]
+    """
+        Finds Steam games installed on the system,
+        by searching each Steam library.
 
-                games.append({"name": name, "appid": appid})
+        Parameters:
+            cache - A ScanCache to reuse the manifests parsed by previous scans.
+                    Defaults to None, which parses every manifest.
+            workers - Number of threads scanning each drive.
+                      Defaults to library_scanner.DEFAULT_WORKERS.
+            env - The SteamEnvironment to use. Defaults to the shared environment.
 
-    return games
+        Returns:
+            A list of records.InstalledGame records of the games installed
+            on the system (see iter_installed_games).
+    """
+
+    return list(iter_installed_games(cache, workers, env))
 
-def launch_steam_game(id):
+def launch_steam_game(id, env=None):
     
     """
         Launches a Steam game by its ID
 
         Paramteres:
             id - Steam game ID
+            env - The SteamEnvironment to use. Defaults to the shared environment.
+    """
+
+    path = (env or get_default_environment()).executable
+    subprocess.call([path, "-applaunch", str(id)])
+
+# CRC engine shared by every appid calculation (see generate_appid_for_nonsteam_game),
+# created the first time it is needed
+_appid_crc = None
+
+def get_appid_crc():
+
+    """
+        Returns the CRC engine used to calculate the app IDs
+    """
+
+    global _appid_crc
+
+    if _appid_crc is None:
+        import crc_algorithms
+        _appid_crc = crc_algorithms.Crc(width = 32, poly = 0x04C11DB7, reflect_in = True, xor_in = 0xffffffff, reflect_out = True, xor_out = 0xffffffff)
+    return _appid_crc
+
+# Maximum number of (name, target) pairs remembered by the app ID cache
+APPID_CACHE_SIZE = 65536
+
+# (name, target) -> app ID, kept in least recently used order
+_appid_cache = collections.OrderedDict()
+_appid_cache_lock = threading.Lock()
+
+def _calculate_appid(name, target):
+
+    """
+        Calculates the 64bit app ID of a Non-Steam game as an integer
+    """
+
+    top_32 = get_appid_crc().crc((target + name).encode("utf-8")) | 0x80000000
+    return (top_32 << 32) | 0x02000000
+
+def _calculate_appids(pairs):
+
+    """
+        Calculates the app IDs for a list of (name, target) pairs.
+        Used as the unit of work for the process pool in generate_appids_for_nonsteam_games.
+    """
+
+    return [_calculate_appid(name, target) for name, target in pairs]
+
+def _cached_appids(pairs):
+
+    """
+        Looks the given (name, target) pairs up in the app ID cache.
+
+        Returns:
+            A dictionary of the pairs that were found, mapped to their app ID
+    """
+
+    found = {}
+    with _appid_cache_lock:
+        for pair in pairs:
+            appid = _appid_cache.get(pair)
+            if appid is not None:
+                _appid_cache.move_to_end(pair)
+                found[pair] = appid
+    return found
+
+def _cache_appids(appids):
+
     """
+        Stores calculated app IDs in the app ID cache, evicting the least
+        recently used entries if it grows over APPID_CACHE_SIZE.
 
-    path = get_steam_install_path() + "\\Steam.exe"
-    subprocess.call(path + " -applaunch " + id)
+        Parameters:
+            appids - A dictionary of (name, target) pairs mapped to their app ID
+    """
+
+    with _appid_cache_lock:
+        _appid_cache.update(appids)
+        while len(_appid_cache) > APPID_CACHE_SIZE:
+            _appid_cache.popitem(last=False)
 
 def generate_appid_for_nonsteam_game(name, target):
     """
@@ -197,250 +308,144 @@ def generate_appid_for_nonsteam_game(name, target):
             The app ID as a string
     """
 
-    algorithm = crc_algorithms.Crc(width = 32, poly = 0x04C11DB7, reflect_in = True, xor_in = 0xffffffff, reflect_out = True, xor_out = 0xffffffff)
-    input_string = ''.join([target,name])
-    top_32 = algorithm.bit_by_bit(input_string) | 0x80000000
-    full_64 = (top_32 << 32) | 0x02000000
-    return str(full_64)
+    return generate_appids_for_nonsteam_games([(name, target)])[0]
+
+def generate_appids_for_nonsteam_games(games, as_string=True, processes=None, chunk_size=2048):
+
+    """
+        Generates the app IDs for many Non-Steam games at once.
+        Results are memoized, so pairs that were already calculated
+        in this process are not calculated again.
+
+        Parameters:
+            games - An iterable of (name, target) pairs
+            as_string - Whether to return the app IDs as strings (like
+                        generate_appid_for_nonsteam_game) or as integers.
+                        Defaults to True.
+            processes - Number of worker processes to use. Defaults to None,
+                        which calculates everything in the current process.
+            chunk_size - Number of pairs sent to a worker process at a time.
+
+        Returns:
+            A list of app IDs, in the same order as the given games
+    """
+
+    games = [(name, target) for name, target in games]
+    appids = _cached_appids(games)
+    missing = list(dict.fromkeys(pair for pair in games if pair not in appids))
+
+    if missing:
+        if processes and len(missing) > chunk_size:
+            import concurrent.futures
+
+            chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+                calculated = [appid for chunk in executor.map(_calculate_appids, chunks) for appid in chunk]
+        else:
+            calculated = _calculate_appids(missing)
+
+        calculated = dict(zip(missing, calculated))
+        _cache_appids(calculated)
+        appids.update(calculated)
+
+    appids = [appids[pair] for pair in games]
+
+    if as_string:
+        return [str(appid) for appid in appids]
+    return appids
+
+def _read_shortcuts(path):
+
+    """
+        Reads the list of Non-Steam games from a shortcuts.vdf file
+    """
+
+    return list(binary_vdf.iter_shortcuts(path))
+
+def iter_non_steam_games(cache=None, env=None, users=None):
+
+    """
+        Finds the Non-Steam games added to the library of every Steam user,
+        and yields them one user at a time, as soon as their app IDs are generated.
+        The cache is saved once every user was read.
+
+        Parameters:
+            cache - A ScanCache to reuse the shortcuts.vdf files parsed by previous scans.
+                    Defaults to None, which parses every file.
+            env - The SteamEnvironment to use. Defaults to the shared environment.
+            users - The IDs of the users to read. Defaults to None, which reads all of them.
+
+        Yields:
+            records.Shortcut records of the Non-Steam games.
+            They can also be used as dictionaries. For example:
+            {
+                name: Overwatch
+                exe: "D:\\Program Files\\Overwatch\\Overwatch Launcher.exe"
+                appid: 14990700086697132032
+                user: 12345678
+            }
+    """
 
-def get_non_steam_games():
-    games_list = []
+    env = env or get_default_environment()
+
+    # Only prune the cache when every user is read
+    complete = users is None
+    if cache is not None and complete:
+        cache.begin("shortcuts")
 
     # Go through every user on Steam
-    for user in get_steam_users():
-        # Open the shortcuts.vdf file that contains a list of Non-Steam games
-        try:
-            f = open(get_steam_install_path() + r"\\userdata\\" + user + "\\config\\shortcuts.vdf", "rb")
-        except:
-            print("Could not find shortcuts.vdf for user " + user)
+    for user in get_steam_users(env):
+        if not complete and user not in users:
             continue
 
-        allbytes = []
+        # Parse the shortcuts.vdf file that contains a list of Non-Steam games
+        path = env.shortcuts_path(user)
         try:
-            byte = f.read(1)
-            while byte != b'':
-                allbytes.append(byte)
-                byte = f.read(1)
-        finally:
-            f.close()
-
-        # Decode the bytes to ASCII
-        decoded = ""
-        for b in allbytes:
-            decoded += b.decode('ascii')
-
-        # To use for separating elements
-        b01 = bytearray.fromhex('01').decode()
-        b02 = bytearray.fromhex('02').decode()
-
-        # Find iternations of "AppName" for each game
-        # TODO: Sometimes it's "appname" and not "AppName", need to normalize it
-        # to search for both
-        iters = []
-        for iter in re.finditer("appname", decoded):
-            iters.append({'start': iter.start(), 'end': iter.end()})
-
-        # Iterate over the AppNames to make a list of the games
-        # (every game has one AppName)
-        iters_length = len(iters)
-        games = []
-        i = 0
-        for iter in iters:
-            if i + 1 < iters_length:
-                # If there is another game on the file, cut from this AppName's end to the
-                # next game's AppName's start
-                games.append(decoded[iter['start']:iters[i + 1]['start']])
+            if cache is None:
+                shortcuts = _read_shortcuts(path)
             else:
-                # If this is the last game on the file, cut from this AppName's end to
-                # the end of the file
-                games.append(decoded[iter['start']:])
-
-            i += 1
-
-        # Make a list of games, in the right format, by going
-        # through the games and getting each game's details.
-        # For example:
-        # {
-        #   "name": "Minecraft",
-        #   "exe": "C:\Games\Minecraft.exe"
-        # }
-        for game in games:
-            """
-            The contents of the game info can contain some of the following:
-            AppName  Overwatch ☺Exe "D:\Program Files\Overwatch\Overwatch Launcher.exe" ☺StartDir "D:\Program Files\Overwatch\" ☺icon
-            ☺ShortcutPath  ☺LaunchOptions  ☻IsHidden     ☻AllowDesktopConfig ☺   ☻AllowOverlay ☺   ☻OpenVR     ☻Devkit     ☺DevkitGameID
-            ☻LastPlayTime      tags
-            """
-            
-            indices = {}
-            indices["AppName"] = (0, len("AppName") + 1)
-            indices["Exe"] = (game.index(b01 + "Exe"), game.index(b01 + "Exe") + len(b01 + "Exe") + 1)
-            indices["StartDir"] = (game.index(b01 + "StartDir"), game.index(b01 + "StartDir") + len(b01 + "StartDir") + 1)
-
-            # Get the contents of the indices (the app name, exe, etc.)
-            name = game[indices["AppName"][1]:indices["Exe"][0]].rstrip('\x00')
-            exe = game[indices["Exe"][1]:indices["StartDir"][0]].rstrip('\x00')
-            games_list.append({
-                "name": name,
-                "exe": exe,
-                "appid": generate_appid_for_nonsteam_game(name, exe),
-                "user": user
-            })
-
-    return games_list
-
-def create_grid_image(game, file_name, with_text=False):
-    """
-        Creates a grid image for a game by looking for a big image
-        on IGDB, and then manipulating it to look good as a grid image
-
-        Paramaters:
-            game - A dictionary containing the Non-Steam game information
-            file_name - A string telling the function where to save the image to
-    """
-
-    headers = {"user-key": config.IGDB_API_KEY}
-    
-    # Search IGDB for the game ID by providing the game name
-    content = "search \"{}\"; fields artworks,cover,slug;".format(game["name"])
-    try:
-        r = requests.post("https://api-v3.igdb.com/games/", headers=headers, data=content).json()
-    except:
-        print("{}[X]{} Could not find {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        return
+                shortcuts = cache.get("shortcuts", path, _read_shortcuts)
+        except OSError:
+            print("Could not find shortcuts.vdf for user " + user)
+            continue
+        except ValueError as e:
+            print("Could not parse shortcuts.vdf for user " + user)
+            print(e)
+            continue
 
-    if not r:
-        print("{}[X]{} Could not find {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        return
+        pairs = [(shortcut.get("AppName", ""), shortcut.get("Exe", "")) for shortcut in shortcuts]
 
-    # Save the game's slug to use as text for the grid image
-    slug = r[0]["slug"]
+        # Generate the app IDs for all the games of the user at once
+        appids = generate_appids_for_nonsteam_games(pairs, as_string=False)
+        for (name, exe), appid in zip(pairs, appids):
+            yield records.Shortcut(appid, name, exe, user)
 
-    # Set the cover image url from IGDB
-    cover = r[0]["cover"]
-    content = "fields *; where id={};".format(cover)
-    try:
-        r = requests.post("https://api-v3.igdb.com/covers", headers=headers, data=content).json()
-    except:
-        print("{}[X]{} Could not find a cover image for {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        return False
-
-    if not r:
-        print("{}[X]{} Could not find a cover image for {} on IGDB.".format(colorama.Back.RED, colorama.Style.RESET_ALL, game["name"]))
-        return False
-
-    # Fix the cover image URL and set the link to the "screenshot_huge" template
-    user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36"
-    cover_url = "http://" + r[0]["url"].replace("//", "").replace("t_thumb", "t_1080p")
-    temp_location = "{}.temp.png".format(file_name, game["name"])
-    
-    # Set urllib with the user agent to download the image to the temporary location
-    opener = urllib.request.build_opener()
-    opener.addheaders = [("User-Agent", user_agent)]
-    urllib.request.install_opener(opener)
-    urllib.request.urlretrieve(cover_url, temp_location)
-
-    # Open the temporary image to edit it
-    im = Image.open(temp_location)
-
-    width, height = im.size
-
-    # If the user wants to have the game's name of the image
-    if with_text == True:
-        # Blur the image
-        im = im.filter(ImageFilter.GaussianBlur(radius=5))
-
-        # Darken the image
-        im = ImageEnhance.Brightness(im).enhance(0.8)
-
-        # Draw the game's name on the image
-        name_text = game["name"]
-
-        # Make new lines if the name is too long
-        # NOTE: Currently only makes one new line if needed
-        if slug != "":
-            name_text = slug.replace('-', ' ')
-        if len(name_text) > 15:
-            space = name_text.find(' ', 15)
-            if space != '':
-                name_text = replace_str_index(name_text, space, '\n')
-
-        font = ImageFont.truetype("grid-font.ttf", 120)
-
-        # Position the game's name (Align horizontally)
-        text_width, text_height = ImageDraw.Draw(im).textsize(name_text, font=font)
-        ImageDraw.Draw(im).text(((width - text_width) / 2, 100), name_text, font=font, fill=(0, 0, 0, 100))
-        ImageDraw.Draw(im).text(((width - text_width) / 2, 108), name_text, font=font)
-
-    im.save(file_name, "PNG")
-
-    # Resize the image and crop
-    resize_and_crop(file_name, file_name, (460, 215))
-
-    os.remove(temp_location)
-
-    return True
-
-def resize_and_crop(img_path, modified_path, size, crop_type='middle'):
-    """
-    (Thanks to github.com/sigilioso)
-
-    Resize and crop an image to fit the specified size.
-
-    args:
-        img_path: path for the image to resize.
-        modified_path: path to store the modified image.
-        size: `(width, height)` tuple.
-        crop_type: can be 'top', 'middle' or 'bottom', depending on this
-            value, the image will cropped getting the 'top/left', 'middle' or
-            'bottom/right' of the image to fit the size.
-    raises:
-        Exception: if can not open the file in img_path of there is problems
-            to save the image.
-        ValueError: if an invalid `crop_type` is provided.
-    """
-    # If height is higher we resize vertically, if not we resize horizontally
-    img = Image.open(img_path)
-    # Get current and desired ratio for the images
-    img_ratio = img.size[0] / float(img.size[1])
-    ratio = size[0] / float(size[1])
-    #The image is scaled/cropped vertically or horizontally depending on the ratio
-    if ratio > img_ratio:
-        img = img.resize((size[0], round(size[0] * img.size[1] / img.size[0])),
-                Image.ANTIALIAS)
-        # Crop in the top, middle or bottom
-        if crop_type == 'top':
-            box = (0, 0, img.size[0], size[1])
-        elif crop_type == 'middle':
-            box = (0, round((img.size[1] - size[1]) / 2), img.size[0],
-                   round((img.size[1] + size[1]) / 2))
-        elif crop_type == 'bottom':
-            box = (0, img.size[1] - size[1], img.size[0], img.size[1])
-        else :
-            raise ValueError('ERROR: invalid value for crop_type')
-        img = img.crop(box)
-    elif ratio < img_ratio:
-        img = img.resize((round(size[1] * img.size[0] / img.size[1]), size[1]),
-                Image.ANTIALIAS)
-        # Crop in the top, middle or bottom
-        if crop_type == 'top':
-            box = (0, 0, size[0], img.size[1])
-        elif crop_type == 'middle':
-            box = (round((img.size[0] - size[0]) / 2), 0,
-                   round((img.size[0] + size[0]) / 2), img.size[1])
-        elif crop_type == 'bottom':
-            box = (img.size[0] - size[0], 0, img.size[0], img.size[1])
-        else :
-            raise ValueError('ERROR: invalid value for crop_type')
-        img = img.crop(box)
-    else :
-        img = img.resize((size[0], size[1]),
-                Image.ANTIALIAS)
-        # If the scale is the same, we do not need to crop
-    img.save(modified_path)
+    if cache is not None:
+        if complete:
+            cache.end("shortcuts")
+        cache.save()
+
+def get_non_steam_games(cache=None, env=None):
+
+    """
+        Finds the Non-Steam games added to the library of every Steam user
+
+        Parameters:
+            cache - A ScanCache to reuse the shortcuts.vdf files parsed by previous scans.
+                    Defaults to None, which parses every file.
+            env - The SteamEnvironment to use. Defaults to the shared environment.
+
+        Returns:
+            A list of records.Shortcut records of the Non-Steam games
+            (see iter_non_steam_games).
+    """
+
+    return list(iter_non_steam_games(cache, env))
 
 def replace_str_index(text,index=0,replacement=''):
     return '%s%s%s'%(text[:index],replacement,text[index+1:])
 
 def string_similarity(a, b):
+    from difflib import SequenceMatcher
+
     return SequenceMatcher(None, a, b).ratio()
\ No newline at end of file